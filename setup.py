@@ -28,7 +28,8 @@ piUML is piUML language parser and UML diagram generator.
     ],
     keywords='UML modeling programming documentation',
     license='GPL',
-    install_requires=['arouter >= 0.1.0', 'distribute', 'setuptools-git'],
+    install_requires=['arouter >= 0.1.0', 'lepl == 5.1.3', 'distribute',
+        'setuptools-git'],
     test_suite='nose.collector',
 )
 
@@ -26,37 +26,200 @@ language is analyzed and diagram is rendered into PDF file using automatic
 layout.
 """
 
+__version__ = '0.1.0'
+
+import io
+import os.path
+from collections import OrderedDict
+
 from piuml.parser import parse
-from piuml.layout import Layout, Router
-from piuml.renderer import Renderer
+from piuml.check import check
+from piuml.data import view
+from piuml import checkpoint
+from piuml.cache import cache_dir
+from piuml.renderer import extension, files_only
 
-__version__ = '0.1.0'
+# layout and renderer modules are imported on demand, so piUML source can
+# be validated without Cairo and Pango modules
 
-def generate(f, fout, filetype='pdf'):
+def generate(f, fout, filetype='pdf', cache=True, views=None,
+        validate=True, save_layout=None, load_layout=None):
     """
     Generate UML diagram into output file.
 
+    If the diagram defines views, then each view is generated into
+    separate output file. The name of the file is output file name
+    with view id appended, i.e. `diagram-overview.pdf`. Size of diagram
+    nodes is calculated once for all views.
+
+    If multiple file types are requested, then the diagram (and each of
+    its views) is laid out and drawn once and saved into file of each
+    type. The name of a file is output file name with extension replaced
+    by file type, i.e. `diagram.pdf` and `diagram.svg`.
+
+    The output can be a writable file object, then single diagram (or
+    view) of single file type is written into the file object. If the
+    output is None, then the diagrams are rendered in memory and
+    dictionary of rendered data is returned, the key of the dictionary
+    is pair of view id (None for diagram) and file type. File types
+    written into files only (i.e. dzi tile pyramid, see
+    `piuml.renderer.files_only`) are not supported by file object and
+    memory output.
+
+    Laid out diagrams can be saved into layout checkpoint file. If
+    layout checkpoint file is loaded and it matches the diagram, then
+    diagram layout and routing of lines is skipped. Otherwise, the
+    layout of the diagram is initialized with the geometry loaded from
+    the checkpoint file.
+
     :Parameters:
      f
         File containing UML diagram description in piUML language.
      fout
-        Output of file name.
+        Output file name, writable file object or None.
+     filetype
+        Type of a file (see `piuml.renderer.RENDERERS`), i.e. pdf, svg,
+        png, svg-native or geometry, or list of file types.
+     cache
+        Use cache of parsed diagrams and text size cache file if true.
+     views
+        List of ids of views to generate (all views by default).
+     validate
+        Validate and check diagram if true (disable for trusted,
+        generated piUML source).
+     save_layout
+        Name of layout checkpoint file to save laid out diagrams into.
+     load_layout
+        Name of layout checkpoint file to load laid out diagrams from.
+    """
+    from piuml.layout import Layout, Router
+    from piuml.renderer import renderer
+    ast = parse(f, cache=cache, validate=validate)
+    if validate:
+        check(ast)
+
+    if views is None:
+        views = list(ast.views)
+    unknown = [v for v in views if v not in ast.views]
+    if unknown:
+        raise ValueError('Unknown view "{}"'.format(unknown[0]))
+
+    ids = [None] if not views else views
+    filetypes = [filetype] if isinstance(filetype, str) else list(filetype)
+    if fout is not None and not isinstance(fout, str) \
+            and (len(ids) > 1 or len(filetypes) > 1):
+        raise ValueError('Single diagram of single file type can be'
+            ' written into file object')
+    if not isinstance(fout, str):
+        unsupported = [ft for ft in filetypes if files_only(ft)]
+        if unsupported:
+            raise ValueError('File type "{}" can be written into files'
+                ' only'.format(unsupported[0]))
+
+    # one renderer for file types of the same renderer class
+    renderers = OrderedDict()
+    for ft in filetypes:
+        cls = renderer(ft)
+        if cls not in renderers:
+            renderers[cls] = cls()
+
+    key = None
+    loaded = None
+    previous = {}
+    if save_layout or load_layout:
+        key = checkpoint.key(ast)
+    if load_layout:
+        data = checkpoint.read(load_layout)
+        if data is not None and data[0] == key \
+                and all(v in data[1] for v in ids):
+            loaded = data[1]
+        elif data is not None:
+            # diagram changed, use previous layout for warm start
+            previous = data[1]
+
+    if loaded is None:
+        from piuml.renderer.text import TEXT_CACHE, TEXT_CACHE_FILE
+        fn = os.path.join(cache_dir(), TEXT_CACHE_FILE)
+        if cache:
+            TEXT_CACHE.load(fn)
+        next(iter(renderers.values())).measure(ast)
+        if cache:
+            TEXT_CACHE.save(fn)
+
+    saved = []
+    result = {}
+    for v in ids:
+        if loaded is None:
+            d = ast if v is None else view(ast, v)
+            layout = Layout(d, previous.get(v))
+            router = Router()
+            layout.layout()
+            router.route(d)
+            saved.append((v, d))
+        else:
+            d = loaded[v]
+        if fout is None:
+            outputs = [(ft, io.BytesIO()) for ft in filetypes]
+        elif isinstance(fout, str):
+            outputs = _outputs(fout, filetype, v)
+        else:
+            outputs = [(filetypes[0], fout)]
+        for cls, r in renderers.items():
+            r.outputs = [(ft, out) for ft, out in outputs
+                if renderer(ft) is cls]
+            r.render(d)
+        if fout is None:
+            result.update(((v, ft), out.getvalue()) for ft, out in outputs)
+
+    if save_layout and loaded is None:
+        checkpoint.save(save_layout, key, saved)
+
+    if fout is None:
+        return result
+
+
+def _outputs(fout, filetype, v):
+    """
+    Get list of pairs of file type and output file name of a diagram.
+
+    :Parameters:
+     fout
+        Output file name.
      filetype
-        Type of a file: pdf, svg or mp.
+        Type of a file or list of file types.
+     v
+        View id (None for diagram).
     """
-    ast = parse(f)
+    root, ext = os.path.splitext(fout)
+    if v is not None:
+        root = '{}-{}'.format(root, v)
+    if isinstance(filetype, str):
+        return [(filetype, root + ext)]
+    else:
+        return [(ft, '{}.{}'.format(root, extension(ft))) for ft in filetype]
+
 
-    layout = Layout(ast)
-    router = Router()
+def validate(f, cache=True):
+    """
+    Validate UML diagram written in piUML language.
 
-    renderer = Renderer()
-    renderer.filetype = filetype
-    renderer.output = fout
+    The diagram is parsed and checked, but it is neither laid out nor
+    rendered. List of all syntax, UML semantics and alignment errors is
+    returned. The list is empty for valid diagram.
 
-    renderer.measure(ast)
-    layout.layout()
-    router.route(ast)
-    renderer.render(ast)
+    :Parameters:
+     f
+        File containing UML diagram description in piUML language.
+     cache
+        Use cache of parsed diagrams if true.
+    """
+    path = getattr(f, 'name', None)
+    source = f if isinstance(f, str) else ''.join(f)
+    errors = []
+    # parse once in error recovery mode to find all errors
+    ast = parse(source, cache=cache, errors=errors, path=path)
+    check(ast, errors)
+    return errors
 
 
 # vim: sw=4:et:ai
@@ -0,0 +1,99 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML benchmarks.
+
+Benchmark results are written in JSON format, so they can be compared
+between piUML releases.
+"""
+
+import json
+import platform
+import time
+import tracemalloc
+
+import piuml
+
+
+def measure(f, repeat=3):
+    """
+    Measure execution time and peak memory usage of a function.
+
+    The best time of all executions is returned. Peak memory is measured
+    in separate execution as memory tracing slows down the function.
+
+    Tuple of time (in seconds), peak memory (in bytes) and the result of
+    the function is returned.
+
+    :Parameters:
+     f
+        Function to measure.
+     repeat
+        Number of function executions.
+    """
+    best = None
+    for i in range(repeat):
+        t = time.perf_counter()
+        result = f()
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+
+    tracemalloc.start()
+    try:
+        f()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def report(name, params, results, fout=None):
+    """
+    Create benchmark report.
+
+    The report is returned and optionally written to a file in JSON
+    format.
+
+    :Parameters:
+     name
+        Benchmark name.
+     params
+        Dictionary of benchmark parameters.
+     results
+        List of benchmark results.
+     fout
+        Output file name.
+    """
+    data = {
+        'benchmark': name,
+        'piuml': piuml.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': params,
+        'results': results,
+    }
+    if fout is not None:
+        with open(fout, 'w') as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+    return data
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,232 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML layout benchmark.
+
+Diagrams are laid out with each constraint scheduling policy of the
+constraint solver (see `piuml.layout.solver.Solver`) and number of
+constraint solving steps is compared.
+
+The diagrams are layout scenarios of layout unit tests and synthetic
+diagrams with deeply nested packages.
+
+Run the benchmark with::
+
+    python3 -m piuml.bench.layout -o layout.json
+"""
+
+import argparse
+
+from piuml.bench import measure, report
+from piuml.layout.cl import Layout
+from piuml.layout.solver import POLICIES, SolverError
+from piuml.parser import parse
+
+# layout scenarios of layout unit tests
+SCENARIOS = {
+    'default_simple': """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+""",
+    'orphaned': """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+class c4 "C4"
+
+:layout:
+    right g1: c1 c3 c2
+""",
+    'deep_align': """
+class c "C"
+    class c1 "C1"
+    class c2 "C2"
+class c3 "C3"
+class c4 "C4"
+class c5 "C5"
+
+:layout:
+    center g1: c2 c3
+""",
+    'deep_auto_default_up_layer': """
+class c1 "C1"
+    class c3 "C3"
+    class c4 "C4"
+class c2 "C2"
+    class c5 "C5"
+    class c6 "C6"
+
+:layout:
+    center g1: c3 c5
+""",
+    'default_interleave': """
+class a "C1"
+class b "C2"
+class c "C3"
+class d "C4"
+class e "C5"
+
+:layout:
+    left g1: a b
+    right g2: d e
+""",
+    'deep_default_interleave': """
+class c "C"
+    class c1 "C1"
+    class c2 "C2"
+class c3 "C3"
+class c4 "C4"
+
+:layout:
+    right g1: c1 c3
+    left g2: c2 c4
+""",
+    'cross_layout': """
+class a "C1"
+class b "C2"
+class c "C3"
+class d "C4"
+class e "C5"
+
+:layout:
+    middle g1: a b c
+    center g2: d b e
+""",
+}
+
+
+def nested(depth=5, width=3, classes=2):
+    """
+    Generate synthetic piUML source with deeply nested packages.
+
+    Each package contains classes and packages of next nesting level.
+
+    :Parameters:
+     depth
+        Depth of nested packages.
+     width
+        Number of packages at each nesting level in a package.
+     classes
+        Number of classes in each package.
+    """
+    lines = []
+    ids = iter(range(10 ** 9))
+
+    def package(level):
+        indent = ' ' * 4 * level
+        for i in range(classes):
+            k = next(ids)
+            lines.append('{}class c{} "C{}"'.format(indent, k, k))
+        if level < depth:
+            for i in range(width):
+                k = next(ids)
+                lines.append('{}package p{} "P{}"'.format(indent, k, k))
+                package(level + 1)
+
+    package(0)
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def run(diagrams, policies=POLICIES, repeat=3):
+    """
+    Run layout benchmark for diagrams.
+
+    List of results is returned for each diagram and scheduling policy.
+
+    :Parameters:
+     diagrams
+        Dictionary of piUML sources, diagram name is the key.
+     policies
+        List of constraint scheduling policies to benchmark.
+     repeat
+        Number of layout executions.
+    """
+    def layout(source, policy):
+        l = Layout(parse(source, cache=False), policy=policy)
+        l.layout()
+        return l.solver.stats
+
+    results = []
+    for name, source in sorted(diagrams.items()):
+        for policy in policies:
+            try:
+                t, peak, stats = measure(lambda: layout(source, policy),
+                        repeat)
+            except SolverError:
+                stats = {'constraints': None, 'steps': None}
+                t = peak = None
+            results.append({
+                'diagram': name,
+                'policy': policy,
+                'constraints': stats['constraints'],
+                'steps': stats['steps'],
+                'time': t,
+                'peak memory': peak,
+            })
+    return results
+
+
+def main(args=None):
+    """
+    Run layout benchmark from command line.
+    """
+    parser = argparse.ArgumentParser(description='piUML layout benchmark')
+    parser.add_argument('--depth', '-d', type=int, default=4,
+            help='Depth of nested packages')
+    parser.add_argument('--width', '-w', type=int, default=2,
+            help='Number of packages at each nesting level')
+    parser.add_argument('--classes', '-n', type=int, default=2,
+            help='Number of classes in each package')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+            help='Number of layout executions')
+    parser.add_argument('--policy', '-p', dest='policies',
+            action='append', choices=POLICIES,
+            help='Scheduling policy to benchmark (all by default)')
+    parser.add_argument('--output', '-o', dest='output',
+            help='JSON output file')
+    args = parser.parse_args(args)
+
+    params = {
+        'depth': args.depth,
+        'width': args.width,
+        'classes': args.classes,
+        'repeat': args.repeat,
+    }
+    diagrams = dict(SCENARIOS)
+    for d in range(1, args.depth + 1):
+        name = 'nested_{}'.format(d)
+        diagrams[name] = nested(d, args.width, args.classes)
+
+    policies = POLICIES if args.policies is None else args.policies
+    results = run(diagrams, policies, args.repeat)
+    report('layout', params, results, args.output)
+
+    for r in results:
+        print('{diagram:28} {policy:6} {constraints!s:>6} constraints' \
+            ' {steps!s:>8} steps'.format(**r))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim: sw=4:et:ai
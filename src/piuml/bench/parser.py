@@ -0,0 +1,228 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML parser benchmark.
+
+Synthetic piUML source is generated and parsed with each parser backend
+
+lepl
+    Parsing with lepl based parser.
+recovery
+    Parsing with lepl based parser in error recovery mode.
+cache
+    Loading parsed diagram from the cache of parsed diagrams.
+
+Run the benchmark with::
+
+    python3 -m piuml.bench.parser -o parser.json
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+
+from piuml.bench import measure, report
+from piuml.cache import ASTCache
+from piuml.data import Section, unwind
+from piuml.parser import parse
+
+BACKENDS = ('lepl', 'recovery', 'cache')
+
+ALIGN = ('top', 'middle', 'bottom', 'left', 'center', 'right')
+
+RELATIONSHIPS = ('==', '->', '=>')
+
+
+def generate(classes=100, features=5, depth=2, relationships=100,
+        aligns=20, seed=1):
+    """
+    Generate synthetic piUML source.
+
+    Classes are distributed evenly between diagram and nested packages.
+    Relationships connect random classes. Alignment definitions align
+    sibling classes, so the generated diagram is valid.
+
+    :Parameters:
+     classes
+        Number of classes.
+     features
+        Number of attributes and number of operations of each class.
+     depth
+        Depth of nested packages.
+     relationships
+        Number of associations, dependencies and generalizations (in
+        total).
+     aligns
+        Number of alignment definitions.
+     seed
+        Seed of random number generator.
+    """
+    rnd = random.Random(seed)
+    lines = []
+
+    # siblings[level] - classes at a level of nesting
+    siblings = [[] for i in range(depth + 1)]
+    for i in range(classes):
+        siblings[i % (depth + 1)].append('c{}'.format(i))
+
+    for level, ids in enumerate(siblings):
+        indent = ' ' * 4 * level
+        for id in ids:
+            lines.append('{}class {} "Class {}"'.format(indent, id, id))
+            for j in range(features):
+                lines.append('{}    : a{}: int [0..1]'.format(indent, j))
+            for j in range(features):
+                lines.append('{}    : op{}(x, y): int'.format(indent, j))
+        if level < depth:
+            lines.append('{}package p{} "Package {}"'.format(indent, level,
+                level))
+
+    ids = [id for k in siblings for id in k]
+    for i in range(relationships):
+        t, h = rnd.sample(ids, 2) if len(ids) > 1 else (ids * 2)
+        lines.append('{} {} {}'.format(t, RELATIONSHIPS[i % 3], h))
+
+    # align siblings in increasing order to avoid contradictory order of
+    # nodes
+    candidates = [k for k in siblings if len(k) > 1]
+    if aligns and candidates:
+        lines.append('')
+        lines.append(':layout:')
+    for i in range(aligns if candidates else 0):
+        ids = candidates[i % len(candidates)]
+        k = rnd.randint(2, min(5, len(ids)))
+        nodes = sorted(rnd.sample(range(len(ids)), k))
+        lines.append('    {}: {}'.format(ALIGN[i % len(ALIGN)],
+            ' '.join(ids[n] for n in nodes)))
+
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def count(ast):
+    """
+    Count nodes of parsed diagram including alignment definitions.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+    """
+    nodes = list(unwind(ast))
+    aligns = sum(len(n.data) for n in nodes if isinstance(n, Section))
+    return len(nodes) + aligns
+
+
+def run(source, backends=BACKENDS, repeat=3):
+    """
+    Run parser benchmark for piUML source.
+
+    List of results is returned for each backend.
+
+    :Parameters:
+     source
+        piUML source.
+     backends
+        List of parser backends to benchmark.
+     repeat
+        Number of parser executions.
+    """
+    path = tempfile.mkdtemp()
+    cache = ASTCache(path)
+    cache.put(cache.key(source), parse(source, cache=False))
+
+    funcs = {
+        'lepl': lambda: parse(source, cache=False),
+        'recovery': lambda: parse(source, cache=False, errors=[]),
+        'cache': lambda: cache.get(cache.key(source)),
+    }
+
+    lines = source.count('\n')
+    results = []
+    try:
+        for name in backends:
+            t, peak, ast = measure(funcs[name], repeat)
+            nodes = count(ast)
+            results.append({
+                'backend': name,
+                'lines': lines,
+                'nodes': nodes,
+                'time': t,
+                'lines/sec': lines / t,
+                'nodes/sec': nodes / t,
+                'peak memory': peak,
+            })
+    finally:
+        shutil.rmtree(path)
+    return results
+
+
+def main(args=None):
+    """
+    Run parser benchmark from command line.
+    """
+    parser = argparse.ArgumentParser(description='piUML parser benchmark')
+    parser.add_argument('--classes', '-n', type=int, default=100,
+            help='Number of classes')
+    parser.add_argument('--features', '-m', type=int, default=5,
+            help='Number of attributes and operations of a class')
+    parser.add_argument('--depth', '-d', type=int, default=2,
+            help='Depth of nested packages')
+    parser.add_argument('--relationships', '-k', type=int, default=100,
+            help='Number of relationships')
+    parser.add_argument('--aligns', '-a', type=int, default=20,
+            help='Number of alignment definitions')
+    parser.add_argument('--seed', type=int, default=1,
+            help='Seed of random number generator')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+            help='Number of parser executions')
+    parser.add_argument('--backend', '-b', dest='backends',
+            action='append', choices=BACKENDS,
+            help='Parser backend to benchmark (all by default)')
+    parser.add_argument('--output', '-o', dest='output',
+            help='JSON output file')
+    args = parser.parse_args(args)
+
+    params = {
+        'classes': args.classes,
+        'features': args.features,
+        'depth': args.depth,
+        'relationships': args.relationships,
+        'aligns': args.aligns,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+    source = generate(args.classes, args.features, args.depth,
+            args.relationships, args.aligns, args.seed)
+    backends = BACKENDS if args.backends is None else args.backends
+    results = run(source, backends, args.repeat)
+    report('parser', params, results, args.output)
+
+    for r in results:
+        print('{backend:10} {lines:8} lines {nodes:8} nodes' \
+            ' {lines/sec:10.1f} lines/s {nodes/sec:10.1f} nodes/s' \
+            ' {peak memory:12} B'.format(**r))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim: sw=4:et:ai
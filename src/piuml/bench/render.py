@@ -0,0 +1,172 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML renderer benchmark.
+
+Synthetic piUML diagram is rendered into each output file type. Each file
+type is benchmarked in a fresh process, where the diagram is measured,
+laid out and routed once before rendering. Rendering time, peak memory
+usage (Python allocations, maximum resident set size of the process and
+its growth while rendering) and size of output file are reported.
+
+Run the benchmark with::
+
+    python3 -m piuml.bench.render -o render.json
+"""
+
+import argparse
+import multiprocessing
+import os
+import os.path
+import resource
+import shutil
+import tempfile
+
+from piuml.bench import measure, report
+from piuml.bench.parser import generate, count
+from piuml.layout import Layout, Router
+from piuml.parser import parse
+from piuml.renderer import renderer, extension
+
+FILETYPES = ('png', 'pdf', 'svg', 'svg-native', 'geometry')
+
+
+def max_rss():
+    """
+    Get maximum resident set size of current process in bytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_filetype(source, filetype, repeat=3):
+    """
+    Run renderer benchmark for piUML source and an output file type.
+
+    Maximum resident set size of a process never decreases, so the
+    function is run in a fresh process by `run` function.
+
+    :Parameters:
+     source
+        piUML source.
+     filetype
+        Output file type to benchmark.
+     repeat
+        Number of renderer executions.
+    """
+    ast = parse(source, cache=False)
+    r = renderer(filetype)()
+    r.measure(ast)
+    Layout(ast).layout()
+    Router().route(ast)
+
+    path = tempfile.mkdtemp()
+    fn = os.path.join(path, 'diagram.{}'.format(extension(filetype)))
+
+    def render():
+        r.filetype = filetype
+        r.output = fn
+        r.render(ast)
+
+    try:
+        rss = max_rss()
+        t, peak, _ = measure(render, repeat)
+        rss_end = max_rss()
+        return {
+            'filetype': filetype,
+            'nodes': count(ast),
+            'time': t,
+            'peak memory': peak,
+            'max rss': rss_end,
+            'rss delta': rss_end - rss,
+            'size': os.path.getsize(fn),
+        }
+    finally:
+        shutil.rmtree(path)
+
+
+def run(source, filetypes=FILETYPES, repeat=3):
+    """
+    Run renderer benchmark for piUML source.
+
+    Each output file type is benchmarked in a fresh process, so memory
+    usage of one file type does not hide memory usage of another one.
+
+    List of results is returned for each output file type.
+
+    :Parameters:
+     source
+        piUML source.
+     filetypes
+        List of output file types to benchmark.
+     repeat
+        Number of renderer executions.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for ft in filetypes:
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(run_filetype, (source, ft, repeat)))
+    return results
+
+
+def main(args=None):
+    """
+    Run renderer benchmark from command line.
+    """
+    parser = argparse.ArgumentParser(description='piUML renderer benchmark')
+    parser.add_argument('--classes', '-n', type=int, default=300,
+            help='Number of classes')
+    parser.add_argument('--features', '-m', type=int, default=5,
+            help='Number of attributes and operations of a class')
+    parser.add_argument('--relationships', '-k', type=int, default=300,
+            help='Number of relationships')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+            help='Number of renderer executions')
+    parser.add_argument('--type', '-T', dest='filetypes',
+            action='append', choices=FILETYPES,
+            help='Output file type to benchmark (all by default)')
+    parser.add_argument('--output', '-o', dest='output',
+            help='JSON output file')
+    args = parser.parse_args(args)
+
+    params = {
+        'classes': args.classes,
+        'features': args.features,
+        'relationships': args.relationships,
+        'repeat': args.repeat,
+    }
+    # alignment groups are not generated, so the diagram can be laid out
+    source = generate(args.classes, args.features, 2, args.relationships,
+            aligns=0)
+    filetypes = FILETYPES if args.filetypes is None else args.filetypes
+    results = run(source, filetypes, args.repeat)
+    report('render', params, results, args.output)
+
+    for r in results:
+        print('{filetype:10} {nodes:8} nodes {time:8.3f} s' \
+            ' {peak memory:12} B {max rss:12} B rss {rss delta:12} B delta' \
+            ' {size:10} B'.format(**r))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,140 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML diagram serialization benchmark.
+
+Synthetic piUML diagram is serialized and loaded with each format
+
+pickle
+    Pickle of diagram object graph.
+serial
+    Compact binary serialization (see `piuml.serial`).
+
+Run the benchmark with::
+
+    python3 -m piuml.bench.serial -o serial.json
+"""
+
+import argparse
+import pickle
+
+import piuml.style # style information of diagram nodes
+from piuml import serial
+from piuml.bench import measure, report
+from piuml.bench.parser import generate, count
+from piuml.data import Element, unwind
+from piuml.parser import parse
+
+FORMATS = ('pickle', 'serial')
+
+
+def run(ast, formats=FORMATS, geometry=False, repeat=3):
+    """
+    Run serialization benchmark for a diagram.
+
+    List of results is returned for each format.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+     formats
+        List of serialization formats to benchmark.
+     geometry
+        Serialize geometry of the nodes if true.
+     repeat
+        Number of serializer executions.
+    """
+    if geometry:
+        # create default style information
+        for n in unwind(ast):
+            if isinstance(n, Element):
+                n.style
+
+    funcs = {
+        'pickle': (lambda: pickle.dumps(ast, pickle.HIGHEST_PROTOCOL),
+            pickle.loads),
+        'serial': (lambda: serial.dumps(ast, geometry), serial.loads),
+    }
+
+    nodes = count(ast)
+    results = []
+    for name in formats:
+        dumps, loads = funcs[name]
+        t_dump, peak, data = measure(dumps, repeat)
+        t_load, _, _ = measure(lambda: loads(data), repeat)
+        results.append({
+            'format': name,
+            'nodes': nodes,
+            'size': len(data),
+            'dump time': t_dump,
+            'load time': t_load,
+            'load nodes/sec': nodes / t_load,
+            'peak memory': peak,
+        })
+    return results
+
+
+def main(args=None):
+    """
+    Run serialization benchmark from command line.
+    """
+    parser = argparse.ArgumentParser(
+            description='piUML serialization benchmark')
+    parser.add_argument('--classes', '-n', type=int, default=100,
+            help='Number of classes')
+    parser.add_argument('--features', '-m', type=int, default=5,
+            help='Number of attributes and operations of a class')
+    parser.add_argument('--relationships', '-k', type=int, default=100,
+            help='Number of relationships')
+    parser.add_argument('--geometry', '-g', action='store_true',
+            help='Serialize geometry of the nodes')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+            help='Number of serializer executions')
+    parser.add_argument('--format', '-f', dest='formats',
+            action='append', choices=FORMATS,
+            help='Serialization format to benchmark (all by default)')
+    parser.add_argument('--output', '-o', dest='output',
+            help='JSON output file')
+    args = parser.parse_args(args)
+
+    params = {
+        'classes': args.classes,
+        'features': args.features,
+        'relationships': args.relationships,
+        'geometry': args.geometry,
+        'repeat': args.repeat,
+    }
+    source = generate(args.classes, args.features, 2, args.relationships)
+    ast = parse(source, cache=False)
+    formats = FORMATS if args.formats is None else args.formats
+    results = run(ast, formats, args.geometry, args.repeat)
+    report('serial', params, results, args.output)
+
+    for r in results:
+        print('{format:8} {nodes:8} nodes {size:10} B' \
+            ' {dump time:8.4f} s dump {load time:8.4f} s load' \
+            ' {peak memory:12} B'.format(**r))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim: sw=4:et:ai
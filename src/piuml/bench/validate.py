@@ -0,0 +1,163 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML validation benchmark.
+
+Synthetic piUML source is validated with `piuml.validate` function in
+each mode
+
+valid
+    Validation of valid source.
+invalid
+    Validation of source with syntax and UML semantics errors.
+cache
+    Validation of valid source loaded from the cache of parsed diagrams.
+
+Files per second and lines per second are reported for each mode, so
+throughput of validation of files in pre-commit hooks can be estimated.
+
+Run the benchmark with::
+
+    python3 -m piuml.bench.validate -o validate.json
+"""
+
+import argparse
+import shutil
+import tempfile
+
+import piuml.parser
+from piuml import validate
+from piuml.bench import measure, report
+from piuml.bench.parser import generate
+from piuml.cache import ASTCache
+
+MODES = ('valid', 'invalid', 'cache')
+
+def invalid(source):
+    """
+    Add syntax and UML semantics errors at the end of piUML source.
+
+    :Parameters:
+     source
+        Valid piUML source.
+    """
+    return source + 'class x1 "X1" )\nc0 -- c1\n'
+
+
+def run(source, modes=MODES, repeat=3):
+    """
+    Run validation benchmark for piUML source.
+
+    List of results is returned for each mode.
+
+    :Parameters:
+     source
+        Valid piUML source.
+     modes
+        List of validation modes to benchmark.
+     repeat
+        Number of validations.
+    """
+    path = tempfile.mkdtemp()
+    cache = ASTCache(path)
+    bad = invalid(source)
+
+    funcs = {
+        'valid': lambda: validate(source, cache=False),
+        'invalid': lambda: validate(bad, cache=False),
+        'cache': lambda: validate(source),
+    }
+    sources = {'valid': source, 'invalid': bad, 'cache': source}
+
+    default_cache = piuml.parser.default_cache
+    piuml.parser.default_cache = lambda: cache
+    results = []
+    try:
+        validate(source) # fill the cache
+        for name in modes:
+            t, peak, errors = measure(funcs[name], repeat)
+            lines = sources[name].count('\n')
+            results.append({
+                'mode': name,
+                'lines': lines,
+                'errors': len(errors),
+                'time': t,
+                'files/sec': 1 / t,
+                'lines/sec': lines / t,
+                'peak memory': peak,
+            })
+    finally:
+        piuml.parser.default_cache = default_cache
+        shutil.rmtree(path)
+    return results
+
+
+def main(args=None):
+    """
+    Run validation benchmark from command line.
+    """
+    parser = argparse.ArgumentParser(description='piUML validation benchmark')
+    parser.add_argument('--classes', '-n', type=int, default=12,
+            help='Number of classes')
+    parser.add_argument('--features', '-m', type=int, default=5,
+            help='Number of attributes and operations of a class')
+    parser.add_argument('--depth', '-d', type=int, default=2,
+            help='Depth of nested packages')
+    parser.add_argument('--relationships', '-k', type=int, default=20,
+            help='Number of relationships')
+    parser.add_argument('--aligns', '-a', type=int, default=5,
+            help='Number of alignment definitions')
+    parser.add_argument('--seed', type=int, default=1,
+            help='Seed of random number generator')
+    parser.add_argument('--repeat', '-r', type=int, default=10,
+            help='Number of validations')
+    parser.add_argument('--mode', '-M', dest='modes',
+            action='append', choices=MODES,
+            help='Validation mode to benchmark (all by default)')
+    parser.add_argument('--output', '-o', dest='output',
+            help='JSON output file')
+    args = parser.parse_args(args)
+
+    params = {
+        'classes': args.classes,
+        'features': args.features,
+        'depth': args.depth,
+        'relationships': args.relationships,
+        'aligns': args.aligns,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+    source = generate(args.classes, args.features, args.depth,
+            args.relationships, args.aligns, args.seed)
+    modes = MODES if args.modes is None else args.modes
+    results = run(source, modes, args.repeat)
+    report('validate', params, results, args.output)
+
+    for r in results:
+        print('{mode:8} {lines:6} lines {errors:4} errors' \
+            ' {files/sec:10.1f} files/s {lines/sec:10.1f} lines/s' \
+            ' {peak memory:12} B'.format(**r))
+
+
+if __name__ == '__main__':
+    main()
+
+
+# vim: sw=4:et:ai
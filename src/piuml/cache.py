@@ -0,0 +1,243 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Content addressed, on-disk cache of parsed piUML diagrams.
+
+A parsed diagram is stored in a cache directory under the key calculated
+from piUML source, piUML version and version of cache data format. The size of the cache directory is
+bounded - least recently used diagrams are removed when the limit is
+exceeded.
+
+The cache directory is `$PIUML_CACHE_DIR` or `$XDG_CACHE_HOME/piuml` (by
+default `~/.cache/piuml`).
+"""
+
+import hashlib
+import importlib
+import os
+import os.path
+import pickle
+import tempfile
+import zlib
+
+import piuml
+
+import logging
+log = logging.getLogger('piuml.cache')
+
+# maximum size of cache directory in bytes
+CACHE_SIZE = 32 * 1024 * 1024
+
+# suffix of cache entry files
+SUFFIX = '.ast'
+
+# modules defining structure of parsed diagram, cache entries are
+# invalidated when source of any of the modules changes
+FORMAT_MODULES = ('piuml.data', 'piuml.parser')
+
+__format = None
+
+
+def cache_dir():
+    """
+    Get default cache directory.
+    """
+    path = os.getenv('PIUML_CACHE_DIR')
+    if not path:
+        path = os.getenv('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+        path = os.path.join(path, 'piuml')
+    return path
+
+
+def data_format():
+    """
+    Get version of cache data format.
+
+    The version is hash of piUML version and sources of modules defining
+    structure of parsed diagram, so cache entries do not need to be
+    invalidated by hand.
+    """
+    global __format
+    if __format is None:
+        h = hashlib.sha1(piuml.__version__.encode('utf-8'))
+        for name in FORMAT_MODULES:
+            mod = importlib.import_module(name)
+            fn = os.path.splitext(mod.__file__)[0] + '.py'
+            try:
+                with open(fn, 'rb') as f:
+                    h.update(f.read())
+            except (OSError, IOError) as ex:
+                # no sources, i.e. bytecode only installation
+                log.warning('cannot read {} for cache data format: {}' \
+                    .format(fn, ex))
+                h.update(name.encode('utf-8'))
+        __format = h.hexdigest()
+    return __format
+
+
+
+class ASTCache(object):
+    """
+    Cache of parsed piUML diagrams.
+
+    All cache operations are fail safe - if cache directory cannot be
+    read or written, then cache miss is assumed and the error is logged.
+
+    :Attributes:
+     path
+        Cache directory.
+     max_size
+        Maximum size of cache directory in bytes.
+    """
+    def __init__(self, path=None, max_size=CACHE_SIZE):
+        self.path = cache_dir() if path is None else path
+        self.max_size = max_size
+
+
+    def key(self, source, *deps):
+        """
+        Calculate cache key of piUML source.
+
+        :Parameters:
+         source
+            piUML source as string.
+         deps
+            Hashes of files the source depends on (i.e. included files).
+        """
+        h = hashlib.sha1(data_format().encode('utf-8'))
+        h.update(b'\0')
+        h.update(source.encode('utf-8'))
+        for d in deps:
+            h.update(b'\0')
+            h.update(d.encode('utf-8'))
+        return h.hexdigest()
+
+
+    def get(self, key):
+        """
+        Get parsed diagram from the cache.
+
+        None is returned on cache miss.
+
+        :Parameters:
+         key
+            Cache key.
+        """
+        fn = self._fn(key)
+        try:
+            with open(fn, 'rb') as f:
+                data = f.read()
+            ast = pickle.loads(zlib.decompress(data))
+            os.utime(fn, None) # mark as recently used
+        except (OSError, IOError):
+            return None
+        except Exception as ex:
+            log.warning('invalid cache entry {}: {}'.format(fn, ex))
+            return None
+
+        if __debug__:
+            log.debug('cache hit {}'.format(key))
+        return ast
+
+
+    def put(self, key, ast):
+        """
+        Store parsed diagram in the cache.
+
+        :Parameters:
+         key
+            Cache key.
+         ast
+            Parsed diagram.
+        """
+        data = zlib.compress(pickle.dumps(ast, pickle.HIGHEST_PROTOCOL))
+        tmp = None
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._fn(key))
+            tmp = None
+        except (OSError, IOError) as ex:
+            log.warning('cannot write cache entry {}: {}'.format(key, ex))
+            return
+        finally:
+            # remove temporary file if cache entry is not written
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except (OSError, IOError):
+                    pass
+
+        if __debug__:
+            log.debug('cache store {}, size {}'.format(key, len(data)))
+        self.evict()
+
+
+    def evict(self):
+        """
+        Remove least recently used cache entries until size of cache
+        directory is within the limit.
+        """
+        try:
+            entries = []
+            for fn in os.listdir(self.path):
+                if not fn.endswith(SUFFIX):
+                    continue
+                st = os.stat(os.path.join(self.path, fn))
+                entries.append((st.st_mtime, st.st_size, fn))
+        except (OSError, IOError) as ex:
+            log.warning('cannot scan cache directory: {}'.format(ex))
+            return
+
+        size = sum(s for _, s, _ in entries)
+        entries.sort()
+        for _, s, fn in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(os.path.join(self.path, fn))
+                size -= s
+            except (OSError, IOError) as ex:
+                log.warning('cannot remove cache entry {}: {}'.format(fn, ex))
+
+
+    def _fn(self, key):
+        """
+        Get file name of cache entry.
+        """
+        return os.path.join(self.path, key + SUFFIX)
+
+
+
+__cache = None
+
+def default_cache():
+    """
+    Get default AST cache instance.
+    """
+    global __cache
+    if __cache is None:
+        __cache = ASTCache()
+    return __cache
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,310 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Checks of parsed piUML diagram.
+
+The checks require complete diagram, i.e. alignment of nodes can be
+verified only when all nodes are parsed. UML semantics checks are
+performed by parser after a diagram is parsed (validation stage), the
+other checks are performed before layout of a diagram, so layout
+processor can assume valid diagram.
+
+No Cairo or Pango modules are imported by this module, so the checks can
+be used to validate a diagram quickly.
+"""
+
+from piuml.data import Element, Relationship, Section, ELEMENTS, lca, \
+        lsb, unwind, view
+from piuml.parser import AlignmentError, UMLError
+
+import logging
+log = logging.getLogger('piuml.check')
+
+# alignment types for which nodes are spanned horizontally or vertically
+HSPAN = ('top', 'middle', 'bottom')
+VSPAN = ('left', 'center', 'right')
+
+# UML relationships restricted to specific elements: relationship kind,
+# predicate of tail and head element classes and error message
+UML_RULES = (
+    ('import/include',
+        lambda t, h: (t, h) in (('package', 'package'), ('usecase', 'usecase')),
+        'Dependency -i> (package import or use case inclusion) can be' \
+            ' specified only between two packages or two use cases'),
+    ('merge',
+        lambda t, h: (t, h) == ('package', 'package'),
+        'Dependency -m> (package merge) can be specified only between' \
+            ' two packages'),
+    ('extend',
+        lambda t, h: (t, h) == ('usecase', 'usecase'),
+        'Dependency -e> (use case extension) can be specified only' \
+            ' between two use cases'),
+    ('commentline',
+        lambda t, h: (t == 'comment') ^ (h == 'comment'),
+        'One of comment line ends shall be comment'),
+)
+
+
+def _uml_table(rules):
+    """
+    Create table of illegal UML relationships.
+
+    The table maps relationship kind, tail and head element classes to
+    error message.
+
+    :Parameters:
+     rules
+        UML relationship rules.
+    """
+    return {(kind, t, h): msg for kind, f, msg in rules
+            for t in ELEMENTS for h in ELEMENTS if not f(t, h)}
+
+UML_TABLE = _uml_table(UML_RULES)
+
+
+def _error(msg, a):
+    """
+    Create alignment error for alignment definition or view.
+
+    :Parameters:
+     msg
+        Error message.
+     a
+        Alignment definition or view.
+    """
+    if a.span is None:
+        return AlignmentError(msg)
+    return AlignmentError(msg, a.span.line, a.span.col)
+
+
+def _cycle(edges):
+    """
+    Find a cycle in directed graph.
+
+    A node belonging to a cycle is returned or None if graph has no
+    cycles.
+
+    :Parameters:
+     edges
+        Dictionary of graph edges - node to list of nodes.
+    """
+    WHITE, GRAY, BLACK = 0, 1, 2
+    color = dict.fromkeys(edges, WHITE)
+    for n in edges:
+        if color[n] != WHITE:
+            continue
+        color[n] = GRAY
+        stack = [(n, iter(edges[n]))]
+        while stack:
+            k, kids = stack[-1]
+            for c in kids:
+                cc = color.get(c, WHITE)
+                if cc == GRAY:
+                    return c
+                elif cc == WHITE:
+                    color[c] = GRAY
+                    stack.append((c, iter(edges.get(c, ()))))
+                    break
+            else:
+                color[k] = BLACK
+                stack.pop()
+    return None
+
+
+def check_align(ast, errors=None):
+    """
+    Check alignment definitions of a diagram.
+
+    Following is verified
+
+    - only elements are aligned
+    - a node is aligned at most once by an alignment definition
+    - aligned nodes are not placed within the same element (or are not
+      packaged by each other)
+    - alignment definitions do not require contradictory order of nodes
+
+    If list of errors is not specified, then first error found is
+    raised. Otherwise all errors are appended to the list.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+     errors
+        List of errors to be updated.
+    """
+    found = [] if errors is None else errors
+    align = (a for n in ast if isinstance(n, Section) and n.name == 'layout'
+            for a in n.data)
+
+    # order of nodes per parent and span direction
+    order = {}
+    valid = []
+    for a in align:
+        size = len(found)
+        for k in a.nodes:
+            if not isinstance(k, Element):
+                found.append(_error('Alignment "{}": id "{}" is not an' \
+                        ' element'.format(a.id, k.id), a))
+        if len(found) > size:
+            continue
+
+        if len(set(a.nodes)) != len(a.nodes):
+            found.append(_error('Alignment "{}": a node is aligned more' \
+                    ' than once'.format(a.id), a))
+            continue
+
+        p = lca(ast, *a.nodes)
+        nodes = lsb(p, *a.nodes)
+        seen = {}
+        for n, k in zip(a.nodes, nodes):
+            if k in seen and k in (n, seen[k]):
+                found.append(_error('Alignment "{}": node "{}" cannot be' \
+                        ' aligned with its packaging element "{}"'.format(
+                            a.id, n.id if k is seen[k] else seen[k].id,
+                            k.id), a))
+                break
+            elif k in seen:
+                found.append(_error('Alignment "{}": nodes "{}" and "{}"' \
+                        ' cannot be aligned as both are placed within' \
+                        ' "{}"'.format(a.id, seen[k].id, n.id, k.id), a))
+                break
+            seen[k] = n
+        else:
+            valid.append(a)
+            key = p, a.type in HSPAN
+            edges = order.setdefault(key, {})
+            for k1, k2 in zip(nodes[:-1], nodes[1:]):
+                edges.setdefault(k1, []).append(k2)
+
+    for (p, horizontal), edges in order.items():
+        n = _cycle(edges)
+        if n is None:
+            continue
+        # report the last alignment definition involved in the cycle
+        a = [a for a in valid if n in lsb(p, *a.nodes)
+                and (a.type in HSPAN) == horizontal][-1]
+        found.append(_error('Alignment "{}": contradictory {} order of' \
+                ' node "{}"'.format(a.id,
+                    'horizontal' if horizontal else 'vertical', n.id), a))
+
+    if __debug__:
+        log.debug('alignment errors: {}'.format(found))
+
+    if errors is None and found:
+        raise found[0]
+
+
+def check_uml(ast, errors=None):
+    """
+    Check UML semantics of relationships of a diagram.
+
+    Each relationship is looked up in the table of illegal relationships
+    by its kind (i.e. dependency type or relationship class), tail and
+    head element classes.
+
+    If list of errors is not specified, then first error found is
+    raised. Otherwise all errors are appended to the list.
+
+    List of invalid relationships is returned.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+     errors
+        List of errors to be updated.
+    """
+    invalid = []
+    table = UML_TABLE
+    lines = (n for n in unwind(ast) if isinstance(n, Relationship))
+    for r in lines:
+        msg = table.get((r.data.get('kind', r.cls), r.tail.cls, r.head.cls))
+        if msg is None:
+            continue
+        span = r.span
+        error = UMLError(msg) if span is None \
+                else UMLError(msg, span.line, span.col)
+        if errors is None:
+            raise error
+        errors.append(error)
+        invalid.append(r)
+
+    if __debug__:
+        log.debug('invalid relationships: {}'.format(invalid))
+    return invalid
+
+
+def check_views(ast, errors=None):
+    """
+    Check views of a diagram.
+
+    Only elements can be selected by a view and alignment definitions of a
+    view can align nodes of the view only. Then alignment definitions of
+    each view are checked (see `check_align`).
+
+    If list of errors is not specified, then first error found is
+    raised. Otherwise all errors are appended to the list.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+     errors
+        List of errors to be updated.
+    """
+    found = [] if errors is None else errors
+    for v in ast.views.values():
+        size = len(found)
+        for n in v.nodes:
+            if not isinstance(n, Element):
+                found.append(_error('View "{}": id "{}" is not an' \
+                        ' element'.format(v.id, n.id), v))
+        if len(found) > size:
+            continue
+
+        nodes = v.select(ast)
+        for a in v.layout.data:
+            for n in a.nodes:
+                if isinstance(n, Element) and n not in nodes:
+                    found.append(_error('Alignment "{}": node "{}" is not' \
+                            ' in view "{}"'.format(a.id, n.id, v.id), a))
+        if len(found) == size:
+            check_align(view(ast, v.id), found)
+
+    if errors is None and found:
+        raise found[0]
+
+
+def check(ast, errors=None):
+    """
+    Perform all checks of a diagram.
+
+    If list of errors is not specified, then first error found is
+    raised. Otherwise all errors are appended to the list.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+     errors
+        List of errors to be updated.
+    """
+    check_align(ast, errors)
+    check_views(ast, errors)
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,163 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Layout checkpoint files.
+
+Layout checkpoint file stores laid out and routed diagrams (diagram and
+its views) with their geometry, so a diagram can be rendered again
+without solving its layout, i.e. in different output format.
+
+The checkpoint is stored under the key calculated from serialized
+parsed diagram, therefore it is invalidated when the diagram changes.
+
+Checkpoint file consists of header (magic bytes, format version, key,
+number of diagrams) and of serialized diagrams (see `piuml.serial`),
+each preceded by view id (empty for the diagram) and size of serialized
+data.
+"""
+
+import hashlib
+import struct
+
+import piuml
+from piuml import serial
+
+import logging
+log = logging.getLogger('piuml.checkpoint')
+
+MAGIC = b'PIUL'
+
+# version of checkpoint file format
+VERSION = 1
+
+HEADER = struct.Struct('<4sB40sI')
+ENTRY = struct.Struct('<II')
+
+
+def key(ast):
+    """
+    Calculate checkpoint key of parsed diagram.
+
+    :Parameters:
+     ast
+        Parsed diagram.
+    """
+    h = hashlib.sha1(piuml.__version__.encode('utf-8'))
+    h.update('\0{}\0{}\0'.format(VERSION, serial.VERSION).encode('utf-8'))
+    h.update(serial.dumps(ast))
+    return h.hexdigest()
+
+
+def save(fn, key, diagrams):
+    """
+    Save laid out diagrams into checkpoint file.
+
+    :Parameters:
+     fn
+        Checkpoint file name.
+     key
+        Checkpoint key.
+     diagrams
+        List of pairs - view id (None for diagram) and laid out diagram.
+    """
+    with open(fn, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, key.encode('ascii'),
+            len(diagrams)))
+        for v, d in diagrams:
+            v = b'' if v is None else v.encode('utf-8')
+            data = serial.dumps(d, geometry=True)
+            f.write(ENTRY.pack(len(v), len(data)))
+            f.write(v)
+            f.write(data)
+    if __debug__:
+        log.debug('layout checkpoint {} saved to {}'.format(key, fn))
+
+
+def read(fn):
+    """
+    Read laid out diagrams from checkpoint file.
+
+    Tuple of checkpoint key and dictionary of diagrams is returned, view
+    id is the key of the dictionary (None for diagram). If checkpoint
+    file cannot be read or it is invalid, then None is returned.
+
+    Use `load` function to load diagrams matching a checkpoint key.
+
+    :Parameters:
+     fn
+        Checkpoint file name.
+    """
+    try:
+        with open(fn, 'rb') as f:
+            data = f.read()
+    except (OSError, IOError) as ex:
+        log.debug('cannot read layout checkpoint {}: {}'.format(fn, ex))
+        return None
+
+    try:
+        magic, version, key, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a layout checkpoint file')
+        key = key.decode('ascii')
+
+        diagrams = {}
+        offset = HEADER.size
+        for i in range(count):
+            vsize, dsize = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            v = data[offset:offset + vsize].decode('utf-8')
+            offset += vsize
+            d = serial.loads(data[offset:offset + dsize])
+            offset += dsize
+            diagrams[v if v else None] = d
+    except (ValueError, IndexError, StopIteration, struct.error) as ex:
+        log.warning('invalid layout checkpoint {}: {}'.format(fn, ex))
+        return None
+
+    if __debug__:
+        log.debug('layout checkpoint {} read from {}'.format(key, fn))
+    return key, diagrams
+
+
+def load(fn, key):
+    """
+    Load laid out diagrams from checkpoint file.
+
+    Dictionary of diagrams is returned, view id is the key of the
+    dictionary (None for diagram). If checkpoint file cannot be read, it
+    is invalid or its key does not match, then None is returned.
+
+    :Parameters:
+     fn
+        Checkpoint file name.
+     key
+        Checkpoint key.
+    """
+    data = read(fn)
+    if data is None:
+        return None
+    if data[0] != key:
+        if __debug__:
+            log.debug('layout checkpoint {} is outdated'.format(fn))
+        return None
+    return data[1]
+
+
+# vim: sw=4:et:ai
@@ -24,7 +24,9 @@ Screen oriented coordinate system is assumed (x-axis leftward, y-axis
 downard), which is aligned with Cairo.
 """
 
-from collections import Iterable
+from bisect import bisect_right
+from collections import Iterable, OrderedDict
+from copy import deepcopy
 from uuid import uuid4 as uuid
 import logging
 
@@ -59,6 +61,8 @@ class Element(object):
         relationship).
      id
         Element unique identifier.
+     generated
+        True if element identifier is generated, not specified by a user.
      parent
         Parent node.
      stereotypes
@@ -69,13 +73,17 @@ class Element(object):
      data
         Additional node data, i.e. in case of association its ends
         navigability information.
+     span
+        Position of the element in piUML source (None if unknown).
     """
     def __init__(self, cls=None, id=None, stereotypes=None, name=None, data=None):
         self.cls = cls
         self.id = str(uuid()) if id is None else id
+        self.generated = id is None
         self.name = '' if name is None else name
         self.stereotypes = stereotypes
         self.parent = None
+        self.span = None
 
         self.data = {} if data is None else data
         for a in ('attributes', 'operations', 'stattrs'):
@@ -150,6 +158,12 @@ class PackagingElement(Element):
 class Diagram(PackagingElement):
     """
     UML diagram instance.
+
+    :Attributes:
+     index
+        Index of piUML source of the diagram (None if unknown).
+     views
+        Views of the diagram by view id.
     """
     def __init__(self, children=[]):
         """
@@ -157,6 +171,8 @@ class Diagram(PackagingElement):
         """
         super(Diagram, self).__init__(cls='diagram', id='diagram',
                 children=children)
+        self.index = None
+        self.views = OrderedDict()
 
         log.debug('diagram children {}'.format(self.children))
         for k in self.children:
@@ -191,9 +207,10 @@ class Relationship(Element):
      head
         Head node. 
     """
-    def __init__(self, cls, tail, head, stereotypes=None, name='',
+    def __init__(self, cls, tail, head, id=None, stereotypes=None, name='',
             data=None):
         super(Relationship, self).__init__(cls=cls,
+                id=id,
                 stereotypes=stereotypes,
                 name=name,
                 data=data)
@@ -323,13 +340,21 @@ class Align(object):
         Alignment type.
      id
         Alignment definition id.
+     generated
+        True if alignment definition id is generated, not specified by a
+        user.
      nodes
         List of nodes to be aligned.
+     span
+        Position of the alignment definition in piUML source (None if
+        unknown).
     """
     def __init__(self, type, id=None):
         self.type = type
         self.id = str(uuid()) if id is None else id
+        self.generated = id is None
         self.nodes = []
+        self.span = None
 
 
     def __repr__(self):
@@ -337,6 +362,189 @@ class Align(object):
                 tuple(n.id for n in self.nodes))
 
 
+class View(object):
+    """
+    View of a diagram.
+
+    A view selects a subset of diagram nodes and defines its own layout.
+    Selecting a node selects its packaged nodes as well. Relationships are
+    selected if both their ends are selected.
+
+    :Attributes:
+     id
+        View id.
+     nodes
+        List of selected nodes.
+     layout
+        Layout section of the view.
+     span
+        Position of the view in piUML source (None if unknown).
+    """
+    def __init__(self, id):
+        self.id = id
+        self.nodes = []
+        self.layout = Section('layout')
+        self.span = None
+
+
+    def select(self, ast):
+        """
+        Find all nodes of a diagram belonging to the view.
+
+        Set of nodes is returned including packaging elements of the
+        selected nodes.
+
+        :Parameters:
+         ast
+            Diagram of the view.
+        """
+        nodes = set()
+        for n in self.nodes:
+            nodes.update(k for k in unwind(n) if isinstance(k, Element))
+            p = n.parent
+            while p is not None:
+                nodes.add(p)
+                p = p.parent
+        nodes.update(k for k in unwind(ast) if isinstance(k, Relationship)
+                and k.tail in nodes and k.head in nodes)
+        return nodes
+
+
+    def __repr__(self):
+        return 'View({}): {}'.format(self.id, tuple(n.id for n in self.nodes))
+
+
+
+class Span(object):
+    """
+    Position of a node in piUML source.
+
+    :Attributes:
+     start
+        Offset of first character of the node.
+     end
+        Offset of the first character after the node.
+     line
+        Line number of first character of the node (starting from 1).
+     col
+        Column number of first character of the node (starting from 1).
+    """
+    __slots__ = 'start', 'end', 'line', 'col'
+
+    def __init__(self, start, end, line, col):
+        self.start = start
+        self.end = end
+        self.line = line
+        self.col = col
+
+
+    def __contains__(self, offset):
+        return self.start <= offset < self.end
+
+
+    def __repr__(self):
+        return 'Span({}, {}, {}:{})'.format(self.start, self.end,
+                self.line, self.col)
+
+
+
+class SourceIndex(object):
+    """
+    Index of piUML source.
+
+    The index maps between offsets and line and column numbers of piUML
+    source, and between source positions and nodes of a diagram. Both
+    mappings use binary search.
+
+    :Attributes:
+     lines
+        Offsets of the lines of piUML source.
+     starts
+        Start offsets of the indexed nodes.
+     nodes
+        Indexed nodes ordered by their start offsets.
+    """
+    def __init__(self, source):
+        """
+        Create index of piUML source.
+
+        :Parameters:
+         source
+            piUML source as string.
+        """
+        self.lines = [0]
+        offset = source.find('\n')
+        while offset >= 0:
+            self.lines.append(offset + 1)
+            offset = source.find('\n', offset + 1)
+        self.starts = []
+        self.nodes = []
+
+
+    def position(self, offset):
+        """
+        Find line and column numbers of source offset.
+
+        :Parameters:
+         offset
+            Offset in piUML source.
+        """
+        i = bisect_right(self.lines, offset)
+        return i, offset - self.lines[i - 1] + 1
+
+
+    def offset(self, line, col=1):
+        """
+        Find source offset of line and column numbers.
+
+        :Parameters:
+         line
+            Line number (starting from 1).
+         col
+            Column number (starting from 1).
+        """
+        return self.lines[line - 1] + col - 1
+
+
+    def add(self, nodes):
+        """
+        Index nodes, which have position in piUML source.
+
+        :Parameters:
+         nodes
+            Collection of nodes.
+        """
+        items = list(zip(self.starts, self.nodes))
+        items.extend((n.span.start, n) for n in nodes
+            if getattr(n, 'span', None) is not None)
+        items.sort(key=lambda t: t[0])
+        self.starts = [s for s, _ in items]
+        self.nodes = [n for _, n in items]
+
+
+    def find(self, line, col=1):
+        """
+        Find innermost node at line and column of piUML source.
+
+        None is returned if there is no node at the position.
+
+        :Parameters:
+         line
+            Line number (starting from 1).
+         col
+            Column number (starting from 1).
+        """
+        offset = self.offset(line, col)
+        i = bisect_right(self.starts, offset)
+        n = self.nodes[i - 1] if i > 0 else None
+        while n is not None and offset not in n.span:
+            n = getattr(n, 'parent', None)
+            if n is not None and n.span is None:
+                n = None
+        return n
+
+
+
 def preorder(n, f, reverse=False):
     """
     Traverse a tree in preorder.
@@ -433,6 +641,40 @@ class MWalker(object):
             log.debug('no visitor method {}'.format(fn))
 
 
+def view(ast, name):
+    """
+    Create diagram of a view.
+
+    The nodes of the view are copied from the diagram together with their
+    style information, so style information calculated for the diagram
+    (i.e. size of nodes) is reused by each view, while the view can be
+    laid out independently from the diagram and other views.
+
+    :Parameters:
+     ast
+        Diagram.
+     name
+        View id.
+    """
+    v = ast.views[name]
+    nodes = v.select(ast)
+
+    # do not copy source index and views
+    memo = {id(ast.index): None, id(ast.views): OrderedDict()}
+    d = deepcopy(ast, memo)
+    layout = deepcopy(v.layout, memo)
+
+    def prune(n):
+        n.children = [k for k in n if k in nodes]
+        for k in n:
+            if isinstance(k, PackagingElement):
+                prune(k)
+
+    prune(d)
+    d.children.append(layout)
+    return d
+
+
 def unwind(n):
     yield n
 
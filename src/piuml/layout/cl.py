@@ -17,15 +17,21 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+from piuml import checkpoint
 from piuml.data import lca, lsb, MWalker, Align, Relationship, \
-    Element, PackagingElement, NodeGroup
+    Element, PackagingElement, NodeGroup, unwind
 from piuml.layout.solver import *
-from piuml.style import Area
+from piuml.style import Area, Pos, Size
 
 from collections import OrderedDict
 import logging
 log = logging.getLogger('piuml.layout.cl')
 
+# maximum growth of an element over its minimal size, for which previous
+# size of the element is kept on warm start; a larger element is sized
+# from scratch, so it can shrink when its content is removed
+WARM_SIZE_SLACK = 10
+
 
 class LayoutError(Exception):
     """
@@ -44,16 +50,34 @@ class Layout(object):
         Cache of alignment information per nodes common parent.
      lines
         Cache of lines with tail and head nodes as key.
+     previous
+        Previous layout of the diagram - laid out diagram or name of
+        layout checkpoint file (optional).
+     solver
+        Constraint solver.
     """
-    def __init__(self, ast):
+    def __init__(self, ast, previous=None, policy='fifo'):
         """
         Create layout processor.
+
+        If previous layout of the diagram is specified, then position and
+        size of nodes are initialized with previous geometry (warm
+        start). Nodes are matched by their ids specified by a user.
+
+        :Parameters:
+         ast
+            piUML source parsed tree.
+         previous
+            Previous layout of the diagram.
+         policy
+            Constraint scheduling policy of the solver (see `Solver`).
         """
         super(Layout, self).__init__()
         self.ast = ast
         self.align = OrderedDict()
         self.lines = {}
-        self.solver = Solver()
+        self.solver = Solver(policy)
+        self.previous = previous
 
 
     def layout(self, solve=True):
@@ -72,11 +96,81 @@ class Layout(object):
         dab.preorder(self.ast, reverse=True) # find default alignment
         self._create_align_groups()
         self._create_line_cache()
+        if self.previous is not None:
+            self._warm_start()
         cb.preorder(self.ast, reverse=True)  # create constraints
         if solve:
             self.solver.solve()
 
 
+    def _warm_start(self):
+        """
+        Initialize position and size of nodes with geometry of previous
+        layout.
+
+        Size of a node is initialized if it is not smaller than minimal
+        size of the node. Size of an element, which is not a packaging
+        element, is initialized only if the element did not shrink, as
+        size of a packaging element is determined by its children.
+
+        Packaging elements without previous geometry are positioned at
+        the top, left corner of their children.
+        """
+        previous = self.previous
+        if isinstance(previous, str):
+            data = checkpoint.read(previous)
+            previous = None if data is None else data[1].get(None)
+        if previous is None:
+            return
+
+        boxes = {}
+        for n in unwind(previous):
+            if isinstance(n, Element) and 'style' in n.__dict__:
+                k = node_key(n)
+                if k is not None:
+                    boxes[k] = n.style
+
+        nodes = [n for n in unwind(self.ast) if isinstance(n, Element)
+            and not isinstance(n, Relationship) and n is not self.ast]
+        seeded = set()
+        for n in nodes:
+            k = node_key(n)
+            prev = boxes.get(k) if k is not None else None
+            if prev is None:
+                continue
+
+            style = n.style
+            style.pos = Pos(prev.pos.x, prev.pos.y)
+            (w, h), (mw, mh) = prev.size, style.min_size
+            if w >= mw and h >= mh and (isinstance(n, PackagingElement)
+                    or w < mw + WARM_SIZE_SLACK and h < mh + WARM_SIZE_SLACK):
+                style.size = Size(w, h)
+            seeded.add(id(n))
+
+        # children are before their parents in reversed preorder
+        for n in reversed(nodes):
+            if id(n) in seeded or not isinstance(n, PackagingElement):
+                continue
+            kids = [k.style.pos for k in n if id(k) in seeded]
+            if kids:
+                style = n.style
+                pad = style.padding
+                x = min(p.x for p in kids) - pad.left
+                y = min(p.y for p in kids) - pad.top - style.compartment[0]
+                style.pos = Pos(max(0, x), max(0, y))
+                seeded.add(id(n))
+
+        # diagram size is initialized if any node is initialized
+        prev = previous.__dict__.get('style')
+        if seeded and prev is not None:
+            self.ast.style.size = Size(*prev.size)
+
+        self.solver.warm = bool(seeded)
+        if __debug__:
+            log.debug('warm start of {} nodes out of {}'.format(len(seeded),
+                len(nodes)))
+
+
     def _create_line_cache(self):
         """
         Find all lines and create line length cache.
@@ -215,6 +309,7 @@ class ConstraintBuilder(MWalker):
         self.solver = layout.solver
         self.align = layout.align
         self.lines = layout.lines
+        self.depth = 0
 
 
     def _align_nodes(self, node):
@@ -227,6 +322,8 @@ class ConstraintBuilder(MWalker):
         align_info = self.align.get(node, [])
         log.debug('align nodes of {}: {}'.format(node, align_info))
 
+        # alignment constraints are at the level of the children
+        self.depth += 1
         for a in align_info:
             if __debug__:
                 assert all(isinstance(k, Element) for k in a.nodes)
@@ -236,6 +333,7 @@ class ConstraintBuilder(MWalker):
             f_a, f_s = ALIGN_CONSTRAINTS[a.type]
             f_a(self, *a.nodes)
             f_s(self, *level(node, *a.nodes))
+        self.depth -= 1
 
 
     def v_element(self, node):
@@ -246,6 +344,7 @@ class ConstraintBuilder(MWalker):
          node
             Node to constraint.
         """
+        self.depth = depth(node)
         self.size(node)
         if node.parent:
             self.within(node, node.parent)
@@ -256,6 +355,7 @@ class ConstraintBuilder(MWalker):
     v_nodegroup = v_diagram = v_packagingelement = v_element
 
     def v_ielement(self, node):
+        self.depth = depth(node)
         nodes = []
         left = None # find left node for hspan
         l_len = 0 # left side length
@@ -283,7 +383,7 @@ class ConstraintBuilder(MWalker):
 
 
     def add_c(self, c):
-        self.solver.add(c)
+        self.solver.add(c, self.depth)
 
 
     def size(self, node):
@@ -466,6 +566,31 @@ class djset(object):
 
 
 
+def node_key(node):
+    """
+    Get key of a node to match nodes between layouts of a diagram.
+
+    Id of a node is the key if the id is specified by a user. The key of
+    node group is the tuple of keys of its children. If a node cannot be
+    matched, then None is returned.
+    """
+    if isinstance(node, NodeGroup):
+        keys = tuple(node_key(k) for k in node)
+        return None if None in keys else keys
+    return None if node.generated else node.id
+
+
+def depth(node):
+    """
+    Get depth of a node in diagram tree.
+    """
+    d = 0
+    while node.parent is not None:
+        node = node.parent
+        d += 1
+    return d
+
+
 def level(ast, *nodes):
     """
     Given the collection of nodes find all nodes having the same direct
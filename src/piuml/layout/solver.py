@@ -36,6 +36,8 @@ A rectangle has to implement following interface
         : heigth: float
 """
 
+import heapq
+import itertools
 import time
 import math
 from collections import deque
@@ -43,6 +45,9 @@ import logging
 
 log = logging.getLogger('piuml.layout.solver')
 
+# constraint scheduling policies
+POLICIES = ('fifo', 'depth', 'topo')
+
 class SolverError(Exception):
     """
     Constraint solver exception raised when constraints solution cannot be
@@ -55,23 +60,86 @@ class Solver(object):
     """
     Constraint solver.
 
+    Constraints are solved until none of them changes its variables. The
+    order, in which constraints are solved, is defined by scheduling
+    policy
+
+    fifo
+        Constraints are solved in the order they are added, changed
+        constraints are solved again in first in, first out order.
+    depth
+        Constraints of nodes nested deeper in diagram tree are solved
+        first, so parent nodes are resized after their children settle.
+    topo
+        Constraints are solved in topological order of their variables.
+        The first variable of a constraint precedes its other variables,
+        i.e. kid precedes parent in containment constraint. Cycles are
+        broken by depth first search.
+
     :Attributes:
+     policy
+        Constraint scheduling policy.
+     warm
+        True if variables are initialized with previous solution (warm
+        start).
+     count
+        Number of constraint solving steps of last solution.
+     stats
+        Statistics of last solution - number of constraints, number of
+        steps, time and start type (cold or warm).
      _constraints
         List of constraints.
      _dep
         Dependencies between constraints.
-    """
-    def __init__(self):
+     _keys
+        Constraints by their keys.
+     _index
+        Constraints by tuple of their variables.
+     _depth
+        Depth of constraints in diagram tree.
+    """
+    def __init__(self, policy='fifo'):
+        if policy not in POLICIES:
+            raise ValueError('Unknown scheduling policy "{}"'.format(policy))
+        self.policy = policy
+        self.warm = False
+        self.count = 0
+        self.stats = {}
         self._constraints = []
         self._deps = {}
+        self._keys = {}
+        self._index = {}
+        self._depth = {}
 
 
-    def add(self, c):
+    def add(self, c, depth=0):
         """
         Add a constraint to constraint solver.
 
+        If an equal constraint (see `Constraint.key`) is already added,
+        then the constraint is merged into the added constraint.
+        The constraint, which is solved by the solver, is returned.
+
         Constraint's variables are used to build dependency cache.
+
+        :Parameters:
+         c
+            Constraint to add.
+         depth
+            Depth of constraint in diagram tree (used by depth
+            scheduling policy).
         """
+        key = c.key()
+        added = self._keys.get(key)
+        if added is not None:
+            added.merge(c)
+            self._depth[added] = max(self._depth[added], depth)
+            if __debug__:
+                log.debug('constraint {} merged'.format(c))
+            return added
+
+        self._keys[key] = c
+        self._depth[c] = depth
         self._constraints.append(c)
         for d in c.variables:
             if d in self._deps:
@@ -80,6 +148,13 @@ class Solver(object):
                 deps = self._deps[d] = set()
             deps.add(c)
 
+        variables = tuple(c.variables)
+        if variables in self._index:
+            self._index[variables].add(c)
+        else:
+            self._index[variables] = {c}
+        return c
+
 
     def get(self, *variables):
         """
@@ -89,16 +164,68 @@ class Solver(object):
          variables
             Collection of variables.
         """
-        return {c for v in variables for c in self._deps[v] \
-            if tuple(variables) == tuple(c.variables)}
+        return set(self._index.get(variables, ()))
+
+
+    def _priority(self):
+        """
+        Get priority of constraints for priority based scheduling
+        policies.
+
+        Constraints with lower priority value are solved first.
+        """
+        if self.policy == 'depth':
+            return {c: -d for c, d in self._depth.items()}
+
+        # topological order of variables using iterative depth first
+        # search, variable is ordered after its successors are visited
+        succ = {}
+        for c in self._constraints:
+            v, *others = c.variables
+            succ.setdefault(v, []).extend(others)
+
+        order = []
+        visited = set()
+        for c in self._constraints:
+            v = c.variables[0]
+            if v in visited:
+                continue
+            visited.add(v)
+            stack = [(v, iter(succ.get(v, ())))]
+            while stack:
+                v, items = stack[-1]
+                for k in items:
+                    if k not in visited:
+                        visited.add(k)
+                        stack.append((k, iter(succ.get(k, ()))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(v)
+
+        rank = {v: i for i, v in enumerate(reversed(order))}
+        return {c: rank[c.variables[0]] for c in self._constraints}
 
 
     def solve(self):
         """
         Find solution for all constraints.
         """
-        # deque with set properties would be nice...
-        unsolved = deque(self._constraints)
+        if self.policy == 'fifo':
+            # deque with set properties would be nice...
+            unsolved = deque(self._constraints)
+            pop = unsolved.popleft
+            push = unsolved.extend
+        else:
+            priority = self._priority()
+            seq = itertools.count()
+            unsolved = [(priority[c], next(seq), c)
+                    for c in self._constraints]
+            heapq.heapify(unsolved)
+            pop = lambda: heapq.heappop(unsolved)[2]
+            def push(constraints):
+                for c in constraints:
+                    heapq.heappush(unsolved, (priority[c], next(seq), c))
         inque = set(self._constraints)
 
         t1 = time.time()
@@ -108,7 +235,7 @@ class Solver(object):
         kill = len(self._constraints) ** 2 # we won't accept O(n^2)
         while unsolved:
             
-            c = unsolved.popleft()    # get a constraint to solve...
+            c = pop()                 # get a constraint to solve...
             inque.remove(c)
             variables = c()           # ... and find solution
 
@@ -120,7 +247,7 @@ class Solver(object):
                 # skip constraints already being in unsolved queue
                 to_solve = deps - inque
 
-                unsolved.extend(to_solve)
+                push(to_solve)
                 inque.update(to_solve)
 
             self.count += 1
@@ -138,9 +265,19 @@ class Solver(object):
         # some stats follow
         t2 = time.time()
         k = len(self._constraints)
+        self.stats = {
+            'constraints': k,
+            'steps': self.count,
+            'time': t2 - t1,
+            'start': 'warm' if self.warm else 'cold',
+            'policy': self.policy,
+        }
         if __debug__:
-            fmt = 'k=constraints: {k}, steps: {c}, O(k log k)={O}, time: {t:.3f}'
-            log.debug(fmt.format(k=k, c=self.count, O=int(math.log(k, 2) * k), t=t2 -t1))
+            fmt = 'k=constraints: {k}, steps: {c}, O(k log k)={O},' \
+                ' time: {t:.3f}, start: {s}, policy: {p}'
+            log.debug(fmt.format(k=k, c=self.count,
+                O=int(math.log(k, 2) * k) if k else 0, t=t2 -t1,
+                s=self.stats['start'], p=self.policy))
 
 
 
@@ -160,6 +297,33 @@ class Constraint(object):
         self.variables = list(variables)
 
 
+    def key(self):
+        """
+        Get key of a constraint.
+
+        Constraints having equal keys are merged by constraint solver.
+        The key is tuple of constraint type, its variables and parameters.
+        """
+        return (type(self), tuple(self.variables)) + self.params()
+
+
+    def params(self):
+        """
+        Get constraint parameters, which are part of constraint key.
+        """
+        return ()
+
+
+    def merge(self, c):
+        """
+        Merge equal constraint into the constraint.
+
+        :Parameters:
+         c
+            Constraint having the same key as the constraint.
+        """
+
+
     def __call__(self):
         """
         Find solution for constraint's variables and return changed
@@ -359,6 +523,14 @@ class MinDistConstraint(RectConstraint):
         self.dist = dist
 
 
+    def merge(self, c):
+        """
+        Merge minimal distance constraint - the maximum distance is
+        kept.
+        """
+        self.dist = max(self.dist, c.dist)
+
+
 class MinHDist(MinDistConstraint):
     """
     Constraint to maintain minimal horizontal distance between two
@@ -409,6 +581,10 @@ class Within(Constraint):
         self.pad = pad
 
 
+    def params(self):
+        return tuple(self.pad)
+
+
     def __call__(self):
         changed = set()
         p = self.parent
@@ -434,6 +610,11 @@ class Between(Constraint):
     """
     Keep a rectangle between other rectangles.
 
+    The rectangle is centered between the right (bottom) edge of the
+    leftmost (topmost) rectangle and the left (top) edge of the
+    rightmost (bottommost) rectangle, i.e. interface of component
+    assembly is centered between the components.
+
     :Attributes:
      a
         Rectangle to be aligned.
@@ -447,21 +628,32 @@ class Between(Constraint):
 
 
     def __call__(self):
-        rects = sorted(self.others,
-            cmp=lambda a, b: cmp(a.pos.x + a.size.width, b.pos.x))
-        minx = rects[0]
-        maxx = rects[-1]
-
-        rects = sorted(self.others,
-            cmp=lambda a, b: cmp(a.pos.y + a.size.height, b.pos.y))
-        miny = rects[0]
-        maxy = rects[-1]
+        # find the edges with single scan of the rectangles
+        others = iter(self.others)
+        r = next(others)
+        x1 = x2 = r.pos.x
+        y1 = y2 = r.pos.y
+        x1 += r.size.width
+        y1 += r.size.height
+        for r in others:
+            pos = r.pos
+            size = r.size
+            if pos.x + size.width < x1:
+                x1 = pos.x + size.width
+            if pos.x > x2:
+                x2 = pos.x
+            if pos.y + size.height < y1:
+                y1 = pos.y + size.height
+            if pos.y > y2:
+                y2 = pos.y
 
-        x = (minx.pos.x + minx.size.width + maxx.pos.x) / 2.0
-        y = (miny.pos.y + miny.size.height + maxy.pos.y) / 2.0
-
-        self.a.pos.x = x - self.a.size.width / 2.0
-        self.a.pos.y = y - self.a.size.height / 2.0
+        a = self.a
+        x = (x1 + x2 - a.size.width) / 2.0
+        y = (y1 + y2 - a.size.height) / 2.0
+        if a.pos.x != x or a.pos.y != y:
+            a.pos.x = x
+            a.pos.y = y
+            return [a]
         return []
 
 
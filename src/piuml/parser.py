@@ -22,22 +22,71 @@ piUML language parser.
 """
 
 import lepl as P
-import re
+from lepl.matchers.matcher import Matcher
+import lepl.matchers.memo
+import lepl.stream.core
+from lepl.support.graph import preorder
+import hashlib
+import io
+import itertools
 import logging
+import os.path
+import pickle
+import re
+import sys
 
 from piuml.data import Diagram, Element, PackagingElement, \
         Relationship, Mult, Attribute, Operation, \
-        Section, Align, NELEMENTS, PELEMENTS, KEYWORDS
+        Section, Align, View, Span, SourceIndex, NELEMENTS, PELEMENTS, \
+        KEYWORDS, unwind
+from piuml.cache import default_cache
 
 log = logging.getLogger('piuml.parser')
 
+
+def _lepl_internal(obj, name):
+    """
+    Get internal attribute of lepl object.
+
+    None is returned if lepl does not provide the attribute (i.e. after
+    lepl upgrade), then the caller shall degrade to a slower method not
+    using lepl internals.
+
+    :Parameters:
+     obj
+        Lepl object or module.
+     name
+        Name of the attribute.
+    """
+    value = getattr(obj, name, None)
+    if value is None:
+        log.warning('lepl internal {} not available'.format(name))
+    return value
+
+
+_RMemo = _lepl_internal(lepl.matchers.memo, '_RMemo')
+_LMemo = _lepl_internal(lepl.matchers.memo, '_LMemo')
+_s_delta = _lepl_internal(lepl.stream.core, 's_delta')
+
+
+
 class ParseError(Exception):
     """
     piUML language parsing exception.
+
+    :Attributes:
+     msg
+        Error message.
+     line
+        Line number of the error in piUML source (if known).
+     col
+        Column number of the error in piUML source (if known).
     """
-    def __init__(self, msg):
+    def __init__(self, msg, line=None, col=None):
         super(ParseError, self).__init__(msg)
         self.msg = msg
+        self.line = line
+        self.col = col
 
 
 
@@ -103,12 +152,9 @@ def name_dequote(n):
     return n
 
 
-
-
-###
-### expr ::= fdifacedep
-### expr ::= assembly
-###
+RE_LEPL_POS = re.compile(r'line (\d+), character (\d+)')
+RE_INCLUDE = re.compile(r"""^include\s+("(?:[^"]|\\")+"|'(?:[^']|\\')+')\s*$""",
+        re.MULTILINE)
 RE_NAME = r""""(([^"]|\")+)"|'(([^']|\')+)'"""
 RE_ATTRIBUTE = r'^\s+::?\s*[^:](\w+|\[(\w+|\w+\.\.\w+)\])\s*($|:.+?$|=.+?$|\[(\w+|\w+\.\.\w+)\]$)'
 RE_ASSOCIATION_END = re.compile(r"""(?P<name>\w+)?\s* # attr name is optional
@@ -119,118 +165,6 @@ RE_ASSOCIATION_END = re.compile(r"""(?P<name>\w+)?\s* # attr name is optional
 
 
 
-def p_fdiface(self, args):
-    """
-    fdiface ::= FDIFACE SPACE NAME
-    fdiface ::= NAME SPACE FDIFACE
-    """
-    self._trim(args)
-    id = None
-    name = args[0].value
-    symbol = args[1].value
-    if args[0].type == 'FDIFACE':
-        symbol, name = name, symbol
-    n = IElement('fdiface', name)
-    n.data['symbol'] = symbol
-    n.data['dependency'] = None
-    n.data['assembly'] = None
-    n.data['lines'] = []
-    self.ast.cache[n.id] = n
-
-    self._set_parent('', n)
-    return n
-
-
-def p_assembly(self, args):
-    """
-    assembly ::= ID SPACE fdiface SPACE ID
-    assembly ::= ID SPACE assembly
-    assembly ::= assembly SPACE ID
-    """
-    self._trim(args)
-    error_fmt = 'Invalid id "%s" - component assembly allowed' \
-            ' between components only'
-
-    if len(args) == 3:
-        id1 = args[0].value
-        iface = args[1]
-        id2 = args[2].value
-
-        n1 = self.ast.cache[id1]
-        n2 = self.ast.cache[id2]
-
-        if n1.cls != 'component':
-            raise UMLError(error_fmt % n1.id)
-        if n2.cls != 'component':
-            raise UMLError(error_fmt % n2.id)
-
-        c1 = self._line('connector', n1, iface)
-        c2 = self._line('connector', iface, n2)
-        n = IElement('assembly')
-        n.data['interface'] = iface
-        iface.data['assembly'] = n
-        iface.data['lines'].extend((c1, c2))
-        return n
-    else:
-        if args[0].type == 'ID':
-            n = self.ast.cache[args[0].value]
-            assembly = args[1]
-            tail = n
-            iface = head = assembly.data['interface']
-        else:
-            assembly = args[0]
-            n = self.ast.cache[args[1].value]
-            iface = tail = assembly.data['interface']
-            head = n
-
-        if n.cls != 'component':
-            raise UMLError(error_fmt % n.id)
-
-        c = self._line('connector', tail, head)
-        iface.data['lines'].append(c)
-        return assembly
-
-
-def p_fdifacedep(self, args):
-    """
-    fdifacedep ::= ID SPACE fdiface
-    fdifacedep ::= fdiface SPACE ID
-    """
-    self._trim(args)
-#        print 'iface:', args[0].value, args[1].value, args[2].value
-
-    if args[0].type == 'ID':
-        id = args[0].value
-        iface = args[1]
-        tail = iface
-        head = self.ast.cache[id]
-    else:
-        iface = args[0]
-        id = args[1].value
-        tail = self.ast.cache[id]
-        head = iface
-
-    # truth matrix for dependency type
-    tmatrix = {
-        (True,  'o)'): 'realize',   # id--o)
-        (True,  '(o'): 'use',       # id--(o
-        (False, 'o)'): 'use',       # o)--id
-        (False, '(o'): 'realize',   # (o--id
-    }
-    
-    tid = args[0].type == 'ID'
-    s = tmatrix[(tid, iface.data['symbol'])]
-
-    n = self._line('dependency', tail, head, stereotypes=[s])
-
-    # link dependency and interface
-    n.data['supplier'] = iface
-    iface.data['dependency'] = n
-    iface.data['lines'].append(n)
-    return n
-
-
-
 class List(list):
     """
     Named list of parsed items.
@@ -244,17 +178,19 @@ class List(list):
 
 
 
-def f_list(name):
+def f_list(name, conv=None):
     """
     Create a named list of parsed items.
 
     :Parameters:
      name
         Name of a list.
+     conv
+        Optional function to convert parsed items.
     """
     def f(args):
         l = List(name)
-        l.extend(args)
+        l.extend(args if conv is None else map(conv, args))
         return l
     return f
 
@@ -285,6 +221,7 @@ def f_named(cls):
             del args[-1]
 
         c, id, name = args
+        c, id = sys.intern(c), sys.intern(id)
         name = name_dequote(name)
 
         if c in KEYWORDS:
@@ -308,15 +245,35 @@ def f_packaging(args):
     return parent
 
 
+def _gen_id(n, prefix):
+    """
+    Generate id of a node, which has no id specified in piUML source.
+
+    The ids are deterministic - parsing the same source generates the same
+    ids. The ids cannot clash with the ids specified by a user. The node
+    is marked as having generated id and returned.
+
+    :Parameters:
+     n
+        Node to set the id of.
+     prefix
+        Prefix of the id.
+    """
+    n.id = sys.intern('{}-{}'.format(prefix, next(__ids)))
+    n.generated = True
+    return n
+
+
 def _relationship(cls, tail, head, stereotypes=None, name=None, data=None):
     """
     Factory to create a relationship.
     """
-    return Relationship(cls,
+    r = Relationship(cls,
             __cache[tail], __cache[head],
             stereotypes=stereotypes,
             name=name,
             data=data)
+    return _gen_id(r, cls)
 
 
 def f_association(args):
@@ -406,29 +363,18 @@ def f_dependency(args):
 
     e = _relationship('dependency', args[0], args[-1], stereotypes=stereotypes)
     e.data['supplier'] = e.tail if v[0] == '<' else e.head
+    if s:
+        e.data['kind'] = s
 
-    if dt and dt in 'ime':
+    # fix the stereotype, legality of dependency is verified by
+    # validation stage (see `piuml.check.check_uml`)
+    if dt == 'i':
         t = e.tail.cls, e.head.cls
-        t_p = 'package', 'package'
-        t_u = 'usecase', 'usecase'
-
-        # fix the stereotype
-        if dt == 'i' and t == t_p:
+        if t == ('package', 'package'):
             e.stereotypes[0] = 'import'
-        elif dt == 'i' and t == t_u:
+        elif t == ('usecase', 'usecase'):
             e.stereotypes[0] = 'include'
 
-        if dt == 'i' and (t != t_p and t != t_u):
-            raise UMLError('Dependency -i> (package import or use case' \
-                ' inclusion) can be specified only' \
-                ' between two packages or two use cases')
-        elif dt == 'm' and t != t_p:
-            raise UMLError('Dependency -m> (package merge) can be' \
-                ' specified only between two packages')
-        elif dt == 'e' and t != t_u:
-            raise UMLError('Dependency -e> (use case extension) can be' \
-                ' specified only between two use cases')
-
     return e
 
 
@@ -448,12 +394,7 @@ def f_commentline(args):
     Factory to create comment line relationship.
     """
     log.debug('commentline {}'.format(args))
-    n = _relationship('commentline', args[0], args[-1])
-    # tail or head shall be comment
-    tail, head = n.tail, n.head
-    if not (tail.cls == 'comment') ^ (head.cls == 'comment'):
-        raise UMLError('One of comment line ends shall be comment')
-    return n
+    return _relationship('commentline', args[0], args[-1])
 
 
 def f_mult(args):
@@ -502,26 +443,91 @@ def f_operation(args):
     return Operation(args[0].strip())
 
 
+def f_align(args):
+    """
+    Factory to create alignment definition.
+    """
+    log.debug('align {}'.format(args))
+    # args[0] is alignment declaration: alignment type and optional id
+    atype, *aid = args[0]
+    if aid:
+        a = Align(sys.intern(atype), sys.intern(aid[0]))
+    else:
+        a = _gen_id(Align(sys.intern(atype)), 'align')
+    for id in args[1:]:
+        # elements take precedence over alignment definitions
+        if id not in __cache and id in __aligns:
+            a.nodes.append(__aligns[id])
+        else:
+            a.nodes.append(__cache[id])
+    __aligns[a.id] = a
+    return a
+
+
 def f_layout(args):
     """
     Factory to create diagram alignment information.
     """
     log.debug('layout {}'.format(args))
     s = Section('layout')
-    for st in args[1:]:
-        # st[0] is alignment declaration: alignment type and optional id
-        a = Align(*st[0])
-        for id in st[1:]:
-            a.nodes.append(__cache[id])
-        s.data.append(a)
-        __cache[a.id] = a
+    s.data.extend(args[1:])
     return s
 
 
-def create_parser():
-    global __cache
-    __cache = NodeCache()
+def f_view(args):
+    """
+    Factory to create diagram view.
+    """
+    log.debug('view {}'.format(args))
+    v = View(sys.intern(args[1]))
+    for a in args[2:]:
+        if isinstance(a, Align):
+            v.layout.data.append(a)
+        else:
+            v.nodes.append(__cache[a])
+    __cache[v.id] = v
+    return v
+
+
+def f_include(args):
+    """
+    Factory to insert nodes of included file.
+
+    Included files are loaded before a diagram is parsed (see `parse`),
+    therefore the nodes are only put in the place of include statement.
+    """
+    log.debug('include {}'.format(args))
+    path = os.path.join(__include.dir, name_dequote(args[0]))
+    return _emit(os.path.normpath(path))
+
+
+def f_span(stream_in, stream_out, results):
+    """
+    Factory to set position of parsed node in piUML source.
+
+    Position of a node is not set if lepl does not provide position of
+    its stream.
+    """
+    n = results[0]
+    if _s_delta is None:
+        return n
+
+    source, offset, line = __base
+    start, lineno, col = _s_delta(stream_in)
+    try:
+        end = _s_delta(stream_out)[0]
+    except StopIteration:
+        end = len(source)
+
+    # skip indentation of a line
+    while source[start] == ' ':
+        start += 1
+        col += 1
+    n.span = Span(offset + start, offset + end, line + lineno - 1, col)
+    return n
 
+
+def create_parser():
     Token = P.Token
     Or = P.Or
     Literal = P.Literal
@@ -540,7 +546,7 @@ def create_parser():
     stereotypes = ~Token('<<') & space[0:1] \
         & stereotype \
         & (~Token(' *, *') & stereotype)[0:] \
-        & space[0:1] & ~Token('>>') > f_list('stereotypes')
+        & space[0:1] & ~Token('>>') > f_list('stereotypes', sys.intern)
     eparams = space & id & (space & stereotypes)[0:1] & space & string
 
     nelement = joinl(NELEMENTS) & eparams
@@ -592,51 +598,639 @@ def create_parser():
     align_d  = (Token('top') | Token('right') | Token('bottom') \
                 | Token('left') | Token('middle') | Token('center')) \
                & (space & id)[0:1] > tuple
-    align = align_d & ~Token(':') & space[0:] & id & (space & id)[1:] > list
+    align = align_d & ~Token(':') & space[0:] & id & (space & id)[1:] > f_align
+    view = ~Token(':') & Token('view') & space & id & ~Token(':') \
+            & (space & id)[1:]
 
     statement = P.Delayed()
 
     empty = P.Line(P.Empty(), indent=False)
     comment = P.Line(Token('#.*'), indent=False)
-    rline = P.Line(relationship)
-
-    ablock = P.Line(association) \
-            & P.Block(P.Line(aend))[0:2] > f_association
-    nblock = P.Line(nelement) & P.Block(features)[0:1] > f_named(Element)
-    pblock = (P.Line(pelement) & P.Block(features)[0:1] > f_named(PackagingElement)) \
-            & P.Block(statement[1:])[0:1] > f_packaging
-    lblock = P.Line(layout) & P.Block(P.Line(align)[1:]) > f_layout
-
-    statement += (nblock | pblock | ablock | lblock \
+    rline = P.Line(relationship) ** f_span
+
+    ablock = (P.Line(association) \
+            & P.Block(P.Line(aend))[0:2] > f_association) ** f_span
+    nblock = (P.Line(nelement) & P.Block(features)[0:1] \
+            > f_named(Element)) ** f_span
+    pblock = ((P.Line(pelement) & P.Block(features)[0:1] > f_named(PackagingElement)) \
+            & P.Block(statement[1:])[0:1] > f_packaging) ** f_span
+    lblock = P.Line(layout) & P.Block((P.Line(align) ** f_span)[1:]) > f_layout
+    vblock = (P.Line(view) & P.Block((P.Line(align) ** f_span)[1:])[0:1] \
+            > f_view) ** f_span
+
+    iline = P.Apply(P.Line(~Token('include') & space & string), f_include,
+            raw=True)
+
+    statement += (nblock | pblock | ablock | lblock | vblock \
             | rline | ~comment | empty) > list
-    program = statement[:]
+    program = ((iline > list) | statement)[:]
 
     program.config.lines(block_policy=P.constant_indent(4))
     return program
 
 
+__cache = NodeCache()
+# alignment definitions have ids separate from ids of nodes
+__aligns = NodeCache()
+__ids = itertools.count(1)
 __parser = create_parser()
+__memos = None
+__base = '', 0, 1
+
+
+
+class IncludedFile(object):
+    """
+    Included piUML file.
+
+    Included file is parsed once per process, then its nodes are loaded
+    from pickled data when the file is included again.
+
+    :Attributes:
+     path
+        Absolute path of the file.
+     stamp
+        Modification time and size of the file.
+     hash
+        Hash of the content of the file.
+     includes
+        Paths of the files included by the file.
+     data
+        Pickled top-level nodes defined in the file.
+    """
+    def __init__(self, path, hash, includes, data):
+        self.path = path
+        self.stamp = None
+        self.hash = hash
+        self.includes = includes
+        self.data = data
+
+
+
+class Includes(object):
+    """
+    Files included by piUML diagram being parsed.
+
+    :Attributes:
+     dir
+        Directory against which relative paths of included files are
+        resolved.
+     paths
+        Paths of the files included directly by the diagram.
+     nodes
+        Top-level nodes of included files by file path.
+     foreign
+        Nodes defined in included files by node id.
+     aligns
+        Alignment definitions of included files by alignment id.
+     emitted
+        Paths of the files, which nodes are put in the diagram.
+    """
+    def __init__(self, dir, paths=()):
+        self.dir = dir
+        self.paths = list(paths)
+        self.nodes = {}
+        self.foreign = {}
+        self.aligns = {}
+        self.emitted = set()
+
+
+
+class IncludePickler(pickle.Pickler):
+    """
+    Pickler of nodes of included file.
+
+    Nodes and alignment definitions defined in other included files and
+    diagram are stored as references, which are resolved when nodes are
+    loaded.
+    """
+    def __init__(self, f, foreign, aligns):
+        super(IncludePickler, self).__init__(f, pickle.HIGHEST_PROTOCOL)
+        self.foreign = foreign
+        self.aligns = aligns
+
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Diagram):
+            return ('diagram',)
+        if isinstance(obj, (Element, View)) \
+                and self.foreign.get(obj.id) is obj:
+            return ('node', obj.id)
+        if isinstance(obj, Align) and self.aligns.get(obj.id) is obj:
+            return ('align', obj.id)
+        return None
+
 
 
-def parse(f):
+class IncludeUnpickler(pickle.Unpickler):
     """
+    Unpickler of nodes of included file.
+
+    References to nodes and alignment definitions defined in other
+    included files are resolved with nodes cache and alignment
+    definitions cache.
+    """
+    def __init__(self, f, cache, aligns):
+        super(IncludeUnpickler, self).__init__(f)
+        self.cache = cache
+        self.aligns = aligns
+
+
+    def persistent_load(self, pid):
+        if pid[0] == 'diagram':
+            return None
+        if pid[0] == 'align':
+            return self.aligns[pid[1]]
+        return self.cache[pid[1]]
+
+
+
+# included files parsed in this process by file path
+__files = {}
+__include = Includes(os.getcwd())
+
+
+def _nodes(nodes):
+    """
+    Iterate over nodes and all their descendants including alignment
+    definitions.
+    """
+    for n in nodes:
+        for k in unwind(n):
+            if isinstance(k, Section):
+                yield from k.data
+            elif isinstance(k, View):
+                yield k
+                yield from k.layout.data
+            else:
+                yield k
+
+
+def _intern(nodes):
+    """
+    Intern ids, element classes, stereotypes and alignment types of nodes
+    loaded from pickled data.
+
     :Parameters:
-     f
-        File to load diagram description from.
+     nodes
+        Collection of nodes.
     """
-    __cache.clear()
+    intern = sys.intern
+    for n in _nodes(nodes):
+        n.id = intern(n.id)
+        if isinstance(n, Element):
+            n.cls = intern(n.cls)
+            if n.stereotypes:
+                n.stereotypes[:] = map(intern, n.stereotypes)
+        elif isinstance(n, Align):
+            n.type = intern(n.type)
+
+
+def _find_includes(source, dir, stack, errors=None):
+    """
+    Find and load files included by piUML source.
+
+    List of paths of included files is returned.
+
+    :Parameters:
+     source
+        piUML source.
+     dir
+        Directory against which relative paths are resolved.
+     stack
+        Paths of files being included.
+     errors
+        List of parsing errors to be updated.
+    """
+    paths = []
+    for m in RE_INCLUDE.finditer(source):
+        path = os.path.join(dir, name_dequote(m.group(1)))
+        path = os.path.normpath(path)
+        try:
+            if path in stack:
+                raise ParseError('Cyclic inclusion of file "{}"'.format(path))
+            _load(path, stack)
+            paths.append(path)
+        except (OSError, IOError, ParseError) as ex:
+            msg = ex.msg if isinstance(ex, ParseError) else str(ex)
+            if isinstance(ex, ParseError) and ex.line is not None:
+                msg = '{}, line {}'.format(msg, ex.line)
+            line = source.count('\n', 0, m.start()) + 1
+            ex = ParseError('Cannot include file "{}": {}'.format(path, msg),
+                    line, 1)
+            if errors is None:
+                raise ex
+            errors.append(ex)
+    return paths
+
+
+def _load(path, stack):
+    """
+    Load included file.
+
+    The file is parsed if it is not parsed yet or it has changed since
+    last parsing. Modification time and size of the file are checked
+    first, then hash of the file content.
+
+    :Parameters:
+     path
+        Absolute path of the file.
+     stack
+        Paths of files being included.
+    """
+    st = os.stat(path)
+    stamp = st.st_mtime, st.st_size
+    f = __files.get(path)
+    if f is not None and f.stamp == stamp:
+        # files included by the file might have changed
+        for p in f.includes:
+            if p in stack:
+                raise ParseError('Cyclic inclusion of file "{}"'.format(p))
+            _load(p, stack + (path,))
+        return f
+
+    with open(path) as fin:
+        source = fin.read()
+    hash = hashlib.sha1(source.encode('utf-8')).hexdigest()
+    if f is None or f.hash != hash:
+        if __debug__:
+            log.debug('parse included file {}'.format(path))
+        ast, include = _parse_diagram(source, path, False, None, stack)
+        emitted = set(id(n) for p in include.emitted
+                for n in include.nodes[p])
+        nodes = [n for n in ast if id(n) not in emitted]
+        nodes.extend(v for v in ast.views.values() if id(v) not in emitted)
+
+        data = io.BytesIO()
+        IncludePickler(data, include.foreign, include.aligns).dump(nodes)
+        f = IncludedFile(path, hash, include.paths, data.getvalue())
+    f.stamp = stamp
+    __files[path] = f
+    return f
+
+
+def _closure(paths):
+    """
+    Find all files included by the files (recursively).
+
+    The files are returned in order of loading - a file is preceded by
+    the files it includes.
+
+    :Parameters:
+     paths
+        Paths of included files.
+    """
+    files = []
+    def visit(p):
+        if p not in files:
+            for k in __files[p].includes:
+                visit(k)
+            files.append(p)
+    for p in paths:
+        visit(p)
+    return files
+
+
+def _load_nodes(include, files):
+    """
+    Load nodes of included files.
+
+    The nodes are loaded from pickled data, ids generated by parser are
+    regenerated to be unique in the diagram and nodes are stored in nodes
+    cache.
+
+    :Parameters:
+     include
+        Files included by parsed diagram.
+     files
+        Paths of included files in order of loading.
+    """
+    for p in files:
+        data = io.BytesIO(__files[p].data)
+        try:
+            nodes = IncludeUnpickler(data, __cache, __aligns).load()
+            _intern(nodes)
+            for n in _nodes(nodes):
+                # views have no generated ids
+                if getattr(n, 'generated', False):
+                    _gen_id(n, n.id.rsplit('-', 1)[0])
+                if isinstance(n, Align):
+                    __aligns[n.id] = n
+                    include.aligns[n.id] = n
+                elif not isinstance(n, Relationship):
+                    __cache[n.id] = n
+                    include.foreign[n.id] = n
+        except ParseError as ex:
+            raise ParseError('Cannot include file "{}": {}'.format(p, ex.msg))
+        include.nodes[p] = nodes
+
+
+def _emit(path):
+    """
+    Get nodes of included file and of files included by the file, which
+    are not put in the diagram yet.
+
+    :Parameters:
+     path
+        Path of included file.
+    """
+    nodes = []
+    if path in __include.emitted or path not in __include.nodes:
+        return nodes
+    __include.emitted.add(path)
+    for p in __files[path].includes:
+        nodes.extend(_emit(p))
+    nodes.extend(__include.nodes[path])
+    return nodes
+
+
+
+def _chunks(source):
+    """
+    Split piUML source into top-level statements.
+
+    A top-level statement starts at a line, which is not indented. Empty
+    and indented lines belong to preceding top-level statement.
+
+    Line number of first line of a statement and text of the statement
+    is returned for each top-level statement.
+
+    :Parameters:
+     source
+        piUML source as string.
+    """
+    start = None
+    lines = []
+    for i, line in enumerate(source.splitlines(True), 1):
+        if line[:1].strip():
+            if start is not None:
+                yield start, ''.join(lines)
+            start = i
+            lines = []
+        lines.append(line)
+    if start is not None:
+        yield start, ''.join(lines)
+
+
+def _parse(source, line=1, offset=0):
+    """
+    Parse piUML source with lepl based parser.
+
+    Lepl exceptions are converted into `ParseError` exception. Line
+    number is set for all parsing exceptions.
+
+    :Parameters:
+     source
+        piUML source as string.
+     line
+        Line number of first line of the source.
+     offset
+        Offset of the source in piUML file.
+    """
+    global __base
+    __base = source, offset, line
+    error = None
     try:
-        if isinstance(f, str):
-            nodes = __parser.parse(f)
+        nodes = __parser.parse(source)
+    except (P.FullFirstMatchException, P.RuntimeLexerError) as ex:
+        msg = str(ex)
+        m = RE_LEPL_POS.search(msg)
+        if m:
+            lineno = line + int(m.group(1)) - 1
+            col = int(m.group(2))
+            msg = '{}line {}, character {}{}'.format(msg[:m.start()],
+                    lineno, col, msg[m.end():])
+            error = ParseError(msg, lineno, col)
+        else:
+            error = ParseError(msg, line)
+    except ParseError as ex:
+        error = ex
+        if error.line is None:
+            error.line = line
+
+    if error is not None:
+        # traceback of the error references generators of the parser,
+        # drop it, so they are finalized when parser is reset
+        error.__traceback__ = None
+        error.__context__ = None
+    _reset_parser()
+
+    if error is not None:
+        raise error
+    return nodes
+
+
+def _memo_tables(matcher):
+    """
+    Get memoization tables of lepl parser.
+
+    None is returned if the tables are not available.
+
+    :Parameters:
+     matcher
+        Lepl matcher of the parser.
+    """
+    if _RMemo is None or _LMemo is None:
+        return None
+
+    tables = []
+    for m in preorder(matcher, Matcher):
+        if isinstance(m, _RMemo):
+            names = ('_RMemo__table',)
+        elif isinstance(m, _LMemo):
+            names = ('_LMemo__table', '_LMemo__depth')
         else:
-            # parse_file is causing problems at the moment
-            nodes = __parser.parse(''.join(f))
-    except P.FullFirstMatchException as ex:
-        raise ParseError(str(ex))
-    except P.RuntimeLexerError as ex:
-        raise ParseError(str(ex))
-
-    return Diagram((k[0] for k in nodes if k != []))
+            continue
+        for name in names:
+            t = _lepl_internal(m, name)
+            if t is None:
+                return None
+            tables.append(t)
+    return tables
+
+
+def _reset_parser():
+    """
+    Reset state of lepl parser after parsing.
+
+    Lepl keeps generators of a parser in memoization tables. Some of the
+    generators are not finished (i.e. when parsing fails or alternative
+    matches are not evaluated) and lepl block matchers do not restore
+    their state (i.e. indentation level), which causes next parsing to
+    fail. Therefore, memoization tables are cleared, so the generators
+    are finalized. This also releases memory used by the tables.
+
+    If the memoization tables are not available, then new parser is
+    created.
+    """
+    global __memos, __parser
+    if __memos is None:
+        # False if memoization tables are not available
+        __memos = _memo_tables(__parser.get_match().matcher) or False
+
+    if __memos is False:
+        __parser = create_parser()
+    else:
+        for t in __memos:
+            t.clear()
+
+
+def _parse_recover(source, index, errors):
+    """
+    Parse piUML source and recover from parsing errors.
+
+    When an error is found, then parser resynchronizes at the next
+    top-level statement. Nodes of the invalid statement are discarded.
+
+    :Parameters:
+     source
+        piUML source as string.
+     index
+        Index of piUML source.
+     errors
+        List of parsing errors to be updated.
+    """
+    nodes = []
+    for line, chunk in _chunks(source):
+        sizes = [(c, len(c)) for c in (__cache, __aligns)]
+        try:
+            nodes.extend(_parse(chunk, line, index.offset(line)))
+        except ParseError as ex:
+            # forget nodes of invalid statement
+            for c, size in sizes:
+                for k in list(c)[size:]:
+                    del c[k]
+            errors.append(ex)
+    return nodes
+
+
+def _parse_diagram(source, path, cache, errors, stack=()):
+    """
+    Parse piUML source and files included by it.
+
+    Tuple of parsed diagram and files included by the diagram is returned.
+    The included files are `None` if parsed diagram is loaded from the
+    cache.
+
+    Parsed diagram is stored in the cache only if no errors are found, so
+    the cache is used in error recovery mode as well.
+
+    :Parameters:
+     source
+        piUML source.
+     path
+        Path of piUML file or `None`.
+     cache
+        Use cache of parsed diagrams if true.
+     errors
+        List of parsing errors or `None`.
+     stack
+        Paths of files being included.
+    """
+    global __ids, __include
+
+    if path is None:
+        dir = os.getcwd()
+    else:
+        path = os.path.abspath(path)
+        dir = os.path.dirname(path)
+        stack = stack + (path,)
+
+    # included files are parsed before parser state is reset for the
+    # diagram
+    size = 0 if errors is None else len(errors)
+    paths = _find_includes(source, dir, stack, errors)
+    files = _closure(paths)
+
+    # diagram with invalid included files is not cached
+    cache = cache and (errors is None or len(errors) == size)
+    if cache:
+        ast_cache = default_cache()
+        key = ast_cache.key(source, *(__files[p].hash for p in files))
+        ast = ast_cache.get(key)
+        if ast is not None:
+            _intern(itertools.chain([ast], ast.views.values()))
+            return ast, None
+
+    __cache.clear()
+    __aligns.clear()
+    __ids = itertools.count(1)
+    __include = include = Includes(dir, paths)
+    _load_nodes(include, files)
+
+    index = SourceIndex(source)
+    if errors is None:
+        nodes = _parse(source)
+    else:
+        nodes = _parse_recover(source, index, errors)
+
+    nodes = [n for k in nodes for n in k]
+    ast = Diagram(n for n in nodes if not isinstance(n, View))
+    ast.views.update((n.id, n) for n in nodes if isinstance(n, View))
+
+    # nodes of included files have no position in the source
+    included = set(id(n) for k in include.nodes.values() for n in k)
+    index.add(_nodes(n for n in nodes if id(n) not in included))
+    ast.index = index
+    if cache and (errors is None or len(errors) == size):
+        ast_cache.put(key, ast)
+    return ast, include
+
+
+def parse(f, cache=True, errors=None, path=None, validate=True):
+    """
+    Parse diagram written in piUML language.
+
+    If cache is enabled, then parsed diagram is loaded from the cache of
+    parsed diagrams (see `piuml.cache`) when piUML source and files
+    included by it have not changed.
+
+    If list of errors is specified, then parser recovers from syntax and
+    UML semantics errors. All errors are appended to the list and
+    partial diagram is returned.
+
+    Position in piUML source is set for parsed elements, relationships
+    and alignment definitions. Source index of the diagram maps between
+    source positions and the nodes (see `piuml.data.SourceIndex`).
+
+    Included files are parsed once per process. Relative paths of
+    included files are resolved against directory of the parsed file or
+    current directory if path of the file is unknown.
+
+    Parsed diagram is validated against UML semantics rules (see
+    `piuml.check.check_uml`) unless validation is disabled, i.e. for
+    trusted, generated piUML source. In error recovery mode, invalid
+    relationships are removed from the diagram.
+
+    :Parameters:
+     f
+        File to load diagram description from.
+     cache
+        Use cache of parsed diagrams if true.
+     errors
+        List of parsing errors.
+     path
+        Path of the file (taken from file object by default).
+     validate
+        Validate parsed diagram if true.
+    """
+    # check module depends on parser errors
+    from piuml.check import check_uml
+
+    if path is None:
+        path = getattr(f, 'name', None)
+
+    # parse_file is causing problems at the moment
+    source = f if isinstance(f, str) else ''.join(f)
+    size = 0 if errors is None else len(errors)
+    ast, _ = _parse_diagram(source, path, cache, errors)
+    if validate:
+        for r in check_uml(ast, errors):
+            r.parent.children.remove(r)
+    if errors:
+        errors[size:] = sorted(errors[size:],
+                key=lambda e: 0 if e.line is None else e.line)
+    return ast
 
 
 # vim: sw=4:et:ai
@@ -17,12 +17,134 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+
 """
 piUML renderer.
+
+Renderers are registered by file type, see `register` and `renderer`
+functions. Renderer modules are imported on demand, so a renderer, which
+does not use Cairo at draw time, can be used without Cairo module if
+diagram is measured already (i.e. it is loaded from layout checkpoint
+file).
+
+Renderer class is derived from `Renderer` class and provides
+
+measure(ast)
+    Calculate minimal size of all diagram nodes.
+render(ast)
+    Render diagram into `output` of `filetype` type or into each output
+    of `outputs` list of pairs of file type and output.
+
+The output is file name or writable file object, unless a renderer of a
+file type writes into files only (see `files_only`).
 """
 
-from piuml.renderer.cr import CairoRenderer as Renderer
-#from piuml.renderer.mp import MRenderer as Renderer
+import importlib
+
+# renderers by file type: renderer module, renderer class name, file
+# name extension and files only flag
+RENDERERS = {}
+
+def register(filetype, module, name, ext=None, files=False):
+    """
+    Register renderer of a file type.
+
+    :Parameters:
+     filetype
+        Type of a file.
+     module
+        Name of renderer module.
+     name
+        Name of renderer class.
+     ext
+        File name extension (file type by default).
+     files
+        Renderer writes into files only (i.e. multiple files per
+        diagram), it does not support file objects.
+    """
+    RENDERERS[filetype] = module, name, filetype if ext is None else ext, \
+        files
+
+
+def renderer(filetype):
+    """
+    Get renderer class of a file type.
+
+    ValueError is raised for unknown file type.
+
+    :Parameters:
+     filetype
+        Type of a file.
+    """
+    if filetype not in RENDERERS:
+        raise ValueError('Unknown file type "{}"'.format(filetype))
+    module, name, ext, files = RENDERERS[filetype]
+    return getattr(importlib.import_module(module), name)
+
+
+def extension(filetype):
+    """
+    Get file name extension of a file type.
+
+    :Parameters:
+     filetype
+        Type of a file.
+    """
+    return RENDERERS[filetype][2] if filetype in RENDERERS else filetype
 
-# vim: sw=4:et:ai
 
+def files_only(filetype):
+    """
+    Check if renderer of a file type writes into files only.
+
+    :Parameters:
+     filetype
+        Type of a file.
+    """
+    return filetype in RENDERERS and RENDERERS[filetype][3]
+
+
+
+
+
+class Renderer(object):
+    """
+    Base class of renderers.
+
+    :Attributes:
+     output
+        Output file name or writable file object.
+     filetype
+        Type of output file.
+     outputs
+        List of pairs of file type and output (see `output`).
+    """
+    def __init__(self):
+        super(Renderer, self).__init__()
+        self.output = None
+        self.filetype = None
+        self.outputs = []
+
+
+    def all_outputs(self):
+        """
+        Get list of pairs of file type and output to render diagram into.
+
+        The `outputs` list is returned. If the list is empty, then the
+        pair of `filetype` and `output` is returned.
+        """
+        if self.outputs:
+            return self.outputs
+        return [(self.filetype, self.output)]
+
+
+
+register('pdf', 'piuml.renderer.cr', 'CairoRenderer')
+register('png', 'piuml.renderer.cr', 'CairoRenderer')
+register('svg', 'piuml.renderer.cr', 'CairoRenderer')
+register('svg-native', 'piuml.renderer.svg', 'SVGRenderer', 'svg')
+register('png-tiled', 'piuml.renderer.tile', 'TiledRenderer', 'png')
+register('dzi', 'piuml.renderer.tile', 'PyramidRenderer', files=True)
+register('geometry', 'piuml.renderer.geometry', 'GeometryRenderer', 'json')
+
+# vim: sw=4:et:ai
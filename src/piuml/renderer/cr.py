@@ -24,132 +24,94 @@ Drawing routines are adapted from Gaphas and Gaphor source code.
 """
 
 import cairo
-from gi.repository import Pango
 
-import sys
 import os
-from io import BytesIO
 from math import ceil, floor, pi
-from functools import partial
 
-from piuml.data import MWalker, Element, PackagingElement, KEYWORDS
-from piuml.style import Size, Pos, Style, Area
+from piuml.data import MWalker
+from piuml.style import Size
+from piuml.renderer.draw import Drawer, LINE_PAD
 from piuml.renderer.text import *
-from piuml.renderer.shape import *
-from piuml.renderer.line import *
-from piuml.renderer.util import st_fmt
+from piuml.renderer.util import st_fmt, BBox, _name, _is_packaging, _features
 
 import logging
 log = logging.getLogger('piuml.renderer.cr')
 
-def _name(node, bold=True, underline=False, fmt='{}', skip_keyword=False):
-    texts = []
-    if node.stereotypes:
-        k = 0
-        if skip_keyword and node.stereotypes[0] in KEYWORDS:
-            k = 1
-        if k == 0 or len(node.stereotypes) > 2:
-            texts.append('<span size="small">{}</span>' \
-                    .format(st_fmt(node.stereotypes[k:])))
-    name = node.name.replace('\\n', '\n')
-    if name:
-        name = fmt.format(name)
-        if bold:
-            name = '<b>{}</b>'.format(name)
-        if underline:
-            name = '<u>{}</u>'.format(name)
-        texts.append(name)
-    return '\n'.join(texts)
+# Cairo colors by name
+COLORS = {
+    'white': (1, 1, 1),
+    'black': (0, 0, 0),
+}
 
+# Pango alignment of text lines
+ALIGNMENTS = {
+    'left': pango.Alignment.LEFT,
+    'center': pango.Alignment.CENTER,
+}
 
-def _is_packaging(node):
-    return isinstance(node, PackagingElement) and len(node) > 0
-
-
-def _features(node, ft):
-    return '\n'.join(str(f) for f in node.data[ft])
-
-
-def _head_size(style):
-    ph = style.padding.top + style.padding.bottom
-    height = style.size.height
-
-    k = len(style.compartment) - 1
-    return height - k * ph - sum(style.compartment[1:])
-
-
-class CairoBBContext(object):
+def draw_path(cr, path):
     """
-    Delegate all calls to the wrapped CairoBoundingBoxContext, intercept
-    ``stroke()``, ``fill()`` and a few others so the bounding box of the
-    item involved can be calculated.
+    Add path (see `piuml.renderer.shape`) to current path of Cairo
+    context.
+
+    :Parameters:
+     cr
+        Cairo context.
+     path
+        Path to add.
     """
+    for cmd in path:
+        k = cmd[0]
+        if k == 'M':
+            cr.move_to(*cmd[1:])
+        elif k == 'L':
+            cr.line_to(*cmd[1:])
+        elif k == 'Z':
+            cr.close_path()
+        elif k == 'R':
+            cr.rectangle(*cmd[1:])
+        elif k == 'A':
+            cr.new_sub_path()
+            cr.arc(*cmd[1:])
+        elif k == 'E':
+            x, y, r1, r2 = cmd[1:]
+            cr.save()
+            cr.translate(x, y)
+            cr.scale(r1, r2)
+            cr.new_sub_path()
+            cr.arc(0.0, 0.0, 1.0, 0.0, 2.0 * pi)
+            cr.close_path()
+            cr.restore()
+        else:
+            assert False, 'unknown path command {}'.format(k)
 
-    def __init__(self, cr):
-        self._cr = cr
-        self.bbox = (sys.maxsize, sys.maxsize, 0, 0)
-
-    def __getattr__(self, key):
-        return getattr(self._cr, key)
-
-    def _update_bbox(self, bbox):
-        if bbox == (0, 0, 0, 0):
-            return
-        x1, y1, x2, y2 = bbox
-        xb1, yb1, xb2, yb2 = self.bbox
-        self.bbox = min(x1, xb1), min(y1, yb1), max(x2, xb2), max(y2, yb2)
-
-
-    def _bbox(self, f):
-        """
-        Calculate the bounding box for a given drawing operation.
-        if ``line`` is True, the current line-width is taken into account.
-        """
-        cr = self._cr
-        cr.save()
-        cr.identity_matrix()
-        bbox = f()
-        cr.restore()
-        self._update_bbox(bbox)
-        return bbox
-
-    def fill(self):
-        """
-        Interceptor for Cairo drawing method.
-        """
-        cr = self._cr
-        self._bbox(cr.fill_extents)
-        cr.fill()
-
-    def fill_preserve(self):
-        """
-        Interceptor for Cairo drawing method.
-        """
-        cr = self._cr
-        self._bbox(cr.fill_extents)
-        cr.fill_preserve()
-
-    def stroke(self, b=None):
-        """
-        Interceptor for Cairo drawing method.
-        """
-        cr = self._cr
-        self._bbox(cr.stroke_extents)
-        cr.stroke()
 
-    def stroke_preserve(self):
-        """
-        Interceptor for Cairo drawing method.
-        """
-        cr = self._cr
-        self._bbox(cr.stroke_extents)
-        cr.stroke_preserve()
+class DiagramContext(cairo.Context):
+    """
+    Cairo context of a diagram.
+
+    The bounding box of a diagram is calculated by the renderer from
+    known geometry of drawn shapes, lines and texts, so Cairo calls are
+    not intercepted. The geometry is added to the bounding box in user
+    coordinates of the diagram (coordinates of the layout), independently
+    of transformation of the context.
+
+    Pango layouts of the context are reused, there is one layout per font
+    (see `piuml.renderer.text.pango_layout`).
+
+    :Attributes:
+     bbox
+        Bounding box of the diagram in user coordinates of the diagram.
+     layouts
+        Pango layouts of the context.
+     text
+        Draw texts if true.
+    """
+    def __init__(self, target):
+        self.bbox = BBox()
+        self.layouts = {}
+        self.text = True
 
-    def show_text(self, txt):
-        """
-        Interceptor for Cairo drawing method.
-        """
-        raise NotImplemented()
 
 
 class CairoDimensionCalculator(MWalker):
@@ -159,7 +121,7 @@ class CairoDimensionCalculator(MWalker):
     def __init__(self):
         super(CairoDimensionCalculator, self).__init__()
         self.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 100, 100)
-        self.cr = CairoBBContext(cairo.Context(self.surface))
+        self.cr = DiagramContext(self.surface)
 
 
     def calc(self, n):
@@ -276,7 +238,7 @@ class CairoDimensionCalculator(MWalker):
 
 
 
-class CairoRenderer(MWalker):
+class CairoRenderer(Drawer):
     """
     Node renderer using Cairo.
     """
@@ -285,7 +247,6 @@ class CairoRenderer(MWalker):
         self.calc = CairoDimensionCalculator()
         self.surface = None
         self.cr = None
-        self.output = None
         self.filetype = 'pdf'
 
 
@@ -308,185 +269,45 @@ class CairoRenderer(MWalker):
          ast
             Diagram start node.
 
+        The diagram is drawn once and the drawing is saved into each
+        output file.
+
         .. seealso::
             CairoRenderer.output
             CairoRenderer.filetype
+            CairoRenderer.outputs
             
         """
         self.preorder(ast)
         self.save_diagram(ast)
 
 
-    def _compartment(self, parent, features, y0, title=None):
-        cr = self.cr
-        pos = x, y = parent.style.pos
-        size = width, height = parent.style.size
-        pad = parent.style.padding
-
-        if title:
-            features = title + features
-        if features:
-            cr.move_to(x, y + y0)
-            cr.line_to(x + width, y + y0)
-            draw_text(cr, parent.style.size, parent.style,
-                    features, pos=(0, y0), align=(-1, -1))
-
-
-    def v_element(self, node):
-        if node.parent.cls == 'align':
-            return
-        style = node.style
-        pos = x, y = style.pos
-        width, height = size = style.size
-        pad = style.padding
-        iw, ih = style.icon_size
-
-        align = (0, 0)
-        outside = False
-        underline = False
-        lalign = pango.Alignment.CENTER
-        bold = True
-        xskip = 0
-        yskip = 0
-
+    def _stroke(self, path, width=None, fill=None, dash=None, join=False):
         cr = self.cr
         cr.save()
-
-        if _is_packaging(node):
-            align = (0, -1)
-
-        if node.cls in ('node', 'device'):
-            draw_box3d(cr, pos, size)
-        elif node.cls in ('package', 'profile'):
-            draw_tabbed_box(cr, pos, size)
-            yskip = 20
-        elif node.cls == 'usecase':
-            align = (0, 0)
-
-            r1 = size.width / 2.0
-            r2 = size.height / 2.0
-            x0 = pos.x + r1
-            y0 = pos.y + r2
-            draw_ellipse(cr, (x0, y0), r1, r2)
-        elif node.cls == 'actor':
-            align = (0, 1)
-            outside = True
-            draw_human(cr, pos, size)
-        elif node.cls == 'comment':
-            draw_note(cr, pos, size)
-            lalign = pango.Alignment.LEFT
-            bold = False
-        elif node.cls in ('instance', 'artifact'):
-            underline = True
-            cr.rectangle(x, y, width, height)
-            cr.stroke()
-        else:
-            cr.rectangle(x, y, width, height)
-            cr.stroke()
-
-        # draw icons
-        if node.cls in ('artifact', 'component'):
-            x0 = x + width - iw - pad.top
-            y0 = y + pad.top
-            if node.cls == 'artifact':
-                draw_artifact(cr, (x0, y0), (iw, ih))
-            else:
-                draw_component(cr, (x0, y0), (iw, ih))
-            xskip = -(iw + pad.top) / 2.0
-
-        name = _name(node, bold, underline)
-
-        # calculate height of name from compartment data
-        tskip = _head_size(style)
-        log.debug('element {} allocated head height {}'.format(name, tskip))
-
-        draw_text(cr, (width, tskip), style,
-                name,
-                lalign=lalign,
-                pos=(xskip, yskip),
-                align=align, outside=outside)
-
-        nc = 1
-        attrs = _features(node, 'attributes')
-        if attrs:
-            self._compartment(node, attrs, tskip)
-            tskip += style.compartment[nc] + pad.top + pad.bottom
-            nc += 1
-
-        opers = _features(node, 'operations')
-        if opers:
-            self._compartment(node, opers, tskip)
-            tskip += style.compartment[nc] + pad.top + pad.bottom
-            nc += 1
-
-        for f in node.data['stattrs']:
-            title = st_fmt([f.name]) + '\n' 
-            attrs = '\n'.join(a.name for a in f)
-            self._compartment(node, attrs, tskip, title)
-            tskip += style.compartment[nc] + pad.top + pad.bottom
-            nc += 1
-
-        cr.restore()
-
-    v_packagingelement = v_element
-
-    def v_ielement(self, n):
-        cr = self.cr
-        x, y = n.style.pos
-        width, height = n.style.size
-        nose = 2
-        x0 = x + width / 2.0
-        y0 = y + height / 2.0
-        angle = pi / 2.0
-
-        is_assembly = n.data['assembly'] is not None
-        if is_assembly:
-            is_usage = False
-            if n.data['symbol'] == 'o)':
-                angle = -angle
-        else:
-            dep = n.data['dependency']
-            is_usage = 'use' in dep.stereotypes
-            if dep.tail is n:
-                angle = -angle
-
-        #
-        # draw provided/required or assembly interface icons
-        #
-
-        # icon drawing functions
-        draw_provided = partial(cr.arc, x0, y0, width / 2.0 - nose * 3, 0, pi * 2.0)
-        draw_required = partial(cr.arc, x0, y0, height / 2.0 - nose, angle, pi + angle)
-
-        # draw nose
-        cr.move_to(x, y0)
-        cr.line_to(x + nose, y0)
-        cr.move_to(x + width - nose * 3, y0)
-        cr.line_to(x + width, y0)
+        if width is not None:
+            cr.set_line_width(width)
+        if dash is not None:
+            cr.set_dash(dash, 0)
+        if join:
+            cr.set_line_join(cairo.LINE_JOIN_ROUND)
+        draw_path(cr, path)
+        if fill is not None:
+            color = cr.get_source()
+            cr.set_source_rgb(*COLORS[fill])
+            cr.fill_preserve()
+            cr.set_source(color)
         cr.stroke()
+        cr.restore()
 
-        # draw icons
-        if is_usage or is_assembly:
-            cr.save()
-            draw_required()
-            cr.stroke()
-            cr.restore()
-        if not is_usage or is_assembly:
-            cr.save()
-            draw_provided()
-            cr.stroke()
-            cr.restore()
 
-        # draw interface name
-        draw_text(cr, n.style.size, n.style, n.name, align=(0, 1), outside=True)
+    def _text(self, shape, style, text, lalign='left', **kw):
+        return draw_text(self.cr, shape, style, text,
+            lalign=ALIGNMENTS[lalign], **kw)
 
 
-    def v_relationship(self, n):
-        t = '_' + n.cls
-        if n.cls == 'extension':
-            t = '_association'
-        f = getattr(self, t)
-        f(n)
+    def _bbox(self):
+        return self.cr.bbox
 
 
     def v_nodegroup(self, n):
@@ -504,192 +325,103 @@ class CairoRenderer(MWalker):
             cr.set_line_width(1.0)
             cr.set_source_rgb(1.0, 0, 0)
             cr.rectangle(x, y, width, height)
+            cr.bbox.add_rect(x, y, width, height, LINE_PAD)
             draw_text(cr, n.style.size, n.style, n.id, align=(-1, -1))
             cr.stroke()
             cr.restore()
 
 
-    def _connector(self, n):
-        self._draw_line(n)
+    def v_diagram(self, n):
+        # the diagram is drawn on unbounded recording surface to find its
+        # bounding box, then the recording is replayed on output surface
+        self.surface = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+        self.cr = DiagramContext(self.surface)
+        self.cr.save()
 
 
-    def _commentline(self, node):
-        """
-        Draw comment line between elements.
+    def _check_bbox(self, bbox):
         """
-        self._draw_line(node, dash=(7.0, 5.0))
-
-
-    def _generalization(self, n):
-        if n.data['supplier'] is n.head:
-            self._draw_line(n, draw_head=draw_head_triangle)
-        else:
-            self._draw_line(n, draw_tail=draw_tail_triangle)
-
-
-    def _dependency(self, n):
-        supplier = n.data['supplier']
-        
-        params = {'dash': (7.0, 5.0)}
-        if supplier is n.head:
-            params['draw_head'] = draw_head_arrow
-        else:
-            params['draw_tail'] = draw_tail_arrow
-
-        if supplier.cls == 'fdiface':
-            params = {'skip_keyword': True}
-
-        if 'realization' in n.stereotypes:
-            params['skip_keyword'] = True
-            if supplier is n.head:
-                params['draw_head'] = draw_head_triangle
-            else:
-                params['draw_tail'] = draw_tail_triangle
+        Check diagram bounding box against ink extents of the diagram
+        calculated by Cairo.
 
-        self._draw_line(n, **params)
-
-
-    def _association(self, edge):
-        """
-        Draw association represented by edge.
+        The diagram is recorded without transformation of the context, so
+        the ink extents are in user coordinates of the diagram.
 
         :Parameters:
-         edge
-            Edge representing an association.
+         bbox
+            Bounding box of the diagram.
         """
-        if edge.cls == 'extension':
-            params = {}
-            if edge.tail.cls == 'metaclass':
-                params['draw_tail'] = partial(draw_tail_arrow, fill=True)
-            elif edge.head.cls == 'metaclass':
-                params['draw_head'] = partial(draw_head_arrow, fill=True)
-            else:
-                assert False
-            self._draw_line(edge, **params)
-            return
-
-        TEND = {
-            'none': draw_tail_x,
-            'shared': draw_tail_diamond,
-            'composite': partial(draw_tail_diamond, filled=True),
-            'navigable': draw_tail_arrow,
-            'unknown': draw_tail_none,
-        }
-        HEND = {
-            'none': draw_head_x,
-            'shared': draw_head_diamond,
-            'composite': partial(draw_head_diamond, filled=True),
-            'navigable': draw_head_arrow,
-            'unknown': draw_head_none,
-        }
-        dt = TEND[edge.data['tail'][-1]]
-        dh = HEND[edge.data['head'][-1]]
-
-        assert isinstance(edge.head, Element)
-        name_fmt = '{}'
-        if edge.data['direction'] is edge.head:
-            name_fmt = '{} \u25b6'
-        elif edge.data['direction'] is edge.tail:
-            name_fmt = '\u25c0 {}'
-            
-        self._draw_line(edge, draw_tail=dt, draw_head=dh, name_fmt=name_fmt)
-
-        dt = partial(draw_text, self.cr, edge.style.edges, edge.style, align_f=text_pos_at_line)
-        self._draw_association_end(dt, edge.data['tail'], -1)
-        self._draw_association_end(dt, edge.data['head'], 1)
+        x, y, w, h = self.surface.ink_extents()
+        if bbox.contains(x, y, x + w, y + h, tolerance=1):
+            log.debug('diagram bounding box {} contains ink extents {}' \
+                .format(bbox, (x, y, x + w, y + h)))
+        else:
+            log.warning('diagram bounding box {} does not contain ink' \
+                ' extents {}'.format(bbox, (x, y, x + w, y + h)))
 
 
-    def _draw_association_end(self, dt, end, valign):
+    def save_diagram(self, n):
         """
-        Draw association end.
+        Generate PDF, SVG or PNG files with UML diagram.
 
-        :Parameters:
-         dt
-            Function used to draw association end text.
-         end
-            Tuple containing association end data.
-         valign
-            Vertical alignment of the association end.
+        The diagram is saved into each output of `outputs` list of pairs
+        of file type and output. If the list is empty, then the diagram is
+        saved into `output` of `filetype` type. The output is file name
+        or writable file object.
         """
-        attr = end[1]
-        if attr and attr.name:
-            dt(attr.name, align=(-1, valign))
-        if attr and attr.mult:
-            dt(str(attr.mult), align=(1, valign))
-
-
-    def _draw_line(self,
-            line,
-            draw_tail=draw_tail_none,
-            draw_head=draw_head_none,
-            dash=None,
-            name_fmt='%s',
-            skip_keyword=False):
-        """
-        Draw line between tail and head of an edge.
+        self.cr.restore()
 
-        :Parameters:
-         line
-            Line to draw.
-         draw_tail
-            Function used to draw tail of the edge.
-         draw_head
-            Function used to draw head of the edge.
-         name_fmt
-            String format used to format name of an edge.
-        """
-        draw_line(self.cr, line.style.edges, draw_tail=draw_tail, draw_head=draw_head, dash=dash)
+        bbox = self.cr.bbox
+        if __debug__ and log.isEnabledFor(logging.DEBUG):
+            self._check_bbox(bbox)
 
-        name = _name(line, fmt=name_fmt, skip_keyword=skip_keyword)
-        if name:
-            segment = line_middle_segment(line.style.edges)
-            draw_text(self.cr, segment, line.style, name, align=(-1, 0), align_f=text_pos_at_line)
+        # empty diagram is saved as one pixel image
+        x1, y1, x2, y2 = bbox if not bbox.empty else (0, 0, 1, 1)
+        bbox = list(map(int, (floor(x1), floor(y1), ceil(x2), ceil(y2))))
 
+        for filetype, output in self.all_outputs():
+            self._save(bbox, filetype, output)
 
-    def v_diagram(self, n):
-        w, h = n.style.size
-        w = int(ceil(w))
-        h = int(ceil(h))
-        self.surface = cairo.PDFSurface(BytesIO(), w * 2, h * 2)
-        self.cr = CairoBBContext(cairo.Context(self.surface))
-        self.cr.translate(int(w / 4), int(h / 4))
-        self.cr.save()
+        self.surface.flush()
+        self.surface.finish()
 
 
-    def save_diagram(self, n):
+    def _save(self, bbox, filetype, output):
         """
-        Generate PDF, SVG or PNG file with UML diagram.
+        Replay diagram drawing on a PDF, SVG or PNG surface.
+
+        :Parameters:
+         bbox
+            Bounding box of the diagram.
+         filetype
+            Type of output file.
+         output
+            Output file name or writable file object.
         """
         # match size of vector and raster output on screen
         DPI = 96.0
         scale = 1.0
-        if self.filetype != 'png':
+        if filetype != 'png':
             scale = 72.0 / DPI
 
-        self.cr.restore()
-
-        x1, y1, x2, y2 = self.cr.bbox
-        x1, y1, x2, y2 = list(map(int, (floor(x1), floor(y1), ceil(x2), ceil(y2))))
+        x1, y1, x2, y2 = bbox
         w = int(ceil(abs(x2 - x1) * scale))
         h = int(ceil(abs(y2 - y1) * scale))
 
-        if self.filetype == 'png':
+        if filetype == 'png':
             s = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
-        elif self.filetype == 'svg':
-            s = cairo.SVGSurface(self.output, w, h)
+        elif filetype == 'svg':
+            s = cairo.SVGSurface(output, w, h)
         else:
-            s = cairo.PDFSurface(self.output, w, h)
+            s = cairo.PDFSurface(output, w, h)
 
         cr = cairo.Context(s)
         cr.scale(scale, scale)
         cr.set_source_surface(self.surface, -x1, -y1)
         cr.paint()
         cr.show_page()
-        if self.filetype == 'png':
-            s.write_to_png(self.output)
-
-        self.surface.flush()
-        self.surface.finish()
+        if filetype == 'png':
+            s.write_to_png(output)
 
         s.flush()
         s.finish()
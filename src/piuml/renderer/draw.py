@@ -0,0 +1,346 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML diagram drawing routines shared by renderers.
+
+Drawer class walks laid out diagram and describes UML elements and
+relationships with shapes (see `piuml.renderer.shape`), lines (see
+`piuml.renderer.line`) and texts. A renderer derived from the class
+draws them with its backend by implementing
+
+_stroke(path, width=None, fill=None, dash=None, join=False)
+    Stroke a path with line of `width` width and `dash` dash pattern,
+    fill it with `fill` color first. Line joins are rounded if `join`
+    is true.
+_text(shape, style, text, lalign='left', pos=(0, 0), align=(0, -1), outside=False, align_f=text_pos_at_box)
+    Draw text at a box or a line and return height of the text.
+_bbox()
+    Get bounding box of the diagram to extend with drawn shapes.
+"""
+
+from math import pi
+
+from piuml.data import MWalker, Element
+from piuml.renderer import Renderer
+from piuml.renderer.line import ASSOCIATION_ENDS, line_ends, line_extents
+from piuml.renderer.shape import *
+from piuml.renderer.util import st_fmt, _name, _is_packaging, _features, \
+    _head_size, text_pos_at_line, line_middle_segment
+
+import logging
+log = logging.getLogger('piuml.renderer.draw')
+
+# extents of stroked shapes over their geometry, i.e. half of line width
+# or line joins
+LINE_PAD = 1
+SHAPE_PAD = 3
+
+# line width of icons
+ICON_LINE_WIDTH = 0.8
+
+class Drawer(MWalker, Renderer):
+    """
+    Base class of renderers drawing UML elements and relationships.
+    """
+    def _compartment(self, parent, features, y0, title=None):
+        x, y = parent.style.pos
+        width, height = parent.style.size
+
+        if title:
+            features = title + features
+        if features:
+            self._stroke([('M', x, y + y0), ('L', x + width, y + y0)])
+            self._text(parent.style.size, parent.style, features,
+                    pos=(0, y0), align=(-1, -1))
+
+
+    def v_element(self, node):
+        if node.parent.cls == 'align':
+            return
+        style = node.style
+        pos = x, y = style.pos
+        width, height = size = style.size
+        pad = style.padding
+        iw, ih = style.icon_size
+
+        align = (0, 0)
+        outside = False
+        underline = False
+        lalign = 'center'
+        bold = True
+        xskip = 0
+        yskip = 0
+
+        if _is_packaging(node):
+            align = (0, -1)
+
+        bbox = self._bbox()
+        if node.cls in ('node', 'device'):
+            d = BOX3D_DEPTH
+            bbox.add_rect(x, y - d, width + d, height + d, SHAPE_PAD)
+        else:
+            bbox.add_rect(x, y, width, height, SHAPE_PAD)
+
+        if node.cls in ('node', 'device'):
+            self._stroke(box3d(pos, size))
+        elif node.cls in ('package', 'profile'):
+            self._stroke(tabbed_box(pos, size))
+            yskip = 20
+        elif node.cls == 'usecase':
+            align = (0, 0)
+
+            r1 = width / 2.0
+            r2 = height / 2.0
+            self._stroke(ellipse((x + r1, y + r2), r1, r2))
+        elif node.cls == 'actor':
+            align = (0, 1)
+            outside = True
+            self._stroke(human(pos, size))
+        elif node.cls == 'comment':
+            self._stroke(note(pos, size))
+            lalign = 'left'
+            bold = False
+        elif node.cls in ('instance', 'artifact'):
+            underline = True
+            self._stroke([('R', x, y, width, height)])
+        else:
+            self._stroke([('R', x, y, width, height)])
+
+        # draw icons
+        if node.cls in ('artifact', 'component'):
+            x0 = x + width - iw - pad.top
+            y0 = y + pad.top
+            if node.cls == 'artifact':
+                self._stroke(artifact((x0, y0), (iw, ih)),
+                    width=ICON_LINE_WIDTH)
+            else:
+                frame, bars = component((x0, y0), (iw, ih))
+                self._stroke(frame, width=ICON_LINE_WIDTH)
+                self._stroke(bars, width=ICON_LINE_WIDTH, fill='white')
+            xskip = -(iw + pad.top) / 2.0
+
+        name = _name(node, bold, underline)
+
+        # calculate height of name from compartment data
+        tskip = _head_size(style)
+        log.debug('element {} allocated head height {}'.format(name, tskip))
+
+        self._text((width, tskip), style,
+                name,
+                lalign=lalign,
+                pos=(xskip, yskip),
+                align=align, outside=outside)
+
+        nc = 1
+        attrs = _features(node, 'attributes')
+        if attrs:
+            self._compartment(node, attrs, tskip)
+            tskip += style.compartment[nc] + pad.top + pad.bottom
+            nc += 1
+
+        opers = _features(node, 'operations')
+        if opers:
+            self._compartment(node, opers, tskip)
+            tskip += style.compartment[nc] + pad.top + pad.bottom
+            nc += 1
+
+        for f in node.data['stattrs']:
+            title = st_fmt([f.name]) + '\n'
+            attrs = '\n'.join(a.name for a in f)
+            self._compartment(node, attrs, tskip, title)
+            tskip += style.compartment[nc] + pad.top + pad.bottom
+            nc += 1
+
+    v_packagingelement = v_element
+
+    def v_ielement(self, n):
+        x, y = n.style.pos
+        width, height = n.style.size
+        nose = 2
+        x0 = x + width / 2.0
+        y0 = y + height / 2.0
+        angle = pi / 2.0
+
+        is_assembly = n.data['assembly'] is not None
+        if is_assembly:
+            is_usage = False
+            if n.data['symbol'] == 'o)':
+                angle = -angle
+        else:
+            dep = n.data['dependency']
+            is_usage = 'use' in dep.stereotypes
+            if dep.tail is n:
+                angle = -angle
+
+        # draw nose
+        self._stroke([
+            ('M', x, y0), ('L', x + nose, y0),
+            ('M', x + width - nose * 3, y0), ('L', x + width, y0),
+        ])
+
+        # draw provided/required or assembly interface icons
+        if is_usage or is_assembly:
+            self._stroke(circle((x0, y0), height / 2.0 - nose, angle,
+                pi + angle))
+        if not is_usage or is_assembly:
+            self._stroke(circle((x0, y0), width / 2.0 - nose * 3))
+
+        self._bbox().add_rect(x, y, width, height, LINE_PAD)
+
+        # draw interface name
+        self._text(n.style.size, n.style, n.name, align=(0, 1), outside=True)
+
+
+    def v_relationship(self, n):
+        t = '_' + n.cls
+        if n.cls == 'extension':
+            t = '_association'
+        f = getattr(self, t)
+        f(n)
+
+
+    def _connector(self, n):
+        self._draw_line(n)
+
+
+    def _commentline(self, node):
+        """
+        Draw comment line between elements.
+        """
+        self._draw_line(node, dash=(7.0, 5.0))
+
+
+    def _generalization(self, n):
+        if n.data['supplier'] is n.head:
+            self._draw_line(n, head='triangle')
+        else:
+            self._draw_line(n, tail='triangle')
+
+
+    def _dependency(self, n):
+        supplier = n.data['supplier']
+
+        params = {'dash': (7.0, 5.0)}
+        if supplier is n.head:
+            params['head'] = 'arrow'
+        else:
+            params['tail'] = 'arrow'
+
+        if supplier.cls == 'fdiface':
+            params = {'skip_keyword': True}
+
+        if 'realization' in n.stereotypes:
+            params['skip_keyword'] = True
+            if supplier is n.head:
+                params['head'] = 'triangle'
+            else:
+                params['tail'] = 'triangle'
+
+        self._draw_line(n, **params)
+
+
+    def _association(self, edge):
+        """
+        Draw association represented by edge.
+
+        :Parameters:
+         edge
+            Edge representing an association.
+        """
+        if edge.cls == 'extension':
+            if edge.tail.cls == 'metaclass':
+                self._draw_line(edge, tail='filled-arrow')
+            elif edge.head.cls == 'metaclass':
+                self._draw_line(edge, head='filled-arrow')
+            else:
+                assert False
+            return
+
+        tail = ASSOCIATION_ENDS[edge.data['tail'][-1]]
+        head = ASSOCIATION_ENDS[edge.data['head'][-1]]
+
+        assert isinstance(edge.head, Element)
+        name_fmt = '{}'
+        if edge.data['direction'] is edge.head:
+            name_fmt = '{} \u25b6'
+        elif edge.data['direction'] is edge.tail:
+            name_fmt = '\u25c0 {}'
+
+        self._draw_line(edge, tail=tail, head=head, name_fmt=name_fmt)
+
+        self._draw_association_end(edge, edge.data['tail'], -1)
+        self._draw_association_end(edge, edge.data['head'], 1)
+
+
+    def _draw_association_end(self, edge, end, valign):
+        """
+        Draw association end.
+
+        :Parameters:
+         edge
+            Edge representing an association.
+         end
+            Tuple containing association end data.
+         valign
+            Vertical alignment of the association end.
+        """
+        attr = end[1]
+        edges = edge.style.edges
+        if attr and attr.name:
+            self._text(edges, edge.style, attr.name, align=(-1, valign),
+                    align_f=text_pos_at_line)
+        if attr and attr.mult:
+            self._text(edges, edge.style, str(attr.mult), align=(1, valign),
+                    align_f=text_pos_at_line)
+
+
+    def _draw_line(self, line, tail='none', head='none', dash=None,
+            name_fmt='{}', skip_keyword=False):
+        """
+        Draw line between tail and head of an edge.
+
+        :Parameters:
+         line
+            Line to draw.
+         tail
+            Shape of tail of the line (see `piuml.renderer.line.LINE_ENDS`).
+         head
+            Shape of head of the line (see `piuml.renderer.line.LINE_ENDS`).
+         dash
+            Dash pattern of the line.
+         name_fmt
+            String format used to format name of an edge.
+        """
+        edges = line.style.edges
+        points, ends = line_ends(edges, tail, head)
+        path = [('M',) + points[0]] + [('L',) + p for p in points[1:]]
+        self._stroke(path, dash=dash, join=True)
+        for path, fill in ends:
+            self._stroke(path, fill=fill, join=True)
+        self._bbox().add_points(line_extents(edges), LINE_PAD)
+
+        name = _name(line, fmt=name_fmt, skip_keyword=skip_keyword)
+        if name:
+            segment = line_middle_segment(edges)
+            self._text(segment, line.style, name, align=(-1, 0),
+                    align_f=text_pos_at_line)
+
+
+# vim: sw=4:et:ai
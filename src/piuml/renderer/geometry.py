@@ -0,0 +1,179 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+"""
+piUML geometry renderer.
+
+Geometry of laid out diagram is written as JSON document, nothing is
+drawn. The document contains
+
+version
+    Version of the document format.
+bbox
+    Bounding box of the nodes and the lines of the diagram.
+nodes
+    List of nodes with their id, UML class, name, stereotypes, parent id,
+    rectangle and rectangles of compartments (the first one is the head
+    of a node).
+lines
+    List of lines with their id, UML class, name, stereotypes, tail and
+    head node ids and polyline points.
+
+Rectangle is list of x, y, width and height values.
+
+The geometry renderer can be used to benchmark layout and routing of
+lines without rendering cost or to draw diagram with client side
+renderer.
+"""
+
+import json
+
+from piuml.data import Element, Diagram, NodeGroup, Relationship, unwind
+from piuml.renderer import Renderer
+from piuml.renderer.util import BBox, _head_size, text_output
+
+# version of geometry document format
+VERSION = 1
+
+def _round(v):
+    return round(v, 2)
+
+
+def _rect(x, y, width, height):
+    return [_round(x), _round(y), _round(width), _round(height)]
+
+
+def compartments(style):
+    """
+    Calculate rectangles of compartments of a node.
+
+    The first rectangle is the head of the node containing its name.
+
+    :Parameters:
+     style
+        Style of the node.
+    """
+    x, y = style.pos
+    width, height = style.size
+    pad = style.padding
+
+    h = _head_size(style)
+    result = [_rect(x, y, width, h)]
+    for c in style.compartment[1:]:
+        ch = c + pad.top + pad.bottom
+        result.append(_rect(x, y + h, width, ch))
+        h += ch
+    return result
+
+
+def geometry(ast):
+    """
+    Get geometry of laid out diagram.
+
+    Dictionary representing geometry document is returned.
+
+    :Parameters:
+     ast
+        Diagram start node.
+    """
+    bbox = BBox()
+    nodes = []
+    lines = []
+    for n in unwind(ast):
+        if not isinstance(n, Element) or isinstance(n, (Diagram, NodeGroup)):
+            continue
+        if n.parent is not None and n.parent.cls == 'align':
+            continue
+        data = {
+            'id': n.id,
+            'cls': n.cls,
+            'name': n.name,
+            'stereotypes': list(n.stereotypes or []),
+        }
+        style = n.style
+        if isinstance(n, Relationship):
+            edges = style.edges
+            if edges:
+                bbox.add_points(edges)
+            data['tail'] = n.tail.id
+            data['head'] = n.head.id
+            data['points'] = [[_round(x), _round(y)] for x, y in edges]
+            lines.append(data)
+        else:
+            x, y = style.pos
+            width, height = style.size
+            bbox.add_rect(x, y, width, height)
+            parent = n.parent
+            while isinstance(parent, NodeGroup):
+                parent = parent.parent
+            data['parent'] = None if isinstance(parent, Diagram) \
+                else parent.id
+            data['rect'] = _rect(x, y, width, height)
+            data['compartments'] = compartments(style)
+            nodes.append(data)
+
+    return {
+        'version': VERSION,
+        'bbox': None if bbox.empty else [_round(v) for v in bbox],
+        'nodes': nodes,
+        'lines': lines,
+    }
+
+
+
+class GeometryRenderer(Renderer):
+    """
+    Geometry renderer writing geometry of laid out diagram as JSON
+    document.
+    """
+    def __init__(self):
+        super(GeometryRenderer, self).__init__()
+        self.filetype = 'geometry'
+
+
+    def measure(self, ast):
+        """
+        Calculate minimal size of all diagram nodes.
+
+        Size of texts is calculated with Cairo and Pango.
+
+        :Parameters:
+         ast
+            Diagram start node.
+        """
+        from piuml.renderer.cr import CairoDimensionCalculator
+        CairoDimensionCalculator().calc(ast)
+
+
+    def render(self, ast):
+        """
+        Write geometry of diagram into each output.
+
+        :Parameters:
+         ast
+            Diagram start node.
+        """
+        data = geometry(ast)
+        for filetype, output in self.all_outputs():
+            with text_output(output) as f:
+                json.dump(data, f, separators=(',', ':'))
+
+
+# vim: sw=4:et:ai
@@ -19,180 +19,127 @@
 
 """
 piUML renderer routines for lines.
-"""
-
-import cairo
-from math import atan2
-
-def draw_line(cr, edges, draw_tail=None, draw_head=None, dash=None):
-    if draw_tail is None:
-        draw_tail = draw_tail_none
-    if draw_head is None:
-        draw_head = draw_head_none
-
-    p0, p1 = edges[:2]
-    t_angle = atan2(p1.y - p0.y, p1.x - p0.x)
-    p1, p0 = edges[-2:]
-    h_angle = atan2(p1.y - p0.y, p1.x - p0.x)
-
-    cr.save()
-    cr.set_line_join(cairo.LINE_JOIN_ROUND)
-    draw_line_end(cr, edges[0], t_angle, draw_tail)
-    if dash is not None:
-        cr.set_dash(dash, 0)
-    for x, y in edges[1:-1]:
-        cr.line_to(x, y)
-    draw_line_end(cr, edges[-1], h_angle, draw_head)
-    cr.stroke()
-    cr.restore()
-
-
-def draw_line_end(cr, pos, angle, draw):
-    cr.save()
-    cr.translate(*pos)
-    cr.rotate(angle)
-    draw(cr)
-    cr.restore()
-
-
-def draw_head_none(cr):
-    """
-    Default head drawer: move cursor to the first handle.
-    """
-    cr.line_to(0, 0)
-
-
-def draw_tail_none(cr):
-    """
-    Default tail drawer: draw line to the last handle.
-    """
-    cr.stroke()
-    cr.move_to(0, 0)
-
-
-def draw_head_x(cr):
-    """
-    Draw an 'x' on the line end to indicate no navigability at
-    association head.
-    """
-    cr.line_to(0, 0)
-    cr.move_to(6, -4)
-    cr.rel_line_to(8, 8)
-    cr.rel_move_to(0, -8)
-    cr.rel_line_to(-8, 8)
-    cr.stroke()
-
-
-def draw_tail_x(cr):
-    """
-    Draw an 'x' on the line end to indicate no navigability at
-    association tail.
-    """
-    cr.move_to(6, -4)
-    cr.rel_line_to(8, 8)
-    cr.rel_move_to(0, -8)
-    cr.rel_line_to(-8, 8)
-    cr.stroke()
-    cr.move_to(0, 0)
-
-
-def draw_diamond(cr):
-    """
-    Helper function to draw diamond shape for shared and composite
-    aggregations.
-    """
-    cr.move_to(20, 0)
-    cr.line_to(10, -6)
-    cr.line_to(0, 0)
-    cr.line_to(10, 6)
-    cr.close_path()
-
-
-def draw_head_diamond(cr, filled=False):
-    """
-    Draw a closed diamond on the line end to indicate composite
-    aggregation at association head.
-    """
-    cr.line_to(20, 0)
-    cr.stroke()
-    draw_diamond(cr)
-    if filled:
-        cr.fill_preserve()
-    cr.stroke()
-
-
-def draw_tail_diamond(cr, filled=False):
-    """
-    Draw a closed diamond on the line end to indicate composite
-    aggregation at association tail.
-    """
-    draw_diamond(cr)
-    if filled:
-        cr.fill_preserve()
-    cr.stroke()
-    cr.move_to(20, 0)
-
-
-def draw_head_arrow(cr, fill=False):
-    """
-    Draw a normal arrow to indicate association end navigability at
-    association head.
-    """
-    dash = cr.get_dash()
-
-    # finish the line
-    cr.line_to(0, 0)
-    cr.stroke()
-
-    # draw the arrow
-    cr.set_dash((), 0)
-    cr.move_to(15, -6)
-    cr.line_to(0, 0)
-    cr.line_to(15, 6)
-    if fill:
-        cr.close_path()
-        cr.fill_preserve()
-    cr.stroke()
-    cr.set_dash(*dash)
 
+Line end shapes are described with paths (see `piuml.renderer.shape`)
+relative to line end, which are rotated along the line when line is
+drawn.
+"""
 
-def draw_tail_arrow(cr, fill=False):
-    """
-    Draw a normal arrow to indicate association end navigability at
-    association tail.
-    """
-    cr.move_to(15, -6)
-    cr.line_to(0, 0)
-    cr.line_to(15, 6)
-    if fill:
-        cr.close_path()
-        cr.fill_preserve()
-    cr.stroke()
-    cr.move_to(0, 0)
-
-
-def draw_head_triangle(cr):
-    dash = cr.get_dash()
-    cr.line_to(15, 0)
-    cr.stroke()
-
-    # draw the triangle
-    cr.set_dash((), 0)
-    cr.move_to(0, 0)
-    cr.line_to(15, -10)
-    cr.line_to(15, 10)
-    cr.close_path()
-    cr.stroke()
-    cr.set_dash(*dash)
-
-
-def draw_tail_triangle(cr):
-    cr.move_to(0, 0)
-    cr.line_to(15, -10)
-    cr.line_to(15, 10)
-    cr.close_path()
-    cr.stroke()
-    cr.move_to(15, 0)
+from math import atan2, cos, sin
+
+# length and half width of the largest line end shape
+END_SIZE = 20, 10
+
+_ARROW = [('M', 15, -6), ('L', 0, 0), ('L', 15, 6)]
+_DIAMOND = [('M', 20, 0), ('L', 10, -6), ('L', 0, 0), ('L', 10, 6), ('Z',)]
+
+# line end shapes: offset of line from line end, path of the shape
+# (relative to line end rotated along the line) and fill color
+LINE_ENDS = {
+    'none': (0, None, None),
+    'x': (0, [('M', 6, -4), ('L', 14, 4), ('M', 14, -4), ('L', 6, 4)], None),
+    'arrow': (0, _ARROW, None),
+    'filled-arrow': (0, _ARROW + [('Z',)], 'black'),
+    'triangle': (15, [('M', 0, 0), ('L', 15, -10), ('L', 15, 10), ('Z',)],
+        None),
+    'diamond': (20, _DIAMOND, None),
+    'filled-diamond': (20, _DIAMOND, 'black'),
+}
+
+# association ends by aggregation kind and navigability
+ASSOCIATION_ENDS = {
+    'none': 'x',
+    'shared': 'diamond',
+    'composite': 'filled-diamond',
+    'navigable': 'arrow',
+    'unknown': 'none',
+}
+
+def line_end_angles(edges):
+    """
+    Calculate angles of tail and head of a line.
+    """
+    (x0, y0), (x1, y1) = edges[:2]
+    t_angle = atan2(y1 - y0, x1 - x0)
+    (x1, y1), (x0, y0) = edges[-2:]
+    h_angle = atan2(y1 - y0, x1 - x0)
+    return t_angle, h_angle
+
+
+def line_extents(edges):
+    """
+    Calculate points enclosing a line including its tail and head shapes.
+
+    Line end shapes are drawn within rectangle of `END_SIZE` size placed
+    at end of the line and rotated along the line.
+
+    :Parameters:
+     edges
+        Line edges.
+    """
+    points = list(edges)
+    length, width = END_SIZE
+    for (x, y), angle in zip((edges[0], edges[-1]), line_end_angles(edges)):
+        c = cos(angle)
+        s = sin(angle)
+        for u, v in ((length, -width), (length, width), (0, -width),
+                (0, width)):
+            points.append((x + u * c - v * s, y + u * s + v * c))
+    return points
+
+
+def line_ends(edges, tail='none', head='none'):
+    """
+    Calculate points of a line and paths of its tail and head shapes.
+
+    Pair of list of line points and list of pairs of path and fill color
+    of line end shapes is returned. The first and the last point of the
+    line are moved by offset of the line end shape.
+
+    :Parameters:
+     edges
+        Line edges.
+     tail
+        Shape of tail of the line (see `LINE_ENDS`).
+     head
+        Shape of head of the line (see `LINE_ENDS`).
+    """
+    points = [tuple(p) for p in edges]
+    ends = []
+    for i, kind, angle in zip((0, -1), (tail, head), line_end_angles(edges)):
+        offset, path, fill = LINE_ENDS[kind]
+        x, y = points[i]
+        c = cos(angle)
+        s = sin(angle)
+        points[i] = x + offset * c, y + offset * s
+        if path:
+            ends.append((_rotate(path, x, y, c, s), fill))
+    return points, ends
+
+
+def _rotate(path, x, y, c, s):
+    """
+    Rotate path of line end shape and move it to the line end.
+
+    :Parameters:
+     path
+        Path of line end shape.
+     x
+        Horizontal position of the line end.
+     y
+        Vertical position of the line end.
+     c
+        Cosine of the line end angle.
+     s
+        Sine of the line end angle.
+    """
+    result = []
+    for cmd in path:
+        args = []
+        for u, v in zip(cmd[1::2], cmd[2::2]):
+            args.extend((x + u * c - v * s, y + u * s + v * c))
+        result.append((cmd[0],) + tuple(args))
+    return result
 
 
 # vim: sw=4:et:ai
@@ -15,17 +15,39 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-#
 
 """
 piUML renderer shapes.
+
+Shapes are described with backend-neutral paths, which are drawn by a
+renderer (i.e. with Cairo or as SVG path elements). A path is list of
+commands, each command is a tuple of command name and its arguments
+
+('M', x, y)
+    Start new sub-path at a point.
+('L', x, y)
+    Add line to a point.
+('Z',)
+    Close current sub-path.
+('R', x, y, width, height)
+    Add rectangle as closed sub-path.
+('A', x, y, r, a1, a2)
+    Add circular arc as new sub-path - the arc of radius `r` with center
+    at point `(x, y)` is drawn from angle `a1` to angle `a2` in
+    direction of increasing angles.
+('E', x, y, r1, r2)
+    Add ellipse as closed sub-path, the ellipse with center at point
+    `(x, y)` has horizontal radius `r1` and vertical radius `r2`.
 """
 
 from math import pi
 
-def draw_box3d(cr, pos, size):
+# depth of 3D box
+BOX3D_DEPTH = 10
+
+def box3d(pos, size):
     """
-    Draw 3D box.
+    Create path of 3D box.
 
     :Parameters:
      pos
@@ -33,30 +55,26 @@ def draw_box3d(cr, pos, size):
      size
         Width and height of the box.
     """
-    cr.save()
-    d = 10
+    d = BOX3D_DEPTH
     x, y = pos
     w, h = size
-
-    cr.rectangle(x, y, w, h)
-    cr.move_to(x, y)
-    cr.line_to(x + d, y - d)
-    cr.line_to(x + w + d, y - d)
-    cr.line_to(x + w + d, y + h - d)
-    cr.line_to(x + w, y + h)
-    cr.move_to(x + w, y)
-    cr.line_to(x + w + d, y - d)
-    cr.stroke()
-    cr.restore()
-
-
-def draw_tabbed_box(cr, pos, size, tab=(50, 20)):
+    return [
+        ('R', x, y, w, h),
+        ('M', x, y),
+        ('L', x + d, y - d),
+        ('L', x + w + d, y - d),
+        ('L', x + w + d, y + h - d),
+        ('L', x + w, y + h),
+        ('M', x + w, y),
+        ('L', x + w + d, y - d),
+    ]
+
+
+def tabbed_box(pos, size, tab=(50, 20)):
     """
-    Draw tabbed box.
+    Create path of tabbed box.
 
     :Parameters:
-     cr
-        Cairo context.
      pos
         Position of the box.
      size
@@ -64,22 +82,23 @@ def draw_tabbed_box(cr, pos, size, tab=(50, 20)):
      tab
         Size of the tab.
     """
-    y = pos.y + tab[1]
-    cr.rectangle(pos.x, y, size.width, size.height - tab[1])
-    cr.move_to(pos.x, y)
-    cr.rel_line_to(0, -tab[1])
-    cr.rel_line_to(tab[0], 0)
-    cr.rel_line_to(0, tab[1])
-    cr.stroke()
+    x, y = pos
+    w, h = size
+    tw, th = tab
+    return [
+        ('R', x, y + th, w, h - th),
+        ('M', x, y + th),
+        ('L', x, y),
+        ('L', x + tw, y),
+        ('L', x + tw, y + th),
+    ]
 
 
-def draw_ellipse(cr, pos, r1, r2):
+def ellipse(pos, r1, r2):
     """
-    Draw ellipse.
-    
+    Create path of ellipse.
+
     :Parameters:
-     cr
-        Cairo context.
      pos
         Center of the ellipse.
      r1
@@ -87,21 +106,33 @@ def draw_ellipse(cr, pos, r1, r2):
      r2
         Ellipse vertical radius.
     """
-    cr.save()
-    cr.translate(*pos)
-    cr.scale(r1, r2)
-    cr.move_to(1.0, 0.0)
-    cr.arc(0.0, 0.0, 1.0, 0.0, 2.0 * pi)
-    cr.restore()
+    x, y = pos
+    return [('E', x, y, r1, r2)]
+
+
+def circle(pos, r, a1=0, a2=2 * pi):
+    """
+    Create path of circle or circular arc.
+
+    :Parameters:
+     pos
+        Center of the circle.
+     r
+        Radius of the circle.
+     a1
+        Start angle of the arc.
+     a2
+        End angle of the arc.
+    """
+    x, y = pos
+    return [('A', x, y, r, a1, a2)]
 
 
-def draw_note(cr, pos, size, ear=15):
+def note(pos, size, ear=15):
     """
-    Draw note shape.
+    Create path of note shape.
 
     Parameters:
-     cr
-        Cairo context.
      pos
         Position of note rectangle.
      size
@@ -113,21 +144,21 @@ def draw_note(cr, pos, size, ear=15):
     x, y = pos
     w = x + width
     h = y + height
-    cr.move_to(w - ear, y)
-    line_to = cr.line_to
-    line_to(w - ear, y + ear)
-    line_to(w, y + ear)
-    line_to(w - ear, y)
-    line_to(x, y)
-    line_to(x, h)
-    line_to(w, h)
-    line_to(w, y + ear)
-    cr.stroke()
-
-
-def draw_human(cr, pos, size):
+    return [
+        ('M', w - ear, y),
+        ('L', w - ear, y + ear),
+        ('L', w, y + ear),
+        ('L', w - ear, y),
+        ('L', x, y),
+        ('L', x, h),
+        ('L', w, h),
+        ('L', w, y + ear),
+    ]
+
+
+def human(pos, size):
     """
-    Draw human figure.
+    Create path of human figure.
 
     :Parameters:
      pos
@@ -142,99 +173,71 @@ def draw_human(cr, pos, size):
     width, height = size
     x0, y0 = pos
 
-    fx = width / (arm * 2);
+    fx = width / (arm * 2)
     fy = height / (head + neck + body + arm)
 
     x = x0 + arm * fx
-    y = y0 + (head / 2.0) * fy
-    cy = head * fy
-
-    cr.move_to(x + head * fy / 2.0, y)
-    cr.arc(x, y, head * fy / 2.0, 0, 2 * pi)
-
-    cr.move_to(x, y + cy / 2)
-    cr.line_to(x0 + arm * fx, y0 + (head + neck + body) * fy)
-
-    cr.move_to(x0, y0 + (head + neck) * fy)
-    cr.line_to(x0 + arm * 2 * fx, y0 + (head + neck) * fy)
-
-    cr.move_to(x0, y0 + (head + neck + body + arm) * fy)
-    cr.line_to(x0 + arm * fx, y0 + (head + neck + body) * fy)
-    cr.line_to(x0 + arm * 2 * fx, y0 + (head + neck + body + arm) * fy)
-    cr.stroke()
-
-
-def draw_component(cr, pos, size):
+    r = head * fy / 2.0
+    return [
+        ('A', x, y0 + r, r, 0, 2 * pi),
+        ('M', x, y0 + head * fy),
+        ('L', x, y0 + (head + neck + body) * fy),
+        ('M', x0, y0 + (head + neck) * fy),
+        ('L', x0 + arm * 2 * fx, y0 + (head + neck) * fy),
+        ('M', x0, y0 + (head + neck + body + arm) * fy),
+        ('L', x, y0 + (head + neck + body) * fy),
+        ('L', x0 + arm * 2 * fx, y0 + (head + neck + body + arm) * fy),
+    ]
+
+
+def component(pos, size):
     """
-    Draw component shape.
+    Create paths of component icon.
+
+    Pair of paths is returned - the frame of the icon and its bars. The
+    bars are drawn over the frame and filled with background color.
 
     :Parameters:
-     cr
-        Cairo context.
      pos
         Left, top position of the component.
      size
         Width and height of the component.
     """
     w, h = size
-    BAR_WIDTH = 2.0 / 3.0 * w
-    BAR_HEIGHT =  h / 5.0
-    BAR_PADDING = h / 5.0
-
-    ix, iy = pos
-
-    cr.save()
-    cr.set_line_width(0.8)
-    cr.rectangle(ix, iy, w, h)
-    cr.stroke()
-
-    bx = ix - BAR_PADDING
-    bar_upper_y = iy + BAR_PADDING
-    bar_lower_y = iy + BAR_PADDING * 3
-
-    color = cr.get_source()
-    cr.rectangle(bx, bar_lower_y, BAR_WIDTH, BAR_HEIGHT)
-    cr.set_source_rgb(1,1,1) # white
-    cr.fill_preserve()
-    cr.set_source(color)
-    cr.stroke()
-
-    cr.rectangle(bx, bar_upper_y, BAR_WIDTH, BAR_HEIGHT)
-    cr.set_source_rgb(1,1,1) # white
-    cr.fill_preserve()
-    cr.set_source(color)
-    cr.stroke()
-    cr.restore()
+    bw = 2.0 / 3.0 * w
+    bh = bp = h / 5.0
+    x, y = pos
+    frame = [('R', x, y, w, h)]
+    bars = [
+        ('R', x - bp, y + bp * 3, bw, bh),
+        ('R', x - bp, y + bp, bw, bh),
+    ]
+    return frame, bars
 
 
-def draw_artifact(cr, pos, size):
+def artifact(pos, size):
     """
-    Draw artifact shape.
+    Create path of artifact icon.
 
     :Parameters:
-     cr
-        Cairo context.
      pos
         Left, top position of the artifact.
      size
         Width and height of the artifact.
     """
-    cr.save()
     w, h = size
-    ix, iy = pos
+    x, y = pos
     ear = 5
+    return [
+        ('M', x + w - ear, y),
+        ('L', x + w - ear, y + ear),
+        ('L', x + w, y + ear),
+        ('L', x + w - ear, y),
+        ('L', x, y),
+        ('L', x, y + h),
+        ('L', x + w, y + h),
+        ('L', x + w, y + ear),
+    ]
 
-    cr.set_line_width(0.8)
-    cr.move_to(ix + w - ear, iy)
-    cr.line_to(ix + w - ear, iy + ear)
-    cr.line_to(ix + w, iy + ear)
-    cr.line_to(ix + w - ear, iy)
-    cr.line_to(ix, iy)
-    cr.line_to(ix, iy + h)
-    cr.line_to(ix + w, iy + h)
-    cr.line_to(ix + w, iy + ear)
-
-    cr.stroke()
-    cr.restore()
 
 # vim: sw=4:et:ai
@@ -0,0 +1,395 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+piUML native SVG renderer.
+
+SVG elements (paths and texts) of laid out diagram are written into
+output stream as diagram nodes are visited. Texts are written as SVG
+text elements using font family and size of diagram font instead of
+glyph paths, therefore SVG files are much smaller than SVG files
+generated with Cairo.
+
+The diagram is visited twice - the first pass calculates bounding box
+of the diagram, which defines view box of SVG document, and the second
+pass writes the elements.
+
+Size of texts is calculated with Pango, the text size cache is shared
+with Cairo renderer (see `piuml.renderer.text.text_size`). Cairo and
+Pango modules are imported on demand, when texts are measured.
+"""
+
+from math import ceil, cos, floor, pi, sin
+from xml.etree import ElementTree as etree
+from xml.sax.saxutils import escape, quoteattr
+
+from piuml.renderer.draw import Drawer
+from piuml.renderer.util import BBox, FONT, text_output, text_pos_at_box
+
+import logging
+log = logging.getLogger('piuml.renderer.svg')
+
+# CSS generic font families of Pango font families
+FONT_FAMILIES = {
+    'sans': 'sans-serif',
+    'serif': 'serif',
+    'monospace': 'monospace',
+}
+
+# ratio of text line height above baseline
+BASELINE = 0.8
+
+# SVG attributes of Pango markup tags
+MARKUP = {
+    'b': ('font-weight', 'bold'),
+    'i': ('font-style', 'italic'),
+    'u': ('text-decoration', 'underline'),
+    'small': ('font-size', '83%'),
+    'big': ('font-size', '120%'),
+}
+
+# SVG text anchors of text line alignments
+ANCHORS = {
+    'left': None,
+    'center': 'middle',
+}
+
+def _num(v):
+    """
+    Format a number as SVG attribute value.
+    """
+    s = '{:.2f}'.format(v).rstrip('0').rstrip('.')
+    return '0' if s == '-0' else s
+
+
+def _tag(name, content=None, **attrs):
+    """
+    Create SVG element.
+
+    Underscores in attribute names are replaced with dashes.
+
+    :Parameters:
+     name
+        Name of the element.
+     content
+        Content of the element (already escaped).
+     attrs
+        Attributes of the element.
+    """
+    values = []
+    for k, v in attrs.items():
+        if v is None:
+            continue
+        if isinstance(v, (int, float)):
+            v = _num(v)
+        values.append(' {}={}'.format(k.replace('_', '-'), quoteattr(v)))
+    if content is None:
+        return '<{}{}/>'.format(name, ''.join(values))
+    return '<{0}{1}>{2}</{0}>'.format(name, ''.join(values), content)
+
+
+def _path(*items):
+    """
+    Create SVG path data from path commands and numbers.
+    """
+    return ' '.join(_num(k) if isinstance(k, (int, float)) else k
+        for k in items)
+
+
+def svg_path(path):
+    """
+    Convert path (see `piuml.renderer.shape`) into SVG path data.
+
+    :Parameters:
+     path
+        Path to convert.
+    """
+    items = []
+    for cmd in path:
+        k = cmd[0]
+        if k in ('M', 'L'):
+            items.extend(cmd)
+        elif k == 'Z':
+            items.append('Z')
+        elif k == 'R':
+            x, y, w, h = cmd[1:]
+            items.extend(('M', x, y, 'h', w, 'v', h, 'h', -w, 'Z'))
+        elif k == 'A':
+            x, y, r, a1, a2 = cmd[1:]
+            if a2 - a1 >= 2 * pi:
+                items.extend(_ellipse(x, y, r, r))
+            else:
+                large = 1 if a2 - a1 > pi else 0
+                items.extend(('M', x + r * cos(a1), y + r * sin(a1),
+                    'A', r, r, 0, large, 1, x + r * cos(a2), y + r * sin(a2)))
+        elif k == 'E':
+            items.extend(_ellipse(*cmd[1:]))
+        else:
+            assert False, 'unknown path command {}'.format(k)
+    return _path(*items)
+
+
+def _ellipse(x, y, r1, r2):
+    """
+    Create SVG path commands of ellipse made of two arcs.
+    """
+    return ('M', x + r1, y, 'A', r1, r2, 0, 0, 1, x - r1, y,
+        'A', r1, r2, 0, 0, 1, x + r1, y, 'Z')
+
+
+def font_style(font):
+    """
+    Get SVG font family and font size of Pango font description.
+
+    The font size is converted from points into pixels.
+
+    :Parameters:
+     font
+        Pango font description, i.e. `sans 10`.
+    """
+    family, size = font.rsplit(' ', 1)
+    family = FONT_FAMILIES.get(family.lower(), family)
+    return family, float(size) * 96.0 / 72.0
+
+
+def markup_lines(text):
+    """
+    Convert Pango markup into lines of text spans.
+
+    List of lines is returned, each line is list of pairs of text and
+    SVG attributes of the text.
+
+    :Parameters:
+     text
+        Text markup.
+    """
+    try:
+        root = etree.fromstring('<markup>{}</markup>'.format(text))
+    except etree.ParseError:
+        return [[(t, ())] for t in text.split('\n')]
+
+    lines = [[]]
+    def add(value, attrs):
+        parts = value.split('\n')
+        for i, t in enumerate(parts):
+            if i > 0:
+                lines.append([])
+            if t:
+                lines[-1].append((t, attrs))
+
+    def walk(node, attrs):
+        if node.text:
+            add(node.text, attrs)
+        for k in node:
+            kattrs = attrs
+            if k.tag in MARKUP:
+                kattrs = attrs + (MARKUP[k.tag],)
+            elif k.tag == 'span' and k.get('size') == 'small':
+                kattrs = attrs + (MARKUP['small'],)
+            walk(k, kattrs)
+            if k.tail:
+                add(k.tail, attrs)
+
+    walk(root, ())
+    return lines
+
+
+
+class SVGRenderer(Drawer):
+    """
+    Native SVG renderer.
+
+    :Attributes:
+     calc
+        Node dimension calculator, created when diagram is measured.
+     bbox
+        Bounding box of rendered diagram.
+     out
+        Text stream, into which SVG elements are written, or None when
+        bounding box of diagram is calculated.
+    """
+    def __init__(self):
+        super(SVGRenderer, self).__init__()
+        self.calc = None
+        self.filetype = 'svg-native'
+        self.bbox = BBox()
+        self.out = None
+
+
+    def measure(self, ast):
+        """
+        Calculate minimal size of all diagram nodes.
+
+        :Parameters:
+         ast
+            Diagram start node.
+        """
+        from piuml.renderer.cr import CairoDimensionCalculator
+        self.calc = CairoDimensionCalculator()
+        self.calc.calc(ast)
+
+
+    def render(self, ast):
+        """
+        Render diagram as SVG file.
+
+        :Parameters:
+         ast
+            Diagram start node.
+
+        .. seealso::
+            SVGRenderer.output
+            SVGRenderer.outputs
+        """
+        self.bbox = BBox()
+        self.out = None
+        self.preorder(ast)
+        self.save_diagram(ast)
+
+
+    def _stroke(self, path, width=None, fill=None, dash=None, join=False):
+        if self.out is None:
+            return
+        self.out.write(_tag('path', d=svg_path(path), fill=fill,
+            stroke_width=width,
+            stroke_dasharray=None if dash is None else
+                ' '.join(_num(k) for k in dash),
+            stroke_linejoin='round' if join else None))
+        self.out.write('\n')
+
+
+    def _text(self, shape, style, text,
+            lalign='left',
+            pos=(0, 0),
+            align=(0, -1),
+            outside=False,
+            align_f=text_pos_at_box):
+        """
+        Write text at a box or a line.
+
+        :Parameters:
+         shape
+            Size of a box or points of a line.
+         style
+            Style of the box or the line.
+         text
+            Text markup.
+         lalign
+            Alignment of text lines.
+        """
+        w, h = size = self._text_size(text)
+        x, y = align_f(size, shape, style, align=align, outside=outside)
+        x += pos[0]
+        y += pos[1]
+        self.bbox.add_rect(x, y, w, h)
+        if self.out is None:
+            return h
+
+        lines = markup_lines(text)
+        lh = h / len(lines)
+        anchor = ANCHORS[lalign]
+        tx = x if anchor is None else x + w / 2.0
+        for i, spans in enumerate(lines):
+            if not spans:
+                continue
+            content = ''.join(escape(t) if not attrs else
+                _tag('tspan', escape(t), **{k: v for k, v in attrs})
+                for t, attrs in spans)
+            self.out.write(_tag('text', content, x=tx,
+                y=y + lh * (i + BASELINE), text_anchor=anchor,
+                fill='black', stroke='none'))
+            self.out.write('\n')
+
+        return h
+
+
+    def _text_size(self, text):
+        """
+        Get size of a text.
+
+        :Parameters:
+         text
+            Text markup.
+        """
+        from piuml.renderer.cr import CairoDimensionCalculator
+        from piuml.renderer.text import text_size
+        if self.calc is None:
+            self.calc = CairoDimensionCalculator()
+        return text_size(self.calc.cr, text)
+
+
+    def _bbox(self):
+        return self.bbox
+
+
+    def save_diagram(self, n):
+        """
+        Write SVG file with UML diagram.
+
+        The diagram is written into each output of `outputs` list of
+        pairs of file type and output. If the list is empty, then the
+        diagram is written into `output`. The output is file name or
+        writable (text or binary) file object.
+        """
+        for filetype, output in self.all_outputs():
+            with text_output(output) as f:
+                self.write(f, n)
+
+
+    def write(self, f, ast):
+        """
+        Write SVG document of rendered diagram into text stream.
+
+        The SVG elements are written as diagram nodes are visited.
+
+        :Parameters:
+         f
+            Text stream.
+         ast
+            Diagram start node.
+        """
+        x1, y1, x2, y2 = self.bbox
+        if self.bbox.empty:
+            x1 = y1 = x2 = y2 = 0
+        x1, y1 = floor(x1), floor(y1)
+        w, h = ceil(x2) - x1, ceil(y2) - y1
+        family, size = font_style(FONT)
+
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.1"'
+            ' width="{}" height="{}" viewBox="{} {} {} {}">\n'.format(w, h,
+                x1, y1, w, h))
+        f.write('<g fill="none" stroke="black" stroke-width="2"'
+            ' font-family={} font-size="{}">\n'.format(quoteattr(family),
+                _num(size)))
+
+        # the bounding box is calculated already, keep it intact
+        bbox = self.bbox
+        self.bbox = BBox()
+        self.out = f
+        try:
+            self.preorder(ast)
+        finally:
+            self.out = None
+            self.bbox = bbox
+
+        f.write('</g>\n</svg>\n')
+
+
+# vim: sw=4:et:ai
@@ -22,9 +22,12 @@ Test Cairo based renderer text and box (including compartments) size
 calculation.
 """
 
-from piuml.renderer.cr import _head_size
+from piuml.parser import parse
+from piuml.renderer.cr import CairoRenderer
+from piuml.renderer.util import _head_size
 from piuml.style import BoxStyle, Size, Area
 
+import io
 import unittest
 
 class NameTestCase(unittest.TestCase):
@@ -64,4 +67,22 @@ class NameTestCase(unittest.TestCase):
         self.assertEquals(55, _head_size(style)) # 100 - 5 * 4 (pad) - 25
 
 
+
+class CairoRendererTestCase(unittest.TestCase):
+    """
+    Cairo renderer tests.
+    """
+    def test_empty(self):
+        """
+        Test rendering empty diagram
+        """
+        r = CairoRenderer()
+        f1 = io.BytesIO()
+        f2 = io.BytesIO()
+        r.outputs = [('png', f1), ('pdf', f2)]
+        r.render(parse('', cache=False))
+        self.assertTrue(f1.getvalue().startswith(b'\x89PNG'))
+        self.assertTrue(f2.getvalue().startswith(b'%PDF'))
+
+
 # vim: sw=4:et:ai
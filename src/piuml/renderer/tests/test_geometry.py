@@ -0,0 +1,137 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Renderer registry and geometry renderer tests.
+"""
+
+import io
+import json
+import unittest
+
+from piuml.data import Relationship, unwind
+from piuml.layout import Layout
+from piuml.parser import parse
+from piuml.renderer import renderer, extension, files_only
+from piuml.renderer.geometry import GeometryRenderer, geometry
+from piuml.style import Pos
+
+
+class RegistryTestCase(unittest.TestCase):
+    """
+    Renderer registry tests.
+    """
+    def test_renderer(self):
+        """
+        Test renderer lookup by file type
+        """
+        self.assertTrue(renderer('geometry') is GeometryRenderer)
+        self.assertRaises(ValueError, renderer, 'xyz')
+
+
+    def test_extension(self):
+        """
+        Test file name extension of file type
+        """
+        self.assertEquals('pdf', extension('pdf'))
+        self.assertEquals('svg', extension('svg-native'))
+        self.assertEquals('json', extension('geometry'))
+
+
+    def test_files_only(self):
+        """
+        Test checking if file type is written into files only
+        """
+        self.assertTrue(files_only('dzi'))
+        self.assertFalse(files_only('png-tiled'))
+        self.assertFalse(files_only('xyz'))
+
+
+    def test_all_outputs(self):
+        """
+        Test list of outputs of a renderer
+        """
+        r = GeometryRenderer()
+        r.output = 'a.json'
+        self.assertEquals([('geometry', 'a.json')], r.all_outputs())
+        r.outputs = [('geometry', 'b.json')]
+        self.assertEquals([('geometry', 'b.json')], r.all_outputs())
+
+
+
+class GeometryTestCase(unittest.TestCase):
+    """
+    Geometry renderer tests.
+    """
+    def setUp(self):
+        self.ast = ast = parse("""
+class c1 "C1"
+    : a: int
+package p1 "P1"
+    class c2 "C2"
+c1 -> c2
+""", cache=False)
+        # sizes of name and attributes compartment calculated when
+        # diagram is measured
+        c1 = ast[0]
+        c1.style.compartment[0] = 15
+        c1.style.compartment.append(15)
+        Layout(ast).layout()
+        # lines are not routed, connect centers of nodes
+        for l in unwind(ast):
+            if isinstance(l, Relationship):
+                l.style.edges = tuple(Pos(*n.style.pos) for n in (l.tail,
+                    l.head))
+
+
+    def test_geometry(self):
+        """
+        Test geometry of laid out diagram
+        """
+        data = geometry(self.ast)
+        self.assertEquals(1, data['version'])
+        nodes = {n['id']: n for n in data['nodes']}
+        self.assertEquals(['c1', 'c2', 'p1'], sorted(nodes))
+        self.assertEquals('p1', nodes['c2']['parent'])
+        self.assertTrue(nodes['c1']['parent'] is None)
+
+        # head and attributes compartment
+        c1 = nodes['c1']
+        self.assertEquals(2, len(c1['compartments']))
+        x, y, w, h = c1['rect']
+        self.assertEquals([x, y, w], c1['compartments'][0][:3])
+        self.assertAlmostEquals(h, sum(c[3] for c in c1['compartments']))
+
+        line, = data['lines']
+        self.assertEquals(('c1', 'c2'), (line['tail'], line['head']))
+        self.assertEquals(2, len(line['points']))
+
+
+    def test_render(self):
+        """
+        Test writing geometry into binary file object
+        """
+        r = GeometryRenderer()
+        r.output = f = io.BytesIO()
+        r.render(self.ast)
+        data = json.loads(f.getvalue().decode('utf-8'))
+        self.assertEquals(geometry(self.ast), data)
+
+
+# vim: sw=4:et:ai
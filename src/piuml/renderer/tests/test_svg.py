@@ -0,0 +1,184 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Native SVG renderer tests.
+"""
+
+import io
+import unittest
+from math import pi
+from xml.etree import ElementTree as etree
+
+from piuml.data import Relationship, unwind
+from piuml.layout import Layout
+from piuml.parser import parse
+from piuml.renderer.svg import SVGRenderer, markup_lines, font_style, \
+    svg_path, _tag, _path
+from piuml.style import Pos
+
+
+class MarkupTestCase(unittest.TestCase):
+    """
+    Pango markup conversion tests.
+    """
+    def test_plain(self):
+        """
+        Test conversion of plain multiline text
+        """
+        self.assertEquals([[('a: int', ())], [], [('b: str', ())]],
+                markup_lines('a: int\n\nb: str'))
+
+
+    def test_markup(self):
+        """
+        Test conversion of element name markup
+        """
+        lines = markup_lines('<span size="small">\xabactor\xbb</span>\n'
+            '<b><u>Name\nx</u></b>')
+        bold = ('font-weight', 'bold')
+        underline = ('text-decoration', 'underline')
+        self.assertEquals([
+            [('\xabactor\xbb', (('font-size', '83%'),))],
+            [('Name', (bold, underline))],
+            [('x', (bold, underline))],
+        ], lines)
+
+
+    def test_invalid(self):
+        """
+        Test conversion of invalid markup
+        """
+        self.assertEquals([[('a < b', ())]], markup_lines('a < b'))
+
+
+
+class SVGTestCase(unittest.TestCase):
+    """
+    SVG elements tests.
+    """
+    def test_font_style(self):
+        """
+        Test conversion of Pango font description
+        """
+        self.assertEquals(('sans-serif', 16), font_style('sans 12'))
+        self.assertEquals(('DejaVu Serif', 12), font_style('DejaVu Serif 9'))
+
+
+    def test_tag(self):
+        """
+        Test SVG element creation
+        """
+        self.assertEquals('<rect x="1.5" y="0" stroke-width="0.8"/>',
+                _tag('rect', x=1.5, y=-0.001, stroke_width=0.8, fill=None))
+        self.assertEquals('<text x="1">a &amp; b</text>',
+                _tag('text', 'a &amp; b', x=1.0))
+
+
+    def test_path(self):
+        """
+        Test SVG path data creation
+        """
+        self.assertEquals('M 1 2.25 h -3', _path('M', 1.0, 2.25, 'h', -3))
+
+
+    def test_svg_path(self):
+        """
+        Test conversion of shape path into SVG path data
+        """
+        self.assertEquals('M 1 2 L 3 4 Z',
+                svg_path([('M', 1, 2), ('L', 3, 4), ('Z',)]))
+        self.assertEquals('M 1 2 h 10 v 5 h -10 Z',
+                svg_path([('R', 1, 2, 10, 5)]))
+
+
+    def test_svg_path_arc(self):
+        """
+        Test conversion of circle, arc and ellipse into SVG path data
+        """
+        self.assertEquals('M 12 10 A 2 2 0 0 1 8 10 A 2 2 0 0 1 12 10 Z',
+                svg_path([('A', 10, 10, 2, 0, 2 * pi)]))
+        self.assertEquals('M 10 12 A 2 2 0 0 1 10 8',
+                svg_path([('A', 10, 10, 2, pi / 2, pi * 1.5)]))
+        self.assertEquals('M 14 10 A 4 2 0 0 1 6 10 A 4 2 0 0 1 14 10 Z',
+                svg_path([('E', 10, 10, 4, 2)]))
+
+
+
+class TextSizeSVGRenderer(SVGRenderer):
+    """
+    SVG renderer with fixed size of texts.
+    """
+    def _text_size(self, text):
+        return 40, 10
+
+
+
+class RenderTestCase(unittest.TestCase):
+    """
+    SVG document rendering tests.
+    """
+    def setUp(self):
+        self.ast = ast = parse("""
+class c1 "C1"
+    : a: int
+class c2 "C2"
+c1 -> c2
+""", cache=False)
+        c1 = ast[0]
+        c1.style.compartment[0] = 10
+        c1.style.compartment.append(10)
+        Layout(ast).layout()
+        # lines are not routed, connect centers of nodes
+        for l in unwind(ast):
+            if isinstance(l, Relationship):
+                l.style.edges = tuple(Pos(*n.style.pos) for n in (l.tail,
+                    l.head))
+
+
+    def test_render(self):
+        """
+        Test rendering SVG document into multiple outputs
+        """
+        r = TextSizeSVGRenderer()
+        f1 = io.StringIO()
+        f2 = io.BytesIO()
+        r.outputs = [('svg-native', f1), ('svg-native', f2)]
+        r.render(self.ast)
+
+        data = f1.getvalue()
+        self.assertEquals(data, f2.getvalue().decode('utf-8'))
+
+        ns = '{http://www.w3.org/2000/svg}'
+        root = etree.fromstring(data.encode('utf-8'))
+        x1, y1, x2, y2 = r.bbox
+        w, h = root.get('width'), root.get('height')
+        self.assertEquals(root.get('viewBox').split()[2:], [w, h])
+        self.assertTrue(float(w) >= x2 - x1)
+
+        # elements are written in drawing order: box of class, its name
+        # and its attributes compartment
+        g, = root
+        tags = [e.tag[len(ns):] for e in g]
+        self.assertEquals(['path', 'text', 'path', 'text'], tags[:4])
+        self.assertEquals('C1', ''.join(g[1].itertext()))
+        self.assertTrue(r.out is None)
+
+
+# vim: sw=4:et:ai
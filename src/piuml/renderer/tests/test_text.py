@@ -0,0 +1,124 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Text size cache tests.
+"""
+
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from piuml.renderer.text import TextSizeCache, FONT
+
+
+class TextSizeCacheTestCase(unittest.TestCase):
+    """
+    Text size cache tests.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.fn = os.path.join(self.path, 'cache', 'text-size.json')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+    def test_get_put(self):
+        """
+        Test storing text size in text size cache
+        """
+        cache = TextSizeCache()
+        self.assertTrue(cache.get('int', FONT) is None)
+        cache.put('int', FONT, (20, 12))
+        self.assertEquals((20, 12), cache.get('int', FONT))
+        self.assertTrue(cache.get('int', 'sans 12') is None)
+
+
+    def test_lru(self):
+        """
+        Test least recently used eviction of text size cache
+        """
+        cache = TextSizeCache(max_size=2)
+        cache.put('a', FONT, (1, 1))
+        cache.put('b', FONT, (2, 2))
+        cache.get('a', FONT)
+        cache.put('c', FONT, (3, 3))
+        self.assertEquals((1, 1), cache.get('a', FONT))
+        self.assertTrue(cache.get('b', FONT) is None)
+        self.assertEquals((3, 3), cache.get('c', FONT))
+
+
+    def test_persistence(self):
+        """
+        Test saving and loading text size cache file
+        """
+        cache = TextSizeCache(version='1')
+        cache.put('a', FONT, (1, 1))
+        cache.put('<b>b</b>', FONT, (2, 2))
+        cache.save(self.fn)
+        self.assertFalse(cache.changed)
+
+        cache = TextSizeCache(version='1')
+        cache.put('c', FONT, (3, 3))
+        cache.load(self.fn)
+        self.assertEquals((1, 1), cache.get('a', FONT))
+        self.assertEquals((2, 2), cache.get('<b>b</b>', FONT))
+        self.assertEquals((3, 3), cache.get('c', FONT))
+
+        # different version of text rendering libraries
+        cache = TextSizeCache(version='2')
+        cache.load(self.fn)
+        self.assertTrue(cache.get('a', FONT) is None)
+
+
+    def test_load_bounded(self):
+        """
+        Test loading text size cache file into smaller cache
+        """
+        cache = TextSizeCache(version='1')
+        for i in range(10):
+            cache.put(str(i), FONT, (i, i))
+        cache.save(self.fn)
+
+        cache = TextSizeCache(max_size=3, version='1')
+        cache.put('x', FONT, (1, 1))
+        cache.load(self.fn)
+        self.assertEquals(['8', '9', 'x'], [t for t, f in cache.data])
+
+
+    def test_invalid(self):
+        """
+        Test loading missing and invalid text size cache file
+        """
+        cache = TextSizeCache(version='1')
+        cache.load(self.fn)
+        self.assertFalse(cache.data)
+
+        os.makedirs(os.path.dirname(self.fn))
+        with open(self.fn, 'w') as f:
+            f.write('{"version": "1", "items": [[1]]')
+        cache = TextSizeCache(version='1')
+        cache.load(self.fn)
+        self.assertFalse(cache.data)
+
+
+# vim: sw=4:et:ai
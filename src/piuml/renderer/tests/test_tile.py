@@ -0,0 +1,168 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Tiled renderer tests.
+"""
+
+import io
+import struct
+import unittest
+import zlib
+
+from piuml.renderer.tile import GridIndex, PNGWriter, PNG_SIGNATURE, \
+    RGB_OFFSETS, copy_rgb, dzi_levels
+
+
+class DZITestCase(unittest.TestCase):
+    """
+    Deep zoom image tests.
+    """
+    def test_levels(self):
+        """
+        Test levels of deep zoom image
+        """
+        levels = dzi_levels(1000, 300)
+        self.assertEquals(11, len(levels))
+        self.assertEquals((1.0 / 1024, 1, 1), levels[0])
+        self.assertEquals((0.5, 500, 150), levels[-2])
+        self.assertEquals((1.0, 1000, 300), levels[-1])
+
+
+    def test_levels_single(self):
+        """
+        Test levels of single pixel deep zoom image
+        """
+        self.assertEquals([(1.0, 1, 1)], dzi_levels(1, 1))
+
+
+
+class GridIndexTestCase(unittest.TestCase):
+    """
+    Spatial index tests.
+    """
+    def test_query(self):
+        """
+        Test finding items intersecting a rectangle
+        """
+        index = GridIndex(100)
+        index.add(0, 10, 10, 50, 50)
+        index.add(1, 90, 90, 250, 120)
+        index.add(2, 300, 300, 310, 310)
+
+        self.assertEquals([0, 1], index.query(0, 0, 99, 99))
+        self.assertEquals([1], index.query(200, 100, 299, 199))
+        self.assertEquals([2], index.query(300, 300, 399, 399))
+        self.assertEquals([], index.query(500, 0, 599, 99))
+
+
+    def test_query_cell(self):
+        """
+        Test finding items sharing grid cell with a rectangle
+        """
+        index = GridIndex(100)
+        index.add(0, 10, 10, 20, 20)
+        # the item is in the same cell, but it does not intersect the
+        # rectangle
+        self.assertEquals([], index.query(50, 50, 99, 99))
+
+
+
+class Surface(object):
+    """
+    Image surface with 32-bit pixels and padded rows.
+    """
+    def __init__(self, data, stride):
+        self.data = data
+        self.stride = stride
+
+    def flush(self):
+        pass
+
+    def get_data(self):
+        return memoryview(self.data)
+
+    def get_stride(self):
+        return self.stride
+
+
+
+class RGBTestCase(unittest.TestCase):
+    """
+    Image surface pixel data conversion tests.
+    """
+    def test_copy_rgb(self):
+        """
+        Test copying image surface pixels into RGB band
+        """
+        r, g, b = RGB_OFFSETS
+        data = bytearray(2 * 12)
+        for y in range(2):
+            for x in range(2):
+                k = y * 12 + x * 4
+                data[k + r] = 10 * y + x + 1
+                data[k + g] = 100
+                data[k + b] = 200
+        band = bytearray(3 * 2 * 3)
+        copy_rgb(Surface(data, 12), band, 3, 1, 2, 2)
+        self.assertEquals(bytes([0, 0, 0, 1, 100, 200, 2, 100, 200,
+            0, 0, 0, 11, 100, 200, 12, 100, 200]), bytes(band))
+
+
+
+class PNGWriterTestCase(unittest.TestCase):
+    """
+    Streaming PNG encoder tests.
+    """
+    def test_write(self):
+        """
+        Test writing PNG image row by row
+        """
+        f = io.BytesIO()
+        writer = PNGWriter(f, 2, 3)
+        rows = [bytes([k] * 6) for k in (0, 128, 255)]
+        for row in rows:
+            writer.write(row)
+        writer.close()
+
+        data = f.getvalue()
+        self.assertEquals(PNG_SIGNATURE, data[:8])
+
+        chunks = []
+        offset = 8
+        while offset < len(data):
+            size, = struct.unpack_from('>I', data, offset)
+            kind = data[offset + 4:offset + 8]
+            chunk = data[offset + 8:offset + 8 + size]
+            crc, = struct.unpack_from('>I', data, offset + 8 + size)
+            self.assertEquals(zlib.crc32(kind + chunk) & 0xffffffff, crc)
+            chunks.append((kind, chunk))
+            offset += size + 12
+
+        self.assertEquals(b'IHDR', chunks[0][0])
+        self.assertEquals((2, 3, 8, 2),
+                struct.unpack('>IIBB', chunks[0][1][:10]))
+        self.assertEquals(b'IEND', chunks[-1][0])
+
+        idat = b''.join(c for k, c in chunks if k == b'IDAT')
+        self.assertEquals(b''.join(b'\x00' + r for r in rows),
+                zlib.decompress(idat))
+
+
+# vim: sw=4:et:ai
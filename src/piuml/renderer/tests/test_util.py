@@ -0,0 +1,132 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Bounding box calculation tests.
+"""
+
+import unittest
+
+from piuml.renderer.line import line_extents, line_ends
+from piuml.renderer.util import BBox
+
+
+class BBoxTestCase(unittest.TestCase):
+    """
+    Bounding box accumulator tests.
+    """
+    def test_empty(self):
+        """
+        Test empty bounding box
+        """
+        bbox = BBox()
+        self.assertTrue(bbox.empty)
+        bbox.add(1, 2, 3, 4)
+        self.assertFalse(bbox.empty)
+        self.assertEquals((1, 2, 3, 4), tuple(bbox))
+
+
+    def test_add_rect(self):
+        """
+        Test extending bounding box with rectangles
+        """
+        bbox = BBox()
+        bbox.add_rect(10, 20, 100, 50)
+        bbox.add_rect(50, 0, 20, 20, pad=2)
+        self.assertEquals((10, -2, 110, 70), tuple(bbox))
+
+
+    def test_add_points(self):
+        """
+        Test extending bounding box with points
+        """
+        bbox = BBox()
+        bbox.add_points([(10, 20), (5, 40), (30, 30)], pad=1)
+        self.assertEquals((4, 19, 31, 41), tuple(bbox))
+
+
+    def test_contains(self):
+        """
+        Test bounding box containment check
+        """
+        bbox = BBox()
+        bbox.add(0, 0, 100, 100)
+        self.assertTrue(bbox.contains(10, 10, 100, 100))
+        self.assertFalse(bbox.contains(-1, 10, 100, 100))
+        self.assertTrue(bbox.contains(-1, 10, 100, 101, tolerance=1))
+
+
+
+class LineExtentsTestCase(unittest.TestCase):
+    """
+    Line extents tests.
+    """
+    def test_horizontal(self):
+        """
+        Test extents of horizontal line
+        """
+        bbox = BBox()
+        bbox.add_points(line_extents([(0, 0), (100, 0)]))
+        self.assertEquals((0, -10, 100, 10), tuple(round(v, 6) for v in bbox))
+
+
+    def test_short(self):
+        """
+        Test extents of line shorter than its ends
+        """
+        bbox = BBox()
+        bbox.add_points(line_extents([(0, 0), (0, 10)]))
+        self.assertEquals((-10, -10, 10, 20), tuple(round(v, 6) for v in bbox))
+
+
+
+class LineEndsTestCase(unittest.TestCase):
+    """
+    Line end shapes tests.
+    """
+    def test_no_ends(self):
+        """
+        Test line without end shapes
+        """
+        points, ends = line_ends([(0, 0), (50, 0), (50, 100)])
+        self.assertEquals([(0, 0), (50, 0), (50, 100)], points)
+        self.assertEquals([], ends)
+
+
+    def test_ends(self):
+        """
+        Test moving line points and rotating end shapes along the line
+        """
+        points, ends = line_ends([(0, 0), (0, 100)], 'triangle',
+                'filled-diamond')
+        self.assertEquals([(0, 15), (0, 80)],
+                [tuple(round(v, 6) for v in p) for p in points])
+
+        (tail, tfill), (head, hfill) = ends
+        self.assertTrue(tfill is None)
+        self.assertEquals('black', hfill)
+        self.assertEquals([('M', 0, 0), ('L', 10, 15), ('L', -10, 15),
+                ('Z',)],
+                [(c[0],) + tuple(round(v, 6) + 0 for v in c[1:])
+                    for c in tail])
+        self.assertEquals(('M', 0, 80), tuple(round(v, 6) + 0
+                if not isinstance(v, str) else v for v in head[0]))
+
+
+# vim: sw=4:et:ai
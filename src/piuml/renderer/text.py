@@ -18,232 +18,75 @@
 #
 
 """
-Renderer text routines.
+Renderer text routines using Pango.
+
+Text positioning routines, which do not depend on Pango and Cairo, are
+defined in `piuml.renderer.util` module.
 """
 
 import cairo
 from gi.repository import Pango as pango
 from gi.repository import PangoCairo
 
-from math import atan2, pi, sin, cos
+import json
+import os
+import os.path
+import tempfile
+from collections import OrderedDict
 
-# Horizontal align.
-ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT = -1, 0, 1
+from piuml.renderer.util import ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT, \
+    ALIGN_TOP, ALIGN_MIDDLE, ALIGN_BOTTOM, ALIGN_TAIL, ALIGN_HEAD, FONT, \
+    text_pos_at_box, text_pos_at_line, line_single_text_hint, \
+    line_middle_segment
 
-# Vertical align.
-ALIGN_TOP, ALIGN_MIDDLE, ALIGN_BOTTOM = -1, 0, 1
+import logging
+log = logging.getLogger('piuml.renderer.text')
 
-# Vertical line align (along the line from tail to head).
-ALIGN_TAIL, ALIGN_HEAD = -1, 1
+# font descriptions by font
+FONTS = {}
 
-EPSILON = 1e-6
+# maximum number of cached text sizes
+TEXT_CACHE_SIZE = 4096
 
-def text_pos_at_box(size, box, style, align, outside=False):
-    """
-    Calculate position of the text relative to containing box.
+# name of text size cache file in cache directory
+TEXT_CACHE_FILE = 'text-size.json'
 
-    :Parameters:
-     size
-        Width and height of text to be aligned.
-     box
-        Containing box.
-     style
-        Style of containing box (i.e. position and padding).
-     align
-        Horizontal and vertical alignment of text.
-     outside
-        If true the text is aligned outside the box.
-    """
-    w, h = size # size of the text
-    width, height = box
-    x0, y0 = style.pos
-    pad = style.padding
-
-    halign, valign = align
-
-    if outside:
-        if halign == ALIGN_LEFT:
-            x = -w - pad.left
-        elif halign == ALIGN_CENTER:
-            x = (width - w) / 2
-        elif halign == ALIGN_RIGHT:
-            x = width + pad.right
-        else:
-            assert False
-
-        if valign == ALIGN_TOP:
-            y = -h - pad.top
-        elif valign == ALIGN_MIDDLE:
-            y = (height - h) / 2.0 + pad.top - pad.bottom
-        elif valign == ALIGN_BOTTOM:
-            y = height + pad.bottom
-        else:
-            assert False
-    else:
-        if halign == ALIGN_LEFT:
-            x = pad.left
-        elif halign == ALIGN_CENTER:
-            x = (width - w) / 2.0 + pad.left - pad.right
-        elif halign == ALIGN_RIGHT:
-            x = width - w - pad.right
-        else:
-            assert False
-
-        if valign == ALIGN_TOP:
-            y = pad.top
-        elif valign == ALIGN_MIDDLE:
-            y = (height - h) / 2.0 + pad.top - pad.bottom
-        elif valign == ALIGN_BOTTOM:
-            y = height - h - pad.bottom
-        else:
-            assert False
-    return x + x0, y + y0
-
-
-def text_pos_at_line(size, line, style, align, outside=False):
+def font_description(font):
     """
-    Calculate position of the text relative to specified line. Text is
-    aligned using line style (i.e. padding) information. 
+    Get Pango font description of a font.
 
-    The alignment is calculated from perspective of a person standing at
-    the tail and looking towards the head
-
-    - vertical alignment is from tail, through the middle, till the head
-    - horizontal alignment can be at the left or right of the line
-
-    :Parameters:
-     size
-        Width and height of text to be aligned.
-     line
-        Points defining a line.
-     style
-        Line style information like padding.
-     align
-        Horizontal and vertical alignment of text.
-     outside
-        If true the text is aligned outside the box.
-
-    TODO
-
-    - tail and head alignment at the line needs improvement
-    - consider line attached to vertical or horizontal edge of a box
+    Font descriptions are created once per font.
     """
-    width, height = size
-    pad = style.padding
-    halign, valign = align
-
-    if valign == ALIGN_TAIL:
-        p1, p2 = line[:2]
-        x0, y0 = p1
-    elif valign == ALIGN_HEAD:
-        p1, p2 = line[-2:]
-        x0, y0 = p2
-    else: # ALIGN_MIDDLE
-        p1, p2 = line_middle_segment(line)
-        x0 = (p1.x + p2.x) / 2.0
-        y0 = (p1.y + p2.y) / 2.0
-
-    dx = p2.x - p1.x
-    dy = p2.y - p1.y
-    a = atan2(dy, dx)
-
-    kx = p1.x > p2.x
-    ky = p1.y > p2.y
-
-    xml, xmr = 0, 0
-    yml, ymr = 0, 0
-    if abs(dx) < EPSILON:
-        # fixme: to get rid of x00/y00 investigate 
-        #   kx = cmp(p1.x, p1.y) 
-        # and that
-        #   ~(-2, -1, 0, 1) = (1, 0, -1, -2)
-        yml += height / 2
-        ymr += -height / 2
-    elif abs(dy) < EPSILON:
-        xml += -width / 2
-        xmr += width / 2
-
-    # (-2, -1, 0, 1) = ~(1, 0, -1, -2)
-    ym = (not kx ^ ky) - (not ky) - 2 * (kx and ky)
-
-    if abs(dx) > abs(dy): # horizontal
-        xop = ((),
-               (-(not ky), -(not kx), -kx), # right: middle, head, tail
-               (-ky, -(not kx), -kx),) # left: middle, head, tail
-        yop = ((),
-               (ym, ym, ym), # right: middle, head, tail
-               (~ym, ~ym, ~ym),) # left: middle, head, tail
-    else: # vertical
-        xm = -ky
-        xop = ((),
-               (~xm, ~xm, ~xm), # right: middle, head, tail
-               (xm, xm, xm),) # left: middle, head, tail
-        yop = ((),
-               (ym, ~xm, xm), # right: middle, head, tail
-               (~ym, ~xm, xm),) # left: middle, head, tail
-    mxop = ((),
-           (xmr, 0, 0), # right: middle, head, tail
-           (xml, 0, 0)) # left: middle, head, tail
-    myop = ((),
-           (ymr, 0, 0), # right: middle, head, tail
-           (yml, 0, 0),) # left: middle, head, tail
-
-    # fixme: simplify with vector operations, i.e.
-    #   -sin(a) * ((pad.right,) * 3) + cos(a) * (0, -pad.top, pad.bottom)
-    #   sin(a) * ((pad.left,) * 3) + cos(a) * (0, -pad.top, pad.bottom)
-    #   cos(a) * ((pad.right,) * 3) + sin(a) * (0, -pad.top, pad.bottom)
-    #   -cos(a) * ((pad.left,) * 3) + sin(a) * (0, -pad.top, pad.bottom)
-    pxop = ((),
-           (-pad.right * sin(a), -pad.right * sin(a) - pad.top * cos(a), -pad.right * sin(a) + pad.bottom * cos(a)), # right: middle, head, tail
-           (pad.left * sin(a), pad.left * sin(a) - pad.top * cos(a),  pad.left * sin(a) + pad.bottom * cos(a)),) # left: middle, head, tail
-    pyop = ((),
-           (pad.right * cos(a), pad.right * cos(a) - pad.top * sin(a), pad.right * cos(a) + pad.bottom * sin(a)), # right: middle, head, tail
-           (-pad.left * cos(a), -pad.left * cos(a) - pad.top * sin(a), -pad.left * cos(a) + pad.bottom * sin(a)),) # left: middle, head, tail
-
-    x0 += width * xop[halign][valign] + mxop[halign][valign] + pxop[halign][valign]
-    y0 += height * yop[halign][valign] + myop[halign][valign] + pyop[halign][valign]
-
-    return x0, y0
-
-
-def line_single_text_hint(line, style, align):
-    halign, valign = align
-
-    if valign == ALIGN_TAIL:
-        p1, p2 = line[:2]
-    elif valign == ALIGN_HEAD:
-        p1, p2 = line[-2:]
-    else: # ALIGN_MIDDLE
-        p1, p2 = line_middle_segment(line)
-
-    dx = p2.x - p1.x
-    dy = p2.y - p1.y
-
-    if abs(dx) < EPSILON or abs(dy) < EPSILON:
-        da = 0
-    else:
-        da = abs(dy / dx)
-   
-    # <0, 30>, <150, 180>, <-180, -150>, <-30, 0>
-    return da > 0.6
+    fd = FONTS.get(font)
+    if fd is None:
+        fd = FONTS[font] = pango.FontDescription(font)
+    return fd
 
 
-def line_middle_segment(edges):
-    """
-    Get positions of middle segment of a line represented by specified
-    edges.
+def pango_layout(cr, text, font=FONT):
     """
-    med = len(edges) // 2
-    p1, p2 = edges[med - 1: med + 1]
-    return p1, p2
+    Get Pango layout of a text.
 
+    Pango layout is created once per Cairo context and font and it is
+    reused for all texts of the context.
 
-def pango_layout(cr, text):
-    pl = PangoCairo.create_layout(cr._cr)
-    pl.set_font_description(pango.FontDescription('sans 10'))
-    _, attrs, pt, _ = pango.parse_markup(text, -1, '\0')
-    pl.set_attributes(attrs)
-    pl.set_text(pt, -1)
+    :Parameters:
+     cr
+        Cairo context (see `piuml.renderer.cr.DiagramContext`).
+     text
+        Text markup.
+     font
+        Font description.
+    """
+    pl = cr.layouts.get(font)
+    if pl is None:
+        pl = cr.layouts[font] = PangoCairo.create_layout(cr)
+        pl.set_font_description(font_description(font))
+    else:
+        # context transformation might have changed
+        PangoCairo.update_layout(cr, pl)
+    pl.set_alignment(pango.Alignment.LEFT)
+    pl.set_markup(text, -1)
     return pl
 
 
@@ -259,23 +102,24 @@ def draw_text(cr, shape, style, text,
         outside=False,
         align_f=text_pos_at_box):
 
-    pl = pango_layout(cr, text)
-    w, h = size = pango_size(pl)
-    pl.set_alignment(lalign)
+    # the size of text is measured when diagram is measured
+    w, h = size = text_size(cr, text)
 
     x, y = align_f(size, shape, style, align=align, outside=outside)
     x += pos[0]
     y += pos[1]
 
-    cr.save()
-    cr.move_to(x, y)
+    cr.bbox.add_rect(x, y, w, h)
 
-    x1, y1 = cr.user_to_device(x, y)
-    x2, y2 = cr.user_to_device(x + w, y + h)
-    PangoCairo.show_layout(cr._cr, pl)
-    cr._update_bbox((x1, y1, x2, y2))
+    # texts are not drawn at low level of detail
+    if cr.text:
+        pl = pango_layout(cr, text)
+        pl.set_alignment(lalign)
 
-    cr.restore()
+        cr.save()
+        cr.move_to(x, y)
+        PangoCairo.show_layout(cr, pl)
+        cr.restore()
 
     return size[1]
 
@@ -283,9 +127,162 @@ def draw_text(cr, shape, style, text,
 def text_size(cr, text):
     """
     Calculate total size of a multiline text.
+
+    The size is stored in text size cache, so the same text is measured
+    once.
+    """
+    size = TEXT_CACHE.get(text, FONT)
+    if size is None:
+        pl = pango_layout(cr, text)
+        size = pango_size(pl)
+        TEXT_CACHE.put(text, FONT, size)
+    return size
+
+
+
+class TextSizeCache(object):
+    """
+    Cache of text sizes with least recently used eviction.
+
+    Text size is stored under text markup and font description. The
+    cache is valid for specific version of text rendering libraries, the
+    cache file is ignored if the version does not match.
+
+    :Attributes:
+     max_size
+        Maximum number of cached text sizes.
+     version
+        Version of text rendering libraries.
+     changed
+        True if cache changed since it was loaded or saved.
+     data
+        Text sizes by text markup and font description.
+     files
+        Loaded cache files.
     """
-    pl = pango_layout(cr, text)
-    return pango_size(pl)
+    def __init__(self, max_size=TEXT_CACHE_SIZE, version=None):
+        self.max_size = max_size
+        self.version = version
+        self.changed = False
+        self.data = OrderedDict()
+        self.files = set()
+
+
+    def get(self, text, font):
+        """
+        Get size of a text or None if text size is not cached.
+
+        :Parameters:
+         text
+            Text markup.
+         font
+            Font description.
+        """
+        key = text, font
+        size = self.data.get(key)
+        if size is not None:
+            self.data.move_to_end(key)
+        return size
+
+
+    def put(self, text, font, size):
+        """
+        Store size of a text in the cache.
+
+        :Parameters:
+         text
+            Text markup.
+         font
+            Font description.
+         size
+            Width and height of the text.
+        """
+        data = self.data
+        data[text, font] = tuple(size)
+        data.move_to_end((text, font))
+        while len(data) > self.max_size:
+            data.popitem(last=False)
+        self.changed = True
+
+
+    def load(self, fn):
+        """
+        Load text sizes from cache file.
+
+        The cache file is loaded once. The errors are logged and
+        ignored.
+
+        :Parameters:
+         fn
+            Cache file name.
+        """
+        if fn in self.files:
+            return
+        self.files.add(fn)
+        try:
+            with open(fn) as f:
+                data = json.load(f)
+            if data['version'] != self.version:
+                if __debug__:
+                    log.debug('text size cache {} is outdated'.format(fn))
+                return
+            items = [((text, font), (w, h))
+                    for text, font, w, h in data['items']]
+        except (OSError, IOError) as ex:
+            log.debug('cannot read text size cache {}: {}'.format(fn, ex))
+            return
+        except (ValueError, KeyError, TypeError) as ex:
+            log.warning('invalid text size cache {}: {}'.format(fn, ex))
+            return
+
+        # recently used items of the cache take precedence
+        items = [(k, v) for k, v in items[-self.max_size:]
+                if k not in self.data]
+        loaded = OrderedDict(items)
+        loaded.update(self.data)
+        while len(loaded) > self.max_size:
+            loaded.popitem(last=False)
+        self.data = loaded
+        if __debug__:
+            log.debug('text size cache {} loaded, {} items'.format(fn,
+                len(items)))
+
+
+    def save(self, fn):
+        """
+        Save text sizes into cache file if the cache changed.
+
+        The errors are logged and ignored.
+
+        :Parameters:
+         fn
+            Cache file name.
+        """
+        if not self.changed:
+            return
+        data = {
+            'version': self.version,
+            'items': [[text, font, w, h]
+                for (text, font), (w, h) in self.data.items()],
+        }
+        try:
+            path = os.path.dirname(fn)
+            os.makedirs(path or '.', exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path or '.')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, fn)
+        except (OSError, IOError) as ex:
+            log.warning('cannot write text size cache {}: {}'.format(fn, ex))
+            return
+        self.changed = False
+        if __debug__:
+            log.debug('text size cache {} saved, {} items'.format(fn,
+                len(self.data)))
+
+
+TEXT_CACHE = TextSizeCache(version='pango {}, cairo {}'.format(
+    pango.version_string(), cairo.cairo_version_string()))
 
 
 # vim: sw=4:et:ai
@@ -0,0 +1,523 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+"""
+piUML tiled PNG renderer.
+
+Very large diagrams are rendered into PNG file tile by tile, so memory
+usage is proportional to the width of the diagram times the height of a
+tile instead of to the size of the whole image. A PNG row spans the
+whole width of the image, so a row of tiles is kept in memory as RGB
+pixel data (3 bytes per pixel) until its rows are encoded, i.e. about
+150 MB for 100000 pixels wide diagram and tiles of 512 pixels size.
+Decrease the size of a tile to render wider diagrams.
+
+The renderer draws each node and line once to find its bounding box and
+adds it into a spatial index. Then each tile is drawn on a small image
+surface with the nodes and lines intersecting the tile only. The tiles
+of a band are copied into RGB pixel data of the band, which is encoded
+into PNG stream row by row.
+
+Tile pyramid renderer writes deep zoom image (DZI) - multi-resolution
+pyramid of PNG tiles for web viewers. Each level of the pyramid is
+rendered from the laid out diagram with nodes intersecting a tile only.
+At low zoom levels compartments and association ends are not drawn (see
+`LOD_DETAIL`) and then texts are not drawn at all (see `LOD_TEXT`).
+
+The tiles are drawn on white background.
+"""
+
+import cairo
+
+import os
+import os.path
+import struct
+import sys
+import zlib
+from collections import defaultdict
+from math import ceil, floor
+
+from piuml.renderer.cr import CairoRenderer, DiagramContext
+from piuml.renderer.util import BBox
+
+import logging
+log = logging.getLogger('piuml.renderer.tile')
+
+# default width and height of a tile
+TILE_SIZE = 512
+
+# width and height of a tile of deep zoom image
+DZI_TILE_SIZE = 256
+
+# scale of diagram below which compartments and association ends are not
+# drawn
+LOD_DETAIL = 0.5
+
+# scale of diagram below which texts are not drawn
+LOD_TEXT = 0.25
+
+DZI = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" \
+Overlap="0" TileSize="{}">
+<Size Width="{}" Height="{}"/>
+</Image>
+"""
+
+# offsets of red, green and blue bytes of a pixel of Cairo image surface
+# (32-bit pixel stored in native byte order)
+if sys.byteorder == 'little':
+    RGB_OFFSETS = 2, 1, 0
+else:
+    RGB_OFFSETS = 1, 2, 3
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def copy_rgb(surface, band, band_width, x, width, height):
+    """
+    Copy pixel data of Cairo image surface into RGB pixel data of a band
+    of an image.
+
+    :Parameters:
+     surface
+        Cairo image surface of RGB24 or ARGB32 format.
+     band
+        RGB pixel data of the band (bytearray).
+     band_width
+        Width of the band.
+     x
+        Column of the band, where the surface is copied.
+     width
+        Width of the surface.
+     height
+        Height of the surface.
+    """
+    surface.flush()
+    data = surface.get_data()
+    stride = surface.get_stride()
+    r, g, b = RGB_OFFSETS
+    n = width * 3
+    for y in range(height):
+        row = bytes(data[y * stride:y * stride + width * 4])
+        k = (y * band_width + x) * 3
+        band[k:k + n:3] = row[r::4]
+        band[k + 1:k + n:3] = row[g::4]
+        band[k + 2:k + n:3] = row[b::4]
+
+
+
+def dzi_levels(width, height):
+    """
+    Calculate levels of deep zoom image.
+
+    List of scale, width and height of each level is returned. The
+    first level contains single pixel image, the image has full size at
+    the last level.
+
+    :Parameters:
+     width
+        Width of the image.
+     height
+        Height of the image.
+    """
+    n = (max(width, height) - 1).bit_length()
+    levels = []
+    for level in range(n + 1):
+        k = 2 ** (n - level)
+        levels.append((1.0 / k, -(-width // k), -(-height // k)))
+    return levels
+
+
+
+class GridIndex(object):
+    """
+    Spatial index of bounding boxes using uniform grid.
+
+    :Attributes:
+     size
+        Width and height of grid cell.
+     cells
+        Items by grid cell.
+     boxes
+        Bounding boxes of items.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.cells = defaultdict(list)
+        self.boxes = {}
+
+
+    def _range(self, v1, v2):
+        return range(int(floor(v1 / self.size)), int(floor(v2 / self.size)) + 1)
+
+
+    def add(self, item, x1, y1, x2, y2):
+        """
+        Add item into the index.
+
+        :Parameters:
+         item
+            Item identifier.
+         x1
+            Left edge of bounding box of the item.
+         y1
+            Top edge of bounding box of the item.
+         x2
+            Right edge of bounding box of the item.
+         y2
+            Bottom edge of bounding box of the item.
+        """
+        self.boxes[item] = x1, y1, x2, y2
+        for i in self._range(x1, x2):
+            for j in self._range(y1, y2):
+                self.cells[i, j].append(item)
+
+
+    def query(self, x1, y1, x2, y2):
+        """
+        Find items intersecting a rectangle.
+
+        Sorted list of items is returned.
+
+        :Parameters:
+         x1
+            Left edge of the rectangle.
+         y1
+            Top edge of the rectangle.
+         x2
+            Right edge of the rectangle.
+         y2
+            Bottom edge of the rectangle.
+        """
+        found = set()
+        for i in self._range(x1, x2):
+            for j in self._range(y1, y2):
+                found.update(self.cells.get((i, j), ()))
+
+        boxes = self.boxes
+        return sorted(k for k in found if boxes[k][0] <= x2
+            and boxes[k][2] >= x1 and boxes[k][1] <= y2 and boxes[k][3] >= y1)
+
+
+
+class PNGWriter(object):
+    """
+    Streaming PNG encoder of 8-bit RGB images.
+
+    Rows of an image are compressed and written into the output file
+    as they are added.
+
+    :Attributes:
+     f
+        Binary output file object.
+     width
+        Width of the image.
+     height
+        Height of the image.
+    """
+    def __init__(self, f, width, height, level=6):
+        self.f = f
+        self.width = width
+        self.height = height
+        self._zip = zlib.compressobj(level)
+        f.write(PNG_SIGNATURE)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2,
+            0, 0, 0))
+
+
+    def _chunk(self, kind, data):
+        self.f.write(struct.pack('>I', len(data)))
+        self.f.write(kind)
+        self.f.write(data)
+        self.f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))
+            & 0xffffffff))
+
+
+    def write(self, row):
+        """
+        Write row of the image.
+
+        :Parameters:
+         row
+            RGB pixel data of the row.
+        """
+        assert len(row) == self.width * 3
+        data = self._zip.compress(b'\x00' + row)
+        if data:
+            self._chunk(b'IDAT', data)
+
+
+    def close(self):
+        """
+        Finish PNG stream.
+        """
+        self._chunk(b'IDAT', self._zip.flush())
+        self._chunk(b'IEND', b'')
+
+
+
+class TiledRenderer(CairoRenderer):
+    """
+    Tiled PNG renderer.
+
+    :Attributes:
+     tile_size
+        Width and height of a tile.
+     items
+        List of pairs of node and its bounding box in drawing order.
+     index
+        Spatial index of the nodes.
+     bbox
+        Bounding box of the diagram.
+    """
+    def __init__(self):
+        super(TiledRenderer, self).__init__()
+        self.filetype = 'png-tiled'
+        self.tile_size = TILE_SIZE
+        self.items = []
+        self.index = None
+        self.bbox = None
+        self._collect = False
+
+
+    def __call__(self, n):
+        if not self._collect:
+            super(TiledRenderer, self).__call__(n)
+            return
+
+        self.cr.bbox = bbox = BBox()
+        super(TiledRenderer, self).__call__(n)
+        if not bbox.empty:
+            self.items.append((n, tuple(bbox)))
+
+
+    def render(self, ast):
+        """
+        Render diagram as tiled PNG file.
+
+        :Parameters:
+         ast
+            Diagram start node.
+        """
+        self.collect(ast)
+        self.save_diagram(ast)
+
+
+    def v_diagram(self, n):
+        # the surfaces are created for each tile
+        pass
+
+
+    def collect(self, ast):
+        """
+        Find bounding boxes of diagram nodes and create spatial index of
+        the nodes.
+
+        The nodes are drawn on an image surface of one pixel size.
+
+        :Parameters:
+         ast
+            Diagram start node.
+        """
+        self.cr = DiagramContext(cairo.ImageSurface(cairo.FORMAT_RGB24, 1, 1))
+        self.items = []
+        self._collect = True
+        try:
+            self.preorder(ast)
+        finally:
+            self._collect = False
+
+        self.bbox = BBox()
+        self.index = GridIndex(self.tile_size)
+        for k, (n, bbox) in enumerate(self.items):
+            self.bbox.add(*bbox)
+            self.index.add(k, *bbox)
+
+        if __debug__:
+            log.debug('{} nodes in spatial index'.format(len(self.items)))
+
+
+    def draw(self, x, y, width, height, scale=1.0, text=True):
+        """
+        Draw region of the diagram on image surface.
+
+        The nodes intersecting the region are drawn only. The image
+        surface is returned.
+
+        :Parameters:
+         x
+            Left edge of the region.
+         y
+            Top edge of the region.
+         width
+            Width of the image surface.
+         height
+            Height of the image surface.
+         scale
+            Scale of the diagram.
+         text
+            Draw texts if true.
+        """
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        cr = self.cr = DiagramContext(surface)
+        cr.text = text
+        cr.set_source_rgb(1, 1, 1)
+        cr.paint()
+        cr.set_source_rgb(0, 0, 0)
+        cr.scale(scale, scale)
+        cr.translate(-x, -y)
+
+        found = self.index.query(x, y, x + width / scale, y + height / scale)
+        for k in found:
+            self(self.items[k][0])
+        return surface
+
+
+    def save_diagram(self, n):
+        """
+        Generate tiled PNG files with UML diagram.
+        """
+        for filetype, output in self.all_outputs():
+            if isinstance(output, str):
+                with open(output, 'wb') as f:
+                    self._save_png(f)
+            else:
+                self._save_png(output)
+
+
+    def _extents(self):
+        """
+        Get position and size of the diagram image.
+        """
+        x1, y1, x2, y2 = self.bbox if not self.bbox.empty else (0, 0, 1, 1)
+        x1, y1 = int(floor(x1)), int(floor(y1))
+        return x1, y1, int(ceil(x2)) - x1, int(ceil(y2)) - y1
+
+
+    def _save_png(self, f):
+        """
+        Encode tiles of the diagram into PNG stream.
+
+        :Parameters:
+         f
+            Binary output file object.
+        """
+        x1, y1, width, height = self._extents()
+        size = self.tile_size
+
+        writer = PNGWriter(f, width, height)
+        # RGB pixel data of a row of tiles, the band is the only buffer
+        # proportional to the width of the diagram
+        band = bytearray(width * min(size, height) * 3)
+        view = memoryview(band)
+        n = width * 3
+        for ty in range(0, height, size):
+            th = min(size, height - ty)
+            for tx in range(0, width, size):
+                tw = min(size, width - tx)
+                surface = self.draw(x1 + tx, y1 + ty, tw, th)
+                copy_rgb(surface, band, width, tx, tw, th)
+                surface.finish()
+            for r in range(th):
+                writer.write(view[r * n:(r + 1) * n])
+        writer.close()
+
+
+
+class PyramidRenderer(TiledRenderer):
+    """
+    Deep zoom image (DZI) tile pyramid renderer.
+
+    The output is DZI descriptor file name. The tiles of level `n` are
+    written into `<name>_files/<n>` directory as `<column>_<row>.png`
+    files. The level 0 contains single pixel image, the diagram is
+    rendered in full size at the last level.
+
+    :Attributes:
+     detail
+        Draw compartments and association ends if true.
+    """
+    def __init__(self):
+        super(PyramidRenderer, self).__init__()
+        self.filetype = 'dzi'
+        self.tile_size = DZI_TILE_SIZE
+        self.detail = True
+
+
+    def _compartment(self, *args, **kw):
+        if self.detail:
+            super(PyramidRenderer, self)._compartment(*args, **kw)
+
+
+    def _draw_association_end(self, *args, **kw):
+        if self.detail:
+            super(PyramidRenderer, self)._draw_association_end(*args, **kw)
+
+
+    def save_diagram(self, n):
+        """
+        Generate deep zoom images with UML diagram.
+        """
+        for filetype, output in self.all_outputs():
+            if not isinstance(output, str):
+                raise ValueError('Tile pyramid can be written into files'
+                    ' only')
+            self._save_pyramid(output)
+
+
+    def _save_pyramid(self, fn):
+        """
+        Write tiles of all levels of deep zoom image and its descriptor.
+
+        :Parameters:
+         fn
+            Deep zoom image descriptor file name.
+        """
+        x1, y1, width, height = self._extents()
+        size = self.tile_size
+        path = os.path.splitext(fn)[0] + '_files'
+
+        try:
+            for level, (scale, lw, lh) in enumerate(dzi_levels(width, height)):
+                self.detail = scale >= LOD_DETAIL
+                text = scale >= LOD_TEXT
+
+                dn = os.path.join(path, str(level))
+                os.makedirs(dn, exist_ok=True)
+                for row, ty in enumerate(range(0, lh, size)):
+                    th = min(size, lh - ty)
+                    for col, tx in enumerate(range(0, lw, size)):
+                        tw = min(size, lw - tx)
+                        surface = self.draw(x1 + tx / scale, y1 + ty / scale,
+                            tw, th, scale, text)
+                        surface.write_to_png(os.path.join(dn,
+                            '{}_{}.png'.format(col, row)))
+                        surface.finish()
+                if __debug__:
+                    log.debug('level {} of deep zoom image {}x{} with scale'
+                        ' {}'.format(level, lw, lh, scale))
+        finally:
+            self.detail = True
+
+        with open(fn, 'w') as f:
+            f.write(DZI.format(size, width, height))
+
+
+# vim: sw=4:et:ai
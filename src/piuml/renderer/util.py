@@ -19,9 +19,31 @@
 
 """
 piUML renderer utils.
+
+The utilities (i.e. text positioning routines) do not depend on Cairo
+and Pango, so they can be used by all renderers.
 """
 
-from piuml.data import KEYWORDS
+import io
+from contextlib import contextmanager
+from math import atan2, sin, cos
+
+from piuml.data import PackagingElement, KEYWORDS
+
+# Horizontal align.
+ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT = -1, 0, 1
+
+# Vertical align.
+ALIGN_TOP, ALIGN_MIDDLE, ALIGN_BOTTOM = -1, 0, 1
+
+# Vertical line align (along the line from tail to head).
+ALIGN_TAIL, ALIGN_HEAD = -1, 1
+
+EPSILON = 1e-6
+
+# font description of diagram text
+FONT = 'sans 10'
+
 
 def st_fmt(stereotypes):
     """
@@ -38,4 +60,379 @@ def st_fmt(stereotypes):
     result = keyword, stereotype
     return ' '.join(fmt % r for r in result if r)
 
+
+def _name(node, bold=True, underline=False, fmt='{}', skip_keyword=False):
+    texts = []
+    if node.stereotypes:
+        k = 0
+        if skip_keyword and node.stereotypes[0] in KEYWORDS:
+            k = 1
+        if k == 0 or len(node.stereotypes) > 2:
+            texts.append('<span size="small">{}</span>' \
+                    .format(st_fmt(node.stereotypes[k:])))
+    name = node.name.replace('\\n', '\n')
+    if name:
+        name = fmt.format(name)
+        if bold:
+            name = '<b>{}</b>'.format(name)
+        if underline:
+            name = '<u>{}</u>'.format(name)
+        texts.append(name)
+    return '\n'.join(texts)
+
+
+def _is_packaging(node):
+    return isinstance(node, PackagingElement) and len(node) > 0
+
+
+def _features(node, ft):
+    return '\n'.join(str(f) for f in node.data[ft])
+
+
+def _head_size(style):
+    ph = style.padding.top + style.padding.bottom
+    height = style.size.height
+
+    k = len(style.compartment) - 1
+    return height - k * ph - sum(style.compartment[1:])
+
+
+def text_pos_at_box(size, box, style, align, outside=False):
+    """
+    Calculate position of the text relative to containing box.
+
+    :Parameters:
+     size
+        Width and height of text to be aligned.
+     box
+        Containing box.
+     style
+        Style of containing box (i.e. position and padding).
+     align
+        Horizontal and vertical alignment of text.
+     outside
+        If true the text is aligned outside the box.
+    """
+    w, h = size # size of the text
+    width, height = box
+    x0, y0 = style.pos
+    pad = style.padding
+
+    halign, valign = align
+
+    if outside:
+        if halign == ALIGN_LEFT:
+            x = -w - pad.left
+        elif halign == ALIGN_CENTER:
+            x = (width - w) / 2
+        elif halign == ALIGN_RIGHT:
+            x = width + pad.right
+        else:
+            assert False
+
+        if valign == ALIGN_TOP:
+            y = -h - pad.top
+        elif valign == ALIGN_MIDDLE:
+            y = (height - h) / 2.0 + pad.top - pad.bottom
+        elif valign == ALIGN_BOTTOM:
+            y = height + pad.bottom
+        else:
+            assert False
+    else:
+        if halign == ALIGN_LEFT:
+            x = pad.left
+        elif halign == ALIGN_CENTER:
+            x = (width - w) / 2.0 + pad.left - pad.right
+        elif halign == ALIGN_RIGHT:
+            x = width - w - pad.right
+        else:
+            assert False
+
+        if valign == ALIGN_TOP:
+            y = pad.top
+        elif valign == ALIGN_MIDDLE:
+            y = (height - h) / 2.0 + pad.top - pad.bottom
+        elif valign == ALIGN_BOTTOM:
+            y = height - h - pad.bottom
+        else:
+            assert False
+    return x + x0, y + y0
+
+
+def text_pos_at_line(size, line, style, align, outside=False):
+    """
+    Calculate position of the text relative to specified line. Text is
+    aligned using line style (i.e. padding) information. 
+
+    The alignment is calculated from perspective of a person standing at
+    the tail and looking towards the head
+
+    - vertical alignment is from tail, through the middle, till the head
+    - horizontal alignment can be at the left or right of the line
+
+    :Parameters:
+     size
+        Width and height of text to be aligned.
+     line
+        Points defining a line.
+     style
+        Line style information like padding.
+     align
+        Horizontal and vertical alignment of text.
+     outside
+        If true the text is aligned outside the box.
+
+    TODO
+
+    - tail and head alignment at the line needs improvement
+    - consider line attached to vertical or horizontal edge of a box
+    """
+    width, height = size
+    pad = style.padding
+    halign, valign = align
+
+    if valign == ALIGN_TAIL:
+        p1, p2 = line[:2]
+        x0, y0 = p1
+    elif valign == ALIGN_HEAD:
+        p1, p2 = line[-2:]
+        x0, y0 = p2
+    else: # ALIGN_MIDDLE
+        p1, p2 = line_middle_segment(line)
+        x0 = (p1.x + p2.x) / 2.0
+        y0 = (p1.y + p2.y) / 2.0
+
+    dx = p2.x - p1.x
+    dy = p2.y - p1.y
+    a = atan2(dy, dx)
+
+    kx = p1.x > p2.x
+    ky = p1.y > p2.y
+
+    xml, xmr = 0, 0
+    yml, ymr = 0, 0
+    if abs(dx) < EPSILON:
+        # fixme: to get rid of x00/y00 investigate 
+        #   kx = cmp(p1.x, p1.y) 
+        # and that
+        #   ~(-2, -1, 0, 1) = (1, 0, -1, -2)
+        yml += height / 2
+        ymr += -height / 2
+    elif abs(dy) < EPSILON:
+        xml += -width / 2
+        xmr += width / 2
+
+    # (-2, -1, 0, 1) = ~(1, 0, -1, -2)
+    ym = (not kx ^ ky) - (not ky) - 2 * (kx and ky)
+
+    if abs(dx) > abs(dy): # horizontal
+        xop = ((),
+               (-(not ky), -(not kx), -kx), # right: middle, head, tail
+               (-ky, -(not kx), -kx),) # left: middle, head, tail
+        yop = ((),
+               (ym, ym, ym), # right: middle, head, tail
+               (~ym, ~ym, ~ym),) # left: middle, head, tail
+    else: # vertical
+        xm = -ky
+        xop = ((),
+               (~xm, ~xm, ~xm), # right: middle, head, tail
+               (xm, xm, xm),) # left: middle, head, tail
+        yop = ((),
+               (ym, ~xm, xm), # right: middle, head, tail
+               (~ym, ~xm, xm),) # left: middle, head, tail
+    mxop = ((),
+           (xmr, 0, 0), # right: middle, head, tail
+           (xml, 0, 0)) # left: middle, head, tail
+    myop = ((),
+           (ymr, 0, 0), # right: middle, head, tail
+           (yml, 0, 0),) # left: middle, head, tail
+
+    # fixme: simplify with vector operations, i.e.
+    #   -sin(a) * ((pad.right,) * 3) + cos(a) * (0, -pad.top, pad.bottom)
+    #   sin(a) * ((pad.left,) * 3) + cos(a) * (0, -pad.top, pad.bottom)
+    #   cos(a) * ((pad.right,) * 3) + sin(a) * (0, -pad.top, pad.bottom)
+    #   -cos(a) * ((pad.left,) * 3) + sin(a) * (0, -pad.top, pad.bottom)
+    pxop = ((),
+           (-pad.right * sin(a), -pad.right * sin(a) - pad.top * cos(a), -pad.right * sin(a) + pad.bottom * cos(a)), # right: middle, head, tail
+           (pad.left * sin(a), pad.left * sin(a) - pad.top * cos(a),  pad.left * sin(a) + pad.bottom * cos(a)),) # left: middle, head, tail
+    pyop = ((),
+           (pad.right * cos(a), pad.right * cos(a) - pad.top * sin(a), pad.right * cos(a) + pad.bottom * sin(a)), # right: middle, head, tail
+           (-pad.left * cos(a), -pad.left * cos(a) - pad.top * sin(a), -pad.left * cos(a) + pad.bottom * sin(a)),) # left: middle, head, tail
+
+    x0 += width * xop[halign][valign] + mxop[halign][valign] + pxop[halign][valign]
+    y0 += height * yop[halign][valign] + myop[halign][valign] + pyop[halign][valign]
+
+    return x0, y0
+
+
+def line_single_text_hint(line, style, align):
+    halign, valign = align
+
+    if valign == ALIGN_TAIL:
+        p1, p2 = line[:2]
+    elif valign == ALIGN_HEAD:
+        p1, p2 = line[-2:]
+    else: # ALIGN_MIDDLE
+        p1, p2 = line_middle_segment(line)
+
+    dx = p2.x - p1.x
+    dy = p2.y - p1.y
+
+    if abs(dx) < EPSILON or abs(dy) < EPSILON:
+        da = 0
+    else:
+        da = abs(dy / dx)
+   
+    # <0, 30>, <150, 180>, <-180, -150>, <-30, 0>
+    return da > 0.6
+
+
+def line_middle_segment(edges):
+    """
+    Get positions of middle segment of a line represented by specified
+    edges.
+    """
+    med = len(edges) // 2
+    p1, p2 = edges[med - 1: med + 1]
+    return p1, p2
+
+
+@contextmanager
+def text_output(output):
+    """
+    Open renderer output as text stream.
+
+    :Parameters:
+     output
+        Output file name or writable (text or binary) file object.
+    """
+    if isinstance(output, str):
+        with open(output, 'w', encoding='utf-8') as f:
+            yield f
+    elif isinstance(output, io.TextIOBase):
+        yield output
+    else:
+        f = io.TextIOWrapper(output, encoding='utf-8')
+        yield f
+        f.flush()
+        f.detach()
+
+
+
+class BBox(object):
+    """
+    Bounding box accumulator.
+
+    The bounding box is extended with rectangles and points of drawn
+    shapes. It is empty until first rectangle or point is added.
+
+    :Attributes:
+     x1
+        Left edge of the bounding box.
+     y1
+        Top edge of the bounding box.
+     x2
+        Right edge of the bounding box.
+     y2
+        Bottom edge of the bounding box.
+    """
+    def __init__(self):
+        self.x1 = self.y1 = float('inf')
+        self.x2 = self.y2 = float('-inf')
+
+
+    def __iter__(self):
+        return iter((self.x1, self.y1, self.x2, self.y2))
+
+
+    def __repr__(self):
+        return 'BBox({}, {}, {}, {})'.format(*self)
+
+
+    @property
+    def empty(self):
+        """
+        True if nothing was added to the bounding box.
+        """
+        return self.x1 > self.x2
+
+
+    def add(self, x1, y1, x2, y2):
+        """
+        Extend bounding box with a box.
+
+        :Parameters:
+         x1
+            Left edge of the box.
+         y1
+            Top edge of the box.
+         x2
+            Right edge of the box.
+         y2
+            Bottom edge of the box.
+        """
+        if x1 < self.x1:
+            self.x1 = x1
+        if y1 < self.y1:
+            self.y1 = y1
+        if x2 > self.x2:
+            self.x2 = x2
+        if y2 > self.y2:
+            self.y2 = y2
+
+
+    def add_rect(self, x, y, width, height, pad=0):
+        """
+        Extend bounding box with a rectangle.
+
+        :Parameters:
+         x
+            Left edge of the rectangle.
+         y
+            Top edge of the rectangle.
+         width
+            Width of the rectangle.
+         height
+            Height of the rectangle.
+         pad
+            Padding added around the rectangle, i.e. half of line width.
+        """
+        self.add(x - pad, y - pad, x + width + pad, y + height + pad)
+
+
+    def add_points(self, points, pad=0):
+        """
+        Extend bounding box with points.
+
+        :Parameters:
+         points
+            List of points.
+         pad
+            Padding added around the points, i.e. half of line width.
+        """
+        xs, ys = zip(*points)
+        self.add(min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+
+    def contains(self, x1, y1, x2, y2, tolerance=0):
+        """
+        Check if bounding box contains a box.
+
+        :Parameters:
+         x1
+            Left edge of the box.
+         y1
+            Top edge of the box.
+         x2
+            Right edge of the box.
+         y2
+            Bottom edge of the box.
+         tolerance
+            Allowed excess of the box over the bounding box.
+        """
+        t = tolerance
+        return self.x1 - t <= x1 and self.y1 - t <= y1 \
+            and x2 <= self.x2 + t and y2 <= self.y2 + t
+
+
 # vim: sw=4:et:ai
@@ -0,0 +1,644 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Compact binary serialization of piUML diagrams.
+
+Serialized diagram contains node tree, relationships, alignment
+definitions, views and optionally geometry of laid out diagram (style
+information of nodes). The data can be loaded without piUML parser,
+so parsing, layout and rendering of a diagram can be performed by
+different processes.
+
+Serialized data consists of
+
+header
+    Magic bytes, format version, flags and sizes of the other parts.
+string table
+    All strings used by a diagram - each string is stored once.
+integer stream
+    Little endian, 32-bit integers describing nodes and their data. Strings
+    and nodes are referenced by their index in string and node tables.
+float stream
+    Little endian, 64-bit floats describing geometry of nodes.
+
+Integer and float streams are encoded and decoded with `array` module.
+Node attributes and features of elements are stored with fixed layout, so
+they are decoded without per value type tags. Additional node data (i.e.
+association ends) is stored as tagged values.
+"""
+
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import islice
+
+from piuml.data import Element, PackagingElement, Relationship, Diagram, \
+        NodeGroup, Section, Align, View, Attribute, Operation, Mult, Span, \
+        unwind
+from piuml.style import Pos, Size, Area, BoxStyle, LineStyle
+
+import logging
+log = logging.getLogger('piuml.serial')
+
+MAGIC = b'PIUM'
+
+# version of data format
+VERSION = 2
+
+# flags of serialized data
+F_GEOMETRY = 1
+
+HEADER = struct.Struct('<4sBBxxIII')
+
+# kinds of nodes
+K_ELEMENT, K_PACKAGING, K_RELATIONSHIP, K_DIAGRAM, K_NODEGROUP, \
+    K_SECTION, K_ALIGN, K_VIEW = range(8)
+
+NODE_CLASSES = (Element, PackagingElement, Relationship, Diagram, NodeGroup,
+    Section, Align, View)
+
+# value tags
+T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_LIST, T_TUPLE, T_DICT, \
+    T_NODE, T_ATTRIBUTE, T_OPERATION, T_MULT = range(13)
+
+# style tags
+S_NONE, S_BOX, S_LINE = range(3)
+
+# element data stored with fixed layout
+FEATURES = ('attributes', 'operations', 'stattrs')
+
+
+def _kind(n):
+    """
+    Get kind of a node.
+    """
+    cls = type(n)
+    if cls is Diagram:
+        return K_DIAGRAM
+    elif cls is NodeGroup:
+        return K_NODEGROUP
+    elif isinstance(n, Relationship):
+        return K_RELATIONSHIP
+    elif isinstance(n, PackagingElement):
+        return K_PACKAGING
+    elif isinstance(n, Element):
+        return K_ELEMENT
+    elif isinstance(n, Section):
+        return K_SECTION
+    elif isinstance(n, Align):
+        return K_ALIGN
+    elif isinstance(n, View):
+        return K_VIEW
+    raise TypeError('Cannot serialize node {!r}'.format(n))
+
+
+
+class Encoder(object):
+    """
+    Diagram encoder.
+
+    :Attributes:
+     strings
+        String table (index 0 is reserved for None).
+     nodes
+        Node table.
+     ints
+        Integer stream.
+     floats
+        Float stream.
+    """
+    def __init__(self):
+        self.strings = {None: 0}
+        self.nodes = {}
+        self.ints = array('i')
+        self.floats = array('d')
+
+
+    def string(self, s):
+        """
+        Get index of a string in string table.
+        """
+        k = self.strings.get(s)
+        if k is None:
+            if '\0' in s:
+                raise ValueError('Cannot serialize string with NUL' \
+                        ' character: {!r}'.format(s))
+            k = self.strings[s] = len(self.strings)
+        return k
+
+
+    def refs(self, nodes):
+        """
+        Encode list of node references.
+        """
+        ints = self.ints
+        ints.append(len(nodes))
+        ints.extend(self.nodes[id(n)] for n in nodes)
+
+
+    def span(self, span):
+        """
+        Encode position of a node in piUML source.
+        """
+        if span is None:
+            self.ints.append(0)
+        else:
+            self.ints.extend((1, span.start, span.end, span.line, span.col))
+
+
+    def element(self, n):
+        """
+        Encode stereotypes, attributes and operations of an element.
+
+        Other element data is encoded as tagged values.
+        """
+        ints = self.ints
+        string = self.string
+        st = n.stereotypes
+        if st is None:
+            ints.append(0)
+        else:
+            ints.append(len(st) + 1)
+            ints.extend(string(s) for s in st)
+
+        data = n.data
+        attrs = data.get('attributes', ())
+        ints.append(len(attrs))
+        for a in attrs:
+            m = a.mult
+            ints.extend((string(a.name), string(a.type), string(a.value),
+                0 if m is None else string(m.lower),
+                0 if m is None else string(m.upper)))
+        opers = data.get('operations', ())
+        ints.append(len(opers))
+        ints.extend(string(o.name) for o in opers)
+        stattrs = data.get('stattrs', ())
+        ints.append(len(stattrs))
+        for f in stattrs:
+            self.value(f)
+
+        items = [(k, v) for k, v in data.items() if k not in FEATURES]
+        ints.append(len(items))
+        for k, v in items:
+            ints.append(string(k))
+            self.value(v)
+
+
+    def value(self, v):
+        """
+        Encode a tagged value.
+        """
+        ints = self.ints
+        if v is None:
+            ints.append(T_NONE)
+        elif v is True:
+            ints.append(T_TRUE)
+        elif v is False:
+            ints.append(T_FALSE)
+        elif isinstance(v, str):
+            ints.extend((T_STR, self.string(v)))
+        elif isinstance(v, int):
+            ints.extend((T_INT, v))
+        elif isinstance(v, float):
+            ints.append(T_FLOAT)
+            self.floats.append(v)
+        elif isinstance(v, (Element, Align)):
+            ints.extend((T_NODE, self.nodes[id(v)]))
+        elif isinstance(v, list):
+            ints.extend((T_LIST, len(v)))
+            for k in v:
+                self.value(k)
+        elif isinstance(v, tuple):
+            ints.extend((T_TUPLE, len(v)))
+            for k in v:
+                self.value(k)
+        elif isinstance(v, dict):
+            ints.extend((T_DICT, len(v)))
+            for k, kv in v.items():
+                self.value(k)
+                self.value(kv)
+        elif isinstance(v, Attribute):
+            ints.append(T_ATTRIBUTE)
+            self.value(v.name)
+            self.value(v.type)
+            self.value(v.value)
+            self.value(v.mult)
+        elif isinstance(v, Operation):
+            ints.append(T_OPERATION)
+            self.value(v.name)
+        elif isinstance(v, Mult):
+            ints.append(T_MULT)
+            self.value(v.lower)
+            self.value(v.upper)
+        else:
+            raise TypeError('Cannot serialize value {!r}'.format(v))
+
+
+    def style(self, n):
+        """
+        Encode style information (geometry) of a node.
+        """
+        style = n.__dict__.get('style') if isinstance(n, Element) else None
+        floats = self.floats
+        if style is None:
+            self.ints.append(S_NONE)
+        elif isinstance(style, BoxStyle):
+            self.ints.extend((S_BOX, len(style.compartment)))
+            floats.extend(style.pos)
+            floats.extend(style.size)
+            floats.extend(style.min_size)
+            floats.extend(style.icon_size)
+            floats.extend(style.margin)
+            floats.extend(style.padding)
+            floats.extend(style.compartment)
+        else:
+            self.ints.extend((S_LINE, len(style.edges)))
+            floats.append(style.min_length)
+            floats.extend(style.margin)
+            floats.extend(style.padding)
+            for p in style.edges:
+                floats.extend(p)
+
+
+    def encode(self, ast, geometry=False):
+        """
+        Encode a diagram.
+
+        :Parameters:
+         ast
+            Diagram to encode.
+         geometry
+            Encode geometry of the nodes if true.
+        """
+        nodes = []
+        for n in unwind(ast):
+            nodes.append(n)
+            if isinstance(n, Section):
+                nodes.extend(n.data)
+        for v in ast.views.values():
+            nodes.extend((v, v.layout))
+            nodes.extend(v.layout.data)
+        self.nodes = {id(n): i for i, n in enumerate(nodes)}
+
+        # node table
+        ints = self.ints
+        string = self.string
+        kinds = [_kind(n) for n in nodes]
+        for n, k in zip(nodes, kinds):
+            if k == K_SECTION:
+                ints.extend((k, string(n.name), 0, 0))
+            elif k == K_ALIGN:
+                ints.extend((k, string(n.id), string(n.type), 0))
+            elif k == K_VIEW:
+                ints.extend((k, string(n.id), 0, 0))
+            else:
+                ints.extend((k, string(n.id), string(n.cls), string(n.name)))
+
+        # nodes with generated ids
+        generated = [i for i, (n, k) in enumerate(zip(nodes, kinds))
+            if k != K_SECTION and k != K_VIEW and n.generated]
+        ints.append(len(generated))
+        ints.extend(generated)
+
+        # node data
+        refs = self.refs
+        span = self.span
+        for n, k in zip(nodes, kinds):
+            if k <= K_NODEGROUP:
+                self.element(n)
+                span(n.span)
+                if k == K_RELATIONSHIP:
+                    ints.extend((self.nodes[id(n.tail)],
+                        self.nodes[id(n.head)]))
+                elif k != K_ELEMENT:
+                    refs(n.children)
+                if k == K_DIAGRAM:
+                    refs(list(n.views.values()))
+            elif k == K_SECTION:
+                refs(n.data)
+            elif k == K_ALIGN:
+                refs(n.nodes)
+                span(n.span)
+            else:
+                refs(n.nodes)
+                ints.append(self.nodes[id(n.layout)])
+                span(n.span)
+
+        flags = 0
+        if geometry:
+            flags |= F_GEOMETRY
+            for n in nodes:
+                self.style(n)
+
+        strings = '\0'.join(list(self.strings)[1:]).encode('utf-8')
+        floats = self.floats
+        if sys.byteorder == 'big':
+            ints.byteswap()
+            floats.byteswap()
+
+        header = HEADER.pack(MAGIC, VERSION, flags, len(nodes), len(strings),
+                len(ints))
+        return b''.join((header, strings, ints.tobytes(), floats.tobytes()))
+
+
+
+class Decoder(object):
+    """
+    Diagram decoder.
+
+    :Attributes:
+     strings
+        String table (index 0 is reserved for None).
+     nodes
+        Node table.
+     ints
+        Iterator over integer stream.
+     floats
+        Iterator over float stream.
+    """
+    def __init__(self):
+        self.strings = [None]
+        self.nodes = []
+        self.ints = None
+        self.floats = None
+
+
+    def value(self):
+        """
+        Decode a tagged value.
+        """
+        ints = self.ints
+        value = self.value
+        t = next(ints)
+        if t == T_STR:
+            return self.strings[next(ints)]
+        elif t == T_NONE:
+            return None
+        elif t == T_NODE:
+            return self.nodes[next(ints)]
+        elif t == T_TUPLE:
+            return tuple(value() for i in range(next(ints)))
+        elif t == T_DICT:
+            return dict((value(), value()) for i in range(next(ints)))
+        elif t == T_LIST:
+            return [value() for i in range(next(ints))]
+        elif t == T_ATTRIBUTE:
+            return Attribute(value(), value(), value(), value())
+        elif t == T_OPERATION:
+            return Operation(value())
+        elif t == T_MULT:
+            return Mult(value(), value())
+        elif t == T_INT:
+            return next(ints)
+        elif t == T_FLOAT:
+            return next(self.floats)
+        elif t == T_TRUE:
+            return True
+        elif t == T_FALSE:
+            return False
+        raise ValueError('Invalid value tag {}'.format(t))
+
+
+    def style(self, n):
+        """
+        Decode style information (geometry) of a node.
+
+        Style information is created without calling constructors of
+        style classes as all attributes are set.
+        """
+        t = next(self.ints)
+        if t == S_NONE:
+            return
+
+        new = object.__new__
+        k = next(self.ints)
+        if t == S_BOX:
+            x, y, w, h, mw, mh, iw, ih, *v = islice(self.floats, 16 + k)
+            style = new(BoxStyle)
+            style.pos = Pos(x, y)
+            style.size = Size(w, h)
+            style.min_size = Size(mw, mh)
+            style.icon_size = Size(iw, ih)
+            style.margin = Area(*v[:4])
+            style.padding = Area(*v[4:8])
+            style.compartment = v[8:]
+        elif t == S_LINE:
+            length, *v = islice(self.floats, 9 + 2 * k)
+            style = new(LineStyle)
+            style.min_length = length
+            style.margin = Area(*v[:4])
+            style.padding = Area(*v[4:8])
+            edges = iter(v[8:])
+            style.edges = tuple(Pos(x, y) for x, y in zip(edges, edges))
+        else:
+            raise ValueError('Invalid style tag {}'.format(t))
+        n.style = style
+
+
+    def decode(self, data):
+        """
+        Decode a diagram.
+
+        :Parameters:
+         data
+            Serialized diagram.
+        """
+        magic, version, flags, count, ssize, isize = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a serialized piUML diagram')
+        if version != VERSION:
+            raise ValueError('Unsupported data format version {}' \
+                    .format(version))
+
+        offset = HEADER.size
+        strings = data[offset:offset + ssize].decode('utf-8')
+        self.strings = strings = [None] + strings.split('\0')
+        offset += ssize
+
+        ints = array('i')
+        size = isize * ints.itemsize
+        ints.frombytes(data[offset:offset + size])
+        floats = array('d')
+        floats.frombytes(data[offset + size:])
+        if sys.byteorder == 'big':
+            ints.byteswap()
+            floats.byteswap()
+        self.ints = ints = iter(ints)
+        self.floats = iter(floats)
+
+        # node table, nodes are created without calling their constructors
+        # as all their attributes are set below
+        nodes = self.nodes = []
+        table = iter(list(islice(ints, 4 * count)))
+        kinds = []
+        for k, s1, s2, s3 in zip(table, table, table, table):
+            cls = NODE_CLASSES[k]
+            n = cls.__new__(cls)
+            if k == K_SECTION:
+                n.name = strings[s1]
+            elif k == K_ALIGN:
+                n.id = strings[s1]
+                n.type = strings[s2]
+                n.generated = False
+            elif k == K_VIEW:
+                n.id = strings[s1]
+            else:
+                n.id, n.cls, n.name = strings[s1], strings[s2], strings[s3]
+                n.parent = None
+                n.generated = False
+            nodes.append(n)
+            kinds.append(k)
+
+        for j in islice(ints, next(ints)):
+            nodes[j].generated = True
+
+        # node data
+        value = self.value
+        new = object.__new__
+        for n, k in zip(nodes, kinds):
+            if k <= K_NODEGROUP:
+                c = next(ints)
+                n.stereotypes = None if c == 0 \
+                        else [strings[j] for j in islice(ints, c - 1)]
+
+                # features are created without calling their
+                # constructors, which is twice as fast
+                attrs = []
+                c = next(ints)
+                if c:
+                    items = iter(list(islice(ints, 5 * c)))
+                    for name, type, val, lower, upper \
+                            in zip(items, items, items, items, items):
+                        a = new(Attribute)
+                        a.name = strings[name]
+                        a.type = strings[type]
+                        a.value = strings[val]
+                        a.mult = None
+                        if lower:
+                            a.mult = m = new(Mult)
+                            m.lower = strings[lower]
+                            m.upper = strings[upper]
+                        attrs.append(a)
+                opers = []
+                for j in islice(ints, next(ints)):
+                    o = new(Operation)
+                    o.name = strings[j]
+                    opers.append(o)
+                data = {
+                    'attributes': attrs,
+                    'operations': opers,
+                    'stattrs': [value() for i in range(next(ints))],
+                }
+                for i in range(next(ints)):
+                    key = strings[next(ints)]
+                    data[key] = value()
+                n.data = data
+
+                n.span = Span(*islice(ints, 4)) if next(ints) else None
+                if k == K_RELATIONSHIP:
+                    n.tail = nodes[next(ints)]
+                    n.head = nodes[next(ints)]
+                elif k != K_ELEMENT:
+                    c = next(ints)
+                    n.children = children = [nodes[j]
+                            for j in islice(ints, c)]
+                    for c in children:
+                        c.parent = n
+                if k == K_DIAGRAM:
+                    c = next(ints)
+                    n.index = None
+                    n.views = OrderedDict((nodes[j].id, nodes[j])
+                            for j in islice(ints, c))
+            elif k == K_SECTION:
+                c = next(ints)
+                n.data = [nodes[j] for j in islice(ints, c)]
+            else:
+                c = next(ints)
+                n.nodes = [nodes[j] for j in islice(ints, c)]
+                if k == K_VIEW:
+                    n.layout = nodes[next(ints)]
+                n.span = Span(*islice(ints, 4)) if next(ints) else None
+
+        if flags & F_GEOMETRY:
+            for n in nodes:
+                self.style(n)
+
+        if not nodes or kinds[0] != K_DIAGRAM:
+            raise ValueError('No diagram in serialized data')
+        return nodes[0]
+
+
+
+def dumps(ast, geometry=False):
+    """
+    Serialize a diagram.
+
+    Serialized data is returned as bytes.
+
+    :Parameters:
+     ast
+        Diagram to serialize.
+     geometry
+        Serialize geometry of the nodes (style information) if true.
+    """
+    return Encoder().encode(ast, geometry)
+
+
+def loads(data):
+    """
+    Load serialized diagram.
+
+    Source index of loaded diagram is not set.
+
+    :Parameters:
+     data
+        Serialized diagram.
+    """
+    return Decoder().decode(data)
+
+
+def dump(ast, f, geometry=False):
+    """
+    Serialize a diagram into a binary file.
+
+    :Parameters:
+     ast
+        Diagram to serialize.
+     f
+        Binary file object.
+     geometry
+        Serialize geometry of the nodes (style information) if true.
+    """
+    f.write(dumps(ast, geometry))
+
+
+def load(f):
+    """
+    Load serialized diagram from a binary file.
+
+    :Parameters:
+     f
+        Binary file object.
+    """
+    return loads(f.read())
+
+
+# vim: sw=4:et:ai
@@ -166,48 +166,50 @@ class StyleDescriptor(object):
     """
     Injects style information into UML diagram items.
 
+    Style information is created on first access and stored in the
+    instance of diagram item, so copies of diagram items (i.e. views of a
+    diagram) get copies of style information.
+
     :Attributes:
      cls
         Class for a diagram item.
-     data
-        Style information per UML diagram item.
     """
     def __init__(self, cls):
         super(StyleDescriptor, self).__init__()
         self.cls = cls
-        self.data = {}
 
     def __get__(self, obj, cls=None):
         """
         Get style information for an object.
         """
-        style = self.data.get(obj)
-        if style is None:
-            style = self.data[obj] = self.cls()
-
-            # few exceptions to default style
-            cls = obj.cls
-            if cls == 'actor':
-                style.padding = Area(0, 0, 0, 0)
-                style.size = Size(40, 60)
-            elif cls in ('package', 'profile'):
-                style.size = Size(80, 60)
-            elif cls in ('artifact', 'component'):
-                style.icon_size = Size(10, 15)
-            elif cls == 'fdiface':
-                style.min_size = Size(30, 30)
-                style.size = Size(30, 30)
-            elif cls == 'node':
-                style.margin = Area(20, 20, 10, 10)
-            elif cls == 'nodegroup':
-                style.icon_size = Size(0, 0)
-                style.margin = Area(0, 0, 0, 0)
-                style.min_size = Size(0, 0)
-                style.padding = Area(0, 0, 0, 0)
-                style.size = Size(0, 0)
-
-                if os.getenv('PIUML_DEBUG_LAYOUT'):
-                    style.margin = Area(15, 15, 15, 15)
+        if obj is None:
+            return self
+
+        style = obj.__dict__['style'] = self.cls()
+
+        # few exceptions to default style
+        cls = obj.cls
+        if cls == 'actor':
+            style.padding = Area(0, 0, 0, 0)
+            style.size = Size(40, 60)
+        elif cls in ('package', 'profile'):
+            style.size = Size(80, 60)
+        elif cls in ('artifact', 'component'):
+            style.icon_size = Size(10, 15)
+        elif cls == 'fdiface':
+            style.min_size = Size(30, 30)
+            style.size = Size(30, 30)
+        elif cls == 'node':
+            style.margin = Area(20, 20, 10, 10)
+        elif cls == 'nodegroup':
+            style.icon_size = Size(0, 0)
+            style.margin = Area(0, 0, 0, 0)
+            style.min_size = Size(0, 0)
+            style.padding = Area(0, 0, 0, 0)
+            style.size = Size(0, 0)
+
+            if os.getenv('PIUML_DEBUG_LAYOUT'):
+                style.margin = Area(15, 15, 15, 15)
 
         return style
 
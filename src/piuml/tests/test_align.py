@@ -27,7 +27,7 @@ import cairo
 import unittest
 
 from piuml.style import Style, Pos, Area, Size
-from piuml.renderer.cr import CairoBBContext
+from piuml.renderer.cr import DiagramContext
 from piuml.renderer.text import draw_text, text_pos_at_line, \
     line_single_text_hint, line_middle_segment, ALIGN_CENTER, ALIGN_MIDDLE, \
     ALIGN_TOP, ALIGN_BOTTOM, \
@@ -35,7 +35,7 @@ from piuml.renderer.text import draw_text, text_pos_at_line, \
     ALIGN_LEFT, ALIGN_RIGHT
 
 surface = cairo.PDFSurface('src/piuml/tests/align.pdf', 600, 600)
-cr = CairoBBContext(cairo.Context(surface))
+cr = DiagramContext(surface)
 
 class BoxAlignTestCase(unittest.TestCase):
     """
@@ -0,0 +1,159 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Benchmark tests.
+"""
+
+import unittest
+
+from piuml import validate
+from piuml.bench import serial, layout
+from piuml.bench import validate as vbench
+from piuml.bench.parser import generate, count, run
+from piuml.data import Element, Relationship, unwind
+from piuml.layout.cl import depth
+from piuml.parser import parse
+
+
+class ParserBenchmarkTestCase(unittest.TestCase):
+    """
+    Parser benchmark tests.
+    """
+    def test_generate(self):
+        """
+        Test synthetic piUML source generation
+        """
+        f = generate(classes=9, features=2, depth=2, relationships=6,
+                aligns=4)
+        self.assertEquals([], validate(f, cache=False))
+
+        n = parse(f, cache=False)
+        nodes = [k for k in unwind(n) if isinstance(k, Element)]
+        classes = [k for k in nodes if k.cls == 'class']
+        packages = [k for k in nodes if k.cls == 'package']
+        rels = [k for k in nodes if isinstance(k, Relationship)]
+        self.assertEquals(9, len(classes))
+        self.assertEquals(2, len(packages))
+        self.assertEquals(6, len(rels))
+        self.assertEquals(2, len(classes[0].data['attributes']))
+        self.assertEquals(2, len(classes[0].data['operations']))
+        self.assertEquals(4, len(n[-1].data))
+
+        # 9 classes, 2 packages, 6 relationships, 4 alignments, diagram
+        # and layout section
+        self.assertEquals(23, count(n))
+
+
+    def test_run(self):
+        """
+        Test parser benchmark results
+        """
+        f = generate(classes=3, features=1, depth=1, relationships=2,
+                aligns=1)
+        results = run(f, repeat=1)
+        self.assertEquals(['lepl', 'recovery', 'cache'],
+                [r['backend'] for r in results])
+        for r in results:
+            self.assertEquals(f.count('\n'), r['lines'])
+            self.assertEquals(count(parse(f, cache=False)), r['nodes'])
+            self.assertTrue(r['lines/sec'] > 0)
+            self.assertTrue(r['peak memory'] > 0)
+
+
+
+class ValidateBenchmarkTestCase(unittest.TestCase):
+    """
+    Validation benchmark tests.
+    """
+    def test_run(self):
+        """
+        Test validation benchmark results
+        """
+        f = generate(classes=3, features=1, depth=1, relationships=2,
+                aligns=1)
+        results = vbench.run(f, repeat=1)
+        self.assertEquals(['valid', 'invalid', 'cache'],
+                [r['mode'] for r in results])
+        self.assertEquals([0, 2, 0], [r['errors'] for r in results])
+        for r in results:
+            self.assertTrue(r['files/sec'] > 0)
+            self.assertTrue(r['peak memory'] > 0)
+
+
+
+class SerialBenchmarkTestCase(unittest.TestCase):
+    """
+    Serialization benchmark tests.
+    """
+    def test_run(self):
+        """
+        Test serialization benchmark results
+        """
+        n = parse(generate(classes=3, features=1, depth=1,
+            relationships=2, aligns=1), cache=False)
+        results = serial.run(n, geometry=True, repeat=1)
+        self.assertEquals(['pickle', 'serial'],
+                [r['format'] for r in results])
+        for r in results:
+            self.assertEquals(count(n), r['nodes'])
+            self.assertTrue(r['size'] > 0)
+            self.assertTrue(r['load nodes/sec'] > 0)
+            self.assertTrue(r['peak memory'] > 0)
+
+
+
+class LayoutBenchmarkTestCase(unittest.TestCase):
+    """
+    Layout benchmark tests.
+    """
+    def test_nested(self):
+        """
+        Test synthetic piUML source with nested packages generation
+        """
+        f = layout.nested(depth=2, width=2, classes=1)
+        self.assertEquals([], validate(f, cache=False))
+
+        n = parse(f, cache=False)
+        nodes = [k for k in unwind(n) if isinstance(k, Element)]
+        # 1 + 2 + 4 classes, 2 + 4 packages and diagram
+        self.assertEquals(14, len(nodes))
+
+        # classes of the deepest package are nested in two packages
+        self.assertEquals(3, max(depth(k) for k in nodes))
+
+
+    def test_run(self):
+        """
+        Test layout benchmark results
+        """
+        diagrams = {
+            'simple': layout.SCENARIOS['default_simple'],
+            'nested': layout.nested(depth=2, width=2, classes=1),
+        }
+        results = layout.run(diagrams, repeat=1)
+        self.assertEquals([('nested', 'fifo'), ('nested', 'depth'),
+            ('nested', 'topo'), ('simple', 'fifo'), ('simple', 'depth'),
+            ('simple', 'topo')],
+            [(r['diagram'], r['policy']) for r in results])
+        for r in results:
+            self.assertTrue(r['steps'] >= r['constraints'] > 0)
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,191 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Cache of parsed diagrams tests.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import piuml.cache
+import piuml.parser
+from piuml.cache import ASTCache
+from piuml.parser import parse
+from piuml.data import unwind
+
+
+class ASTCacheTestCase(unittest.TestCase):
+    """
+    Cache of parsed diagrams tests.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = ASTCache(self.path)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+    def test_key(self):
+        """
+        Test cache key calculation
+        """
+        k1 = self.cache.key("class a 'A'")
+        k2 = self.cache.key("class a 'A'")
+        k3 = self.cache.key("class a 'B'")
+        self.assertEquals(k1, k2)
+        self.assertNotEquals(k1, k3)
+
+
+    def test_key_format(self):
+        """
+        Test cache key depends on cache data format
+        """
+        k1 = self.cache.key("class a 'A'")
+        data_format = piuml.cache.data_format
+        piuml.cache.data_format = lambda: 'changed'
+        try:
+            k2 = self.cache.key("class a 'A'")
+        finally:
+            piuml.cache.data_format = data_format
+        self.assertNotEquals(k1, k2)
+
+
+    def test_miss(self):
+        """
+        Test cache miss
+        """
+        self.assertTrue(self.cache.get(self.cache.key('')) is None)
+
+
+    def test_hit(self):
+        """
+        Test storing and loading parsed diagram
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+c1 == c2
+"""
+        ast = parse(f, cache=False)
+        key = self.cache.key(f)
+        self.cache.put(key, ast)
+
+        n = self.cache.get(key)
+        self.assertEquals([k.id for k in unwind(ast)],
+            [k.id for k in unwind(n)])
+        self.assertTrue(n[2].tail is n[0])
+        self.assertTrue(n[2].head is n[1])
+        self.assertTrue(n[0].parent is n)
+
+
+    def test_deterministic_ids(self):
+        """
+        Test ids of relationships are the same on subsequent parsing
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+c1 == c2
+c1 -> c2
+"""
+        n1 = parse(f, cache=False)
+        n2 = parse(f, cache=False)
+        self.assertEquals([k.id for k in n1], [k.id for k in n2])
+
+
+    def test_eviction(self):
+        """
+        Test least recently used cache entries eviction
+        """
+        ast = parse("class c1 'C1'", cache=False)
+        self.cache.put('k1', ast)
+        size = os.path.getsize(os.path.join(self.path, 'k1.ast'))
+
+        # make room for two entries only
+        self.cache.max_size = size * 2
+        os.utime(os.path.join(self.path, 'k1.ast'), (0, 0))
+        self.cache.put('k2', ast)
+        os.utime(os.path.join(self.path, 'k2.ast'), (1, 1))
+
+        self.cache.get('k1') # k1 is recently used now
+        self.cache.put('k3', ast)
+
+        self.assertFalse(self.cache.get('k1') is None)
+        self.assertTrue(self.cache.get('k2') is None)
+        self.assertFalse(self.cache.get('k3') is None)
+
+
+    def test_put_error(self):
+        """
+        Test temporary file is removed when cache entry cannot be written
+        """
+        ast = parse("class c1 'C1'", cache=False)
+        # cache entry cannot replace a directory
+        os.mkdir(os.path.join(self.path, 'k1.ast'))
+        self.cache.put('k1', ast)
+        self.assertEquals(['k1.ast'], os.listdir(self.path))
+        self.assertTrue(self.cache.get('k1') is None)
+
+
+    def test_recovery(self):
+        """
+        Test cache of parsed diagrams in error recovery mode
+        """
+        default_cache = piuml.parser.default_cache
+        piuml.parser.default_cache = lambda: self.cache
+        try:
+            errors = []
+            parse("class c1 'C1'\nclass c2 'C2' )\n", errors=errors)
+            self.assertEquals(1, len(errors))
+            self.assertEquals([], os.listdir(self.path))
+
+            n1 = parse("class c1 'C1'\n", errors=errors)
+            self.assertEquals(1, len(os.listdir(self.path)))
+            n2 = parse("class c1 'C1'\n", errors=errors)
+        finally:
+            piuml.parser.default_cache = default_cache
+        self.assertEquals(1, len(errors))
+        self.assertEquals(['c1'], [k.id for k in n2])
+        self.assertFalse(n1 is n2)
+
+
+    def test_default(self):
+        """
+        Test cache of parsed diagrams is enabled by default
+        """
+        env = os.environ.get('PIUML_CACHE_DIR')
+        os.environ['PIUML_CACHE_DIR'] = self.path
+        try:
+            parse("class c1 'C1'", cache=False)
+            self.assertEquals([], os.listdir(self.path))
+            parse("class c1 'C1'")
+        finally:
+            if env is None:
+                del os.environ['PIUML_CACHE_DIR']
+            else:
+                os.environ['PIUML_CACHE_DIR'] = env
+        self.assertEquals(1, len(os.listdir(self.path)))
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,315 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Diagram checks tests.
+"""
+
+import unittest
+
+from piuml import validate
+from piuml.check import check_align, check_views, check_uml, UML_TABLE
+from piuml.parser import parse, AlignmentError, UMLError
+
+
+class UMLCheckTestCase(unittest.TestCase):
+    """
+    UML semantics checks tests.
+    """
+    def test_table(self):
+        """
+        Test table of illegal UML relationships
+        """
+        self.assertFalse(('import/include', 'package', 'package') in UML_TABLE)
+        self.assertFalse(('import/include', 'usecase', 'usecase') in UML_TABLE)
+        self.assertTrue(('import/include', 'package', 'usecase') in UML_TABLE)
+        self.assertFalse(('merge', 'package', 'package') in UML_TABLE)
+        self.assertTrue(('merge', 'class', 'package') in UML_TABLE)
+        self.assertFalse(('commentline', 'comment', 'class') in UML_TABLE)
+        self.assertTrue(('commentline', 'comment', 'comment') in UML_TABLE)
+        self.assertFalse(('dependency', 'class', 'class') in UML_TABLE)
+
+
+    def test_check(self):
+        """
+        Test checking UML semantics of relationships
+        """
+        f = """
+class c1 "C1"
+package p1 "P1"
+    comment c2 "C2"
+    usecase u1 "U1"
+c1 -m> p1
+c1 -- c2
+c1 -i> u1
+c1 -> u1
+"""
+        n = parse(f, cache=False, validate=False)
+        errors = []
+        invalid = check_uml(n, errors)
+        self.assertEquals([6, 8], [e.line for e in errors])
+        self.assertTrue(all(isinstance(e, UMLError) for e in errors))
+        self.assertEquals(['dependency-1', 'dependency-3'],
+                [r.id for r in invalid])
+
+        self.assertRaises(UMLError, check_uml, n)
+
+
+    def test_validation_stage(self):
+        """
+        Test validation stage of parser
+        """
+        f = """
+package p1 "P1"
+class c1 "C1"
+c1 -m> p1
+"""
+        self.assertRaises(UMLError, parse, f, cache=False)
+
+        # skip validation
+        n = parse(f, cache=False, validate=False)
+        self.assertEquals(3, len(n))
+
+        # invalid relationship is removed in error recovery mode
+        errors = []
+        n = parse(f, errors=errors, cache=False)
+        self.assertEquals(1, len(errors))
+        self.assertEquals(['p1', 'c1'], [k.id for k in n])
+
+
+
+class AlignCheckTestCase(unittest.TestCase):
+    """
+    Alignment checks tests.
+    """
+    def _errors(self, f):
+        errors = []
+        check_align(parse(f, cache=False), errors)
+        return errors
+
+
+    def test_valid(self):
+        """
+        Test checking valid alignment
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+package p1 "P1"
+    class c3 "C3"
+    class c4 "C4"
+
+:layout:
+    left: c1 c2
+    top: c1 p1
+    middle: c3 c4
+    top: c2 c3
+"""
+        self.assertEquals([], self._errors(f))
+
+
+    def test_not_element(self):
+        """
+        Test checking alignment of non-element
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+
+:layout:
+    left a1: c1 c2
+    left: a1 c2
+"""
+        errors = self._errors(f)
+        self.assertEquals(1, len(errors))
+        self.assertTrue(isinstance(errors[0], AlignmentError))
+        self.assertEquals((7, 5), (errors[0].line, errors[0].col))
+
+
+    def test_duplicate(self):
+        """
+        Test checking node aligned twice
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+
+:layout:
+    left: c1 c2 c1
+"""
+        errors = self._errors(f)
+        self.assertEquals(1, len(errors))
+        self.assertEquals(6, errors[0].line)
+
+
+    def test_packaging_element(self):
+        """
+        Test checking alignment of packaged nodes
+        """
+        f = """
+class c1 "C1"
+package p1 "P1"
+    class c2 "C2"
+    class c3 "C3"
+
+:layout:
+    left: p1 c2
+    left: c2 c1 c3
+"""
+        errors = self._errors(f)
+        self.assertEquals(2, len(errors))
+        self.assertEquals(8, errors[0].line)
+        self.assertTrue('packaging element "p1"' in errors[0].msg)
+        self.assertEquals(9, errors[1].line)
+        self.assertTrue('within "p1"' in errors[1].msg)
+
+
+    def test_contradictory_order(self):
+        """
+        Test checking contradictory order of aligned nodes
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+
+:layout:
+    top: c1 c2
+    middle: c2 c3
+    bottom: c3 c1
+    left: c2 c1
+"""
+        errors = self._errors(f)
+        self.assertEquals(1, len(errors))
+        self.assertEquals(9, errors[0].line)
+        self.assertTrue('horizontal' in errors[0].msg)
+
+
+    def test_raise(self):
+        """
+        Test raising first alignment error
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+
+:layout:
+    left: c1 c2 c1
+"""
+        self.assertRaises(AlignmentError, check_align, parse(f, cache=False))
+
+
+
+class ViewCheckTestCase(unittest.TestCase):
+    """
+    View checks tests.
+    """
+    def _errors(self, f):
+        errors = []
+        check_views(parse(f, cache=False), errors)
+        return errors
+
+
+    def test_valid(self):
+        """
+        Test checking valid view
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+package p1 "P1"
+    class c3 "C3"
+
+:view v1: c1 c3
+    left: c1 p1
+"""
+        self.assertEquals([], self._errors(f))
+
+
+    def test_not_in_view(self):
+        """
+        Test checking alignment of node not in a view
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+
+:view v1: c1 c2
+    left: c1 c3
+"""
+        errors = self._errors(f)
+        self.assertEquals(1, len(errors))
+        self.assertEquals(7, errors[0].line)
+        self.assertTrue('not in view "v1"' in errors[0].msg)
+
+
+    def test_view_align(self):
+        """
+        Test checking alignment of a view
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+
+:view v1: c1 c2
+    left: c1 c2 c1
+"""
+        errors = self._errors(f)
+        self.assertEquals(1, len(errors))
+        self.assertEquals(6, errors[0].line)
+
+
+
+class ValidateTestCase(unittest.TestCase):
+    """
+    Diagram validation tests.
+    """
+    def test_valid(self):
+        """
+        Test validation of valid diagram
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+c1 == c2
+"""
+        self.assertEquals([], validate(f, cache=False))
+
+
+    def test_errors(self):
+        """
+        Test collecting all errors of a diagram
+        """
+        f = """
+class c1 "C1"
+clas c2 "C2"
+class c3 "C3"
+c1 -m> c3
+
+:layout:
+    left: c1 c3 c1
+"""
+        errors = validate(f, cache=False)
+        self.assertEquals([3, 5, 8], [e.line for e in errors])
+        self.assertTrue(isinstance(errors[1], UMLError))
+        self.assertTrue(isinstance(errors[2], AlignmentError))
+
+
+# vim: sw=4:et:ai
@@ -0,0 +1,125 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Layout checkpoint file tests.
+"""
+
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from piuml import checkpoint
+from piuml.data import view
+from piuml.parser import parse
+from piuml.style import Pos, Size
+
+SOURCE = """
+class c1 "C1"
+class c2 "C2"
+c1 => c2
+
+:view v1: c1
+"""
+
+
+class CheckpointTestCase(unittest.TestCase):
+    """
+    Layout checkpoint file tests.
+    """
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.fn = os.path.join(self.path, 'test.layout')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+
+    def test_key(self):
+        """
+        Test layout checkpoint key
+        """
+        n = parse(SOURCE, cache=False)
+        k = checkpoint.key(n)
+        self.assertEquals(k, checkpoint.key(parse(SOURCE, cache=False)))
+
+        # geometry does not change the key
+        n[0].style.pos = Pos(10, 10)
+        self.assertEquals(k, checkpoint.key(n))
+
+        n = parse(SOURCE.replace('C2', 'C3'), cache=False)
+        self.assertNotEquals(k, checkpoint.key(n))
+
+
+    def test_save_load(self):
+        """
+        Test saving and loading layout checkpoint file
+        """
+        n = parse(SOURCE, cache=False)
+        v = view(n, 'v1')
+        n[0].style.pos = Pos(10, 20)
+        n[1].style.size = Size(100, 50)
+        n[2].style.edges = (Pos(1, 2), Pos(3, 4))
+        v[0].style.pos = Pos(30, 40)
+
+        k = checkpoint.key(n)
+        checkpoint.save(self.fn, k, [(None, n), ('v1', v)])
+        diagrams = checkpoint.load(self.fn, k)
+        self.assertEquals([None, 'v1'], sorted(diagrams, key=str))
+
+        d = diagrams[None]
+        self.assertEquals((10, 20), tuple(d[0].style.pos))
+        self.assertEquals((100, 50), tuple(d[1].style.size))
+        self.assertEquals([(1, 2), (3, 4)],
+                [tuple(p) for p in d[2].style.edges])
+        self.assertTrue(d[2].tail is d[0])
+        self.assertEquals('c1', diagrams['v1'][0].id)
+        self.assertEquals((30, 40), tuple(diagrams['v1'][0].style.pos))
+
+
+    def test_miss(self):
+        """
+        Test loading missing, outdated and invalid layout checkpoint file
+        """
+        n = parse(SOURCE, cache=False)
+        k = checkpoint.key(n)
+        self.assertTrue(checkpoint.load(self.fn, k) is None)
+
+        checkpoint.save(self.fn, k, [(None, n)])
+        self.assertTrue(checkpoint.load(self.fn, '0' * 40) is None)
+
+        # outdated checkpoint can be read, i.e. for warm start layout
+        key, diagrams = checkpoint.read(self.fn)
+        self.assertEquals(k, key)
+        self.assertEquals([None], list(diagrams))
+
+        with open(self.fn, 'rb') as f:
+            data = f.read()
+        with open(self.fn, 'wb') as f:
+            f.write(data[:-10])
+        self.assertTrue(checkpoint.load(self.fn, k) is None)
+
+        with open(self.fn, 'wb') as f:
+            f.write(b'garbage')
+        self.assertTrue(checkpoint.load(self.fn, k) is None)
+
+
+# vim: sw=4:et:ai
@@ -20,7 +20,9 @@
 import unittest
 
 from piuml.data import Diagram, PackagingElement, Element, \
-        MWalker, lca, lsb, preorder, unwind
+        MWalker, Span, SourceIndex, lca, lsb, preorder, unwind, view
+from piuml.parser import parse
+import piuml.style
 
 """
 piUML language parser data model routines tests.
@@ -198,4 +200,125 @@ class TreeTestCase(unittest.TestCase):
         self.assertEquals([n1, n2, n4, n3], list(unwind(n1)))
 
 
+
+class SourceIndexTestCase(unittest.TestCase):
+    """
+    Source index tests.
+    """
+    def test_position(self):
+        """
+        Test mapping source offset to line and column
+        """
+        index = SourceIndex('ab\ncde\n\nf')
+        self.assertEquals([0, 3, 7, 8], index.lines)
+        self.assertEquals((1, 1), index.position(0))
+        self.assertEquals((1, 3), index.position(2))
+        self.assertEquals((2, 1), index.position(3))
+        self.assertEquals((2, 3), index.position(5))
+        self.assertEquals((3, 1), index.position(7))
+        self.assertEquals((4, 1), index.position(8))
+
+
+    def test_offset(self):
+        """
+        Test mapping line and column to source offset
+        """
+        index = SourceIndex('ab\ncde\n\nf')
+        self.assertEquals(0, index.offset(1))
+        self.assertEquals(5, index.offset(2, 3))
+        self.assertEquals(8, index.offset(4))
+
+
+    def test_find(self):
+        """
+        Test finding innermost node at source position
+        """
+        n1 = PackagingElement('a', id='n1')
+        n2 = Element('a', id='n2')
+        n3 = Element('a', id='n3')
+        n1.children.append(n2)
+        n2.parent = n1
+
+        n1.span = Span(0, 30, 1, 1)
+        n2.span = Span(10, 20, 2, 5)
+        n3.span = Span(30, 40, 4, 1)
+
+        index = SourceIndex('a' * 9 + '\n' + 'b' * 19 + '\n' + 'c' * 10)
+        index.add([n1, n2, n3])
+        self.assertEquals([n1, n2, n3], index.nodes)
+
+        self.assertTrue(index.find(1, 5) is n1)
+        self.assertTrue(index.find(2, 1) is n2)
+        self.assertTrue(index.find(2, 15) is n1)
+        self.assertTrue(index.find(3, 1) is n3)
+
+
+
+
+class ViewTestCase(unittest.TestCase):
+    """
+    Diagram view tests.
+    """
+    SOURCE = """
+class c1 "C1"
+class c2 "C2"
+package p1 "P1"
+    class c3 "C3"
+    class c4 "C4"
+c1 == c2
+c1 == c3
+c3 == c4
+
+:layout:
+    left: c1 c2
+
+:view v1: c1 c3
+    top: c1 c3
+
+:view v2: p1
+"""
+    def test_select(self):
+        """
+        Test selecting nodes of a view
+        """
+        n = parse(self.SOURCE, cache=False)
+        ids = sorted(k.id for k in n.views['v1'].select(n))
+        self.assertEquals(['association-2', 'c1', 'c3', 'diagram', 'p1'], ids)
+
+        ids = sorted(k.id for k in n.views['v2'].select(n))
+        self.assertEquals(['association-3', 'c3', 'c4', 'diagram', 'p1'], ids)
+
+
+    def test_view(self):
+        """
+        Test creating diagram of a view
+        """
+        n = parse(self.SOURCE, cache=False)
+        c1 = n[0]
+        c1.style.min_size.width = 100
+
+        d = view(n, 'v1')
+        self.assertEquals(['c1', 'p1', 'association-2', None],
+                [getattr(k, 'id', None) for k in d])
+        self.assertEquals(['c3'], [k.id for k in d[1]])
+
+        # nodes and style information are copied
+        self.assertFalse(c1 is d[0])
+        self.assertFalse(c1.style is d[0].style)
+        self.assertEquals(100, d[0].style.min_size.width)
+        self.assertTrue(d[0] is d[2].tail)
+        self.assertTrue(d is d[0].parent)
+
+        # layout of the view only
+        layout = d[-1]
+        self.assertEquals(1, len(layout.data))
+        self.assertEquals('top', layout.data[0].type)
+        self.assertTrue(layout.data[0].nodes[0] is d[0])
+        self.assertTrue(layout.data[0].nodes[1] is d[1][0])
+
+        # diagram is not changed
+        self.assertEquals(7, len(n))
+        self.assertEquals(2, len(n[2]))
+
+
 # vim: sw=4:et:ai
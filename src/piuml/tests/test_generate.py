@@ -0,0 +1,156 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Diagram generation tests.
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from piuml import generate, _outputs, checkpoint
+from piuml.data import Relationship, unwind, view
+from piuml.layout import Layout
+from piuml.parser import parse
+from piuml.style import Pos
+
+SOURCE = """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+c1 -> c2
+
+:view v1: c1 c2
+"""
+
+
+class OutputTestCase(unittest.TestCase):
+    """
+    Diagram output tests.
+    """
+    def test_outputs(self):
+        """
+        Test output file names of single file type
+        """
+        self.assertEquals([('svg', 'a/b.svg')], _outputs('a/b.svg', 'svg', None))
+        self.assertEquals([('svg', 'a/b-v1.svg')], _outputs('a/b.svg', 'svg', 'v1'))
+
+
+    def test_outputs_multiple(self):
+        """
+        Test output file names of multiple file types
+        """
+        self.assertEquals([('pdf', 'b-v1.pdf'), ('png', 'b-v1.png')],
+                _outputs('b.pdf', ['pdf', 'png'], 'v1'))
+
+
+    def test_file_object(self):
+        """
+        Test single file type required for file object output
+        """
+        f = io.BytesIO()
+        self.assertRaises(ValueError, generate, 'class c1 "C1"\n', f,
+                ['pdf', 'svg'], cache=False)
+
+
+    def test_files_only(self):
+        """
+        Test file type written into files only is rejected for memory and
+        file object output
+        """
+        self.assertRaises(ValueError, generate, SOURCE, None, 'dzi')
+        self.assertRaises(ValueError, generate, SOURCE, io.BytesIO(), 'dzi',
+                views=[])
+
+
+
+class MemoryOutputTestCase(unittest.TestCase):
+    """
+    Tests of diagram generation into memory and file objects.
+
+    The diagram is loaded from layout checkpoint file, so it is neither
+    measured nor laid out and routed by the tests.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.layout = os.path.join(self.dir, 'layout.ckp')
+
+        ast = parse(SOURCE, cache=False)
+        key = checkpoint.key(ast)
+        diagrams = [(None, ast), ('v1', view(ast, 'v1'))]
+        for v, d in diagrams:
+            Layout(d).layout()
+            # lines are not routed, connect positions of nodes
+            for l in unwind(d):
+                if isinstance(l, Relationship):
+                    l.style.edges = (Pos(*l.tail.style.pos),
+                        Pos(*l.head.style.pos))
+        checkpoint.save(self.layout, key, diagrams)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+
+    def test_memory(self):
+        """
+        Test generating diagram and its views into memory
+        """
+        result = generate(SOURCE, None, 'geometry', cache=False,
+                load_layout=self.layout)
+        self.assertEquals([('v1', 'geometry')], sorted(result))
+
+        data = json.loads(result['v1', 'geometry'].decode('utf-8'))
+        nodes = sorted(n['id'] for n in data['nodes'])
+        self.assertEquals(['c1', 'c2'], nodes)
+
+
+    def test_memory_no_views(self):
+        """
+        Test generating diagram into memory
+        """
+        result = generate(SOURCE, None, 'geometry', views=[],
+                load_layout=self.layout, cache=False)
+        self.assertEquals([(None, 'geometry')], list(result))
+
+        data = json.loads(result[None, 'geometry'].decode('utf-8'))
+        nodes = sorted(n['id'] for n in data['nodes'])
+        self.assertEquals(['c1', 'c2', 'c3'], nodes)
+        self.assertEquals(1, len(data['lines']))
+
+
+    def test_file_object(self):
+        """
+        Test generating diagram into file object
+        """
+        f = io.BytesIO()
+        result = generate(SOURCE, f, 'geometry', views=[],
+                load_layout=self.layout, cache=False)
+        self.assertTrue(result is None)
+
+        data = json.loads(f.getvalue().decode('utf-8'))
+        self.assertEquals(['c1', 'c2', 'c3'],
+                sorted(n['id'] for n in data['nodes']))
+
+
+# vim: sw=4:et:ai
@@ -23,7 +23,7 @@ Layout (alignment, span matrix, etc) tests.
 
 from piuml.layout.cl import Layout, MinHDist, MinVDist, \
     MiddleEq, CenterEq, LeftEq, RightEq, TopEq, BottomEq, \
-    djset
+    djset, node_key
 from piuml.parser import parse, ParseError
 from piuml.data import unwind, Element
 
@@ -47,7 +47,7 @@ class LayoutTestCase(unittest.TestCase):
         """
         Process layout and return the root node.
         """
-        n = parse(f)
+        n = parse(f, cache=False)
         l = self._layout = Layout(n)
         l.layout(solve=False)
         return n
@@ -475,6 +475,94 @@ class f "C6"
         self._check_c(None, a, d)
 
 
+class WarmStartTestCase(unittest.TestCase):
+    """
+    Warm start layout tests.
+    """
+    SOURCE = """
+class c1 "C1"
+class c2 "C2"
+    class c3 "C3"
+    class c4 "C4"
+class c5 "C5"
+c1 => c5
+
+:layout:
+    left g1: c1 c5
+"""
+
+    def _layout(self, f, previous=None):
+        n = parse(f, cache=False)
+        l = Layout(n, previous)
+        l.layout()
+        return n, l.solver
+
+
+    def _geometry(self, n):
+        return {node_key(k): (tuple(k.style.pos), tuple(k.style.size))
+            for k in unwind(n) if isinstance(k, Element)
+                and node_key(k) is not None}
+
+
+    def test_node_key(self):
+        """
+        Test node keys used to match nodes between layouts
+        """
+        n, _ = self._layout(self.SOURCE)
+        self.assertEquals('c1', node_key(find_node(n, 'c1')))
+        self.assertEquals(('c1', 'c5'), node_key(find_node(n, 'g1')))
+        self.assertTrue(node_key(find_node(n, 'generalization-1')) is None)
+
+        # ids specified by a user can contain '-' character
+        self.assertEquals('c-1', node_key(Element(cls='class', id='c-1')))
+        self.assertTrue(node_key(Element(cls='class')) is None)
+
+
+    def test_warm_start(self):
+        """
+        Test warm start layout with unchanged diagram
+        """
+        n1, s1 = self._layout(self.SOURCE)
+        n2, s2 = self._layout(self.SOURCE, n1)
+        self.assertEquals('cold', s1.stats['start'])
+        self.assertEquals('warm', s2.stats['start'])
+        self.assertEquals(self._geometry(n1), self._geometry(n2))
+
+        # previous layout is the solution, so each constraint is solved
+        # once
+        self.assertEquals(s2.stats['constraints'], s2.stats['steps'])
+        self.assertTrue(s2.stats['steps'] < s1.stats['steps'])
+
+
+    def test_warm_start_changed(self):
+        """
+        Test warm start layout with changed diagram
+        """
+        n1, s1 = self._layout(self.SOURCE)
+        f = self.SOURCE.replace('class c5 "C5"',
+                'class c5 "C5"\nclass c6 "C6"')
+        n2, s2 = self._layout(f, n1)
+        n3, s3 = self._layout(f)
+
+        # position of unchanged elements is preserved
+        g1 = self._geometry(n1)
+        g2 = self._geometry(n2)
+        for k in ('c1', 'c3', 'c4', 'c5'):
+            self.assertEquals(g1[k][0], g2[k][0])
+        self.assertEquals(self._geometry(n3), g2)
+        self.assertTrue(s2.stats['steps'] < s3.stats['steps'])
+
+
+    def test_warm_start_unmatched(self):
+        """
+        Test warm start layout without matching nodes
+        """
+        n1, s1 = self._layout('class c7 "C7"')
+        n2, s2 = self._layout(self.SOURCE, n1)
+        self.assertEquals('cold', s2.stats['start'])
+
+
+
 class DisjointSetTestCase(unittest.TestCase):
     """
     Disjoint set tests.
@@ -21,11 +21,18 @@
 piUML language parser tests.
 """
 
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
 import unittest
 from io import StringIO
 
+import piuml.parser
+from piuml.cache import ASTCache
 from piuml.parser import parse, ParseError, UMLError
-from piuml.data import unwind
+from piuml.data import Element, unwind
 
 
 class ParserTestCase(unittest.TestCase):
@@ -37,7 +44,7 @@ class ParserTestCase(unittest.TestCase):
         Test parsing data from file
         """
         f = StringIO("class a 'A1'")
-        n = parse(f)
+        n = parse(f, cache=False)
 
 
     def test_comment(self):
@@ -48,7 +55,7 @@ class ParserTestCase(unittest.TestCase):
 # check
 class a 'A1'
 """
-        n = parse(f)
+        n = parse(f, cache=False)
 
 
     def test_element_initialization(self):
@@ -56,7 +63,7 @@ class a 'A1'
         Test element data initialization
         """
         f = "class c1 'A'"
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertTrue('attributes' in n[0].data)
         self.assertTrue('operations' in n[0].data)
         self.assertTrue('stattrs' in n[0].data)
@@ -76,7 +83,7 @@ class PackagingTestCase(unittest.TestCase):
 class a <<aaa>> 'A'
 
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         cls = [k for k in unwind(n) if k.cls == 'class']
         self.assertEquals(1, len(cls))
 
@@ -90,7 +97,7 @@ component c1 "A"
 component c2 "B"
     class cls1 "B1"
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('diagram', n[0].parent.id)
         self.assertEquals('diagram', n[1].parent.id)
         self.assertEquals('c2', n[1][0].parent.id)
@@ -115,7 +122,7 @@ component c3 "C"
 class cls9 "C"
 """
 
-        n = parse(f)
+        n = parse(f, cache=False)
 
         data = dict((k.id, k.parent.id) for k in unwind(n) if k.parent)
 
@@ -157,11 +164,11 @@ class StereotypesTestCase(unittest.TestCase):
         Test element stereotype parsing
         """
         f = 'interface a <<test>> "A"'
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['interface', 'test'], n[0].stereotypes)
 
         f = 'interface a <<t1, t2>> "A"'
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['interface', 't1', 't2'], n[0].stereotypes)
 
 
@@ -170,11 +177,11 @@ class StereotypesTestCase(unittest.TestCase):
         Test packaging element stereotype parsing
         """
         f = 'component a <<test>> "A"'
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['component', 'test'], n[0].stereotypes)
 
         f = 'component a <<t1, t2>> "A"'
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['component', 't1', 't2'], n[0].stereotypes)
 
 
@@ -188,7 +195,7 @@ class b <<bbb>> 'B'
 
 a -> <<test>> b
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['test'], n[2].stereotypes)
 
 
@@ -206,7 +213,7 @@ interface c1 "A"
     : x: int
     : y: float
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         attrs = n[0].data['attributes']
         self.assertEquals('x', attrs[0].name)
         self.assertEquals('int', attrs[0].type)
@@ -223,7 +230,7 @@ class c1 "A"
     : x: int
     : y: float
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         attrs = n[0].data['attributes']
         self.assertEquals('x', attrs[0].name)
         self.assertEquals('int', attrs[0].type)
@@ -241,7 +248,7 @@ package p1 "P1"
         : x: int
         : y: float
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         attrs = n[0][0].data['attributes']
         self.assertEquals('x', attrs[0].name)
         self.assertEquals('int', attrs[0].type)
@@ -259,7 +266,7 @@ package p1 "P1"
         : x: int
         : y: float
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         attrs = n[0][0].data['attributes']
         self.assertEquals('x', attrs[0].name)
         self.assertEquals('int', attrs[0].type)
@@ -280,7 +287,7 @@ package p1 "P1"
         : x: int
         : y: float
 """
-        n = parse(f)
+        n = parse(f, cache=False)
 
         attrs = n[0].data['attributes']
         self.assertEquals('a', attrs[0].name)
@@ -309,7 +316,7 @@ interface c1 "A"
     : abc()
     : cdef(x, y): int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         opers = n[0].data['operations']
         self.assertEquals('abc()', opers[0].name)
         self.assertEquals('cdef(x, y): int', opers[1].name)
@@ -324,7 +331,7 @@ class c1 "A"
     : abc()
     : cdef(x, y): int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         opers = n[0].data['operations']
         self.assertEquals('abc()', opers[0].name)
         self.assertEquals('cdef(x, y): int', opers[1].name)
@@ -340,7 +347,7 @@ package p1 "P1"
         : abc()
         : cdef(x, y): int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         opers = n[0][0].data['operations']
         self.assertEquals('abc()', opers[0].name)
         self.assertEquals('cdef(x, y): int', opers[1].name)
@@ -356,7 +363,7 @@ package p1 "P1"
         : abc()
         : cdef(x, y): int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         opers = n[0][0].data['operations']
         self.assertEquals('abc()', opers[0].name)
         self.assertEquals('cdef(x, y): int', opers[1].name)
@@ -375,7 +382,7 @@ package p1 "P1"
         : abc()
         : cdef(x, y): int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
 
         opers = n[0].data['operations']
         self.assertEquals('x()', opers[0].name)
@@ -401,7 +408,7 @@ class c1 "A"
         : x = 1
         : y = 2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         stattrs = n[0].data['stattrs']
         self.assertEquals(1, len(stattrs))
         self.assertEquals('tt', stattrs[0][0])
@@ -422,7 +429,7 @@ class c1 "A"
         : x: int
         : y: int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         stattrs = n[0].data['stattrs']
         self.assertEquals(2, len(stattrs))
         self.assertEquals('tt1', stattrs[0][0])
@@ -444,7 +451,7 @@ class c1 'A'
             : x: int
             : y: int
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         stattrs = n[0][0].data['stattrs']
         self.assertEquals(1, len(stattrs))
         self.assertEquals('tt', stattrs[0][0])
@@ -495,7 +502,7 @@ class c3 "Test3"
 
 c2 == c3
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         cls = [k.cls for k in n]
         self.assertEquals(['class', 'association'] * 2, cls)
 
@@ -575,7 +582,7 @@ package p2 "P2"
 p1 -> p2
 p1 <- p2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('dependency', n[2].cls)
         self.assertEquals('dependency', n[3].cls)
 
@@ -591,7 +598,7 @@ package p2 "P2"
 p1 -m> p2
 p1 -i> p2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['merge'], n[2].stereotypes)
         self.assertEquals(['import'], n[3].stereotypes)
 
@@ -633,7 +640,7 @@ usecase u2 "U2"
 u1 -i> u2
 u1 -e> u2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['include'], n[2].stereotypes)
         self.assertEquals(['extend'], n[3].stereotypes)
 
@@ -678,7 +685,7 @@ package p2 "P2"
 
 p1 == p2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('association', n[2].cls)
 
 
@@ -695,7 +702,7 @@ c1 =>= c2
 c2 =<= c3
 c3 == c1
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('c2', n[3].data['direction'].id)
         self.assertEquals('c2', n[4].data['direction'].id)
         self.assertTrue(n[5].data['direction'] is None)
@@ -711,7 +718,7 @@ class c2 "C2"
 
 c1 == "An association" c2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('An association', n[2].name)
 
 
@@ -726,7 +733,7 @@ class b <<bbb>> 'B'
 a == <<t1, t2>> b
 a == <<t1, t2, t3>> 'a name' b
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals(['t1', 't2'], n[2].stereotypes)
         self.assertEquals('a name', n[3].name)
         self.assertEquals(['t1', 't2', 't3'], n[3].stereotypes)
@@ -748,7 +755,7 @@ a ==x b
 a x== b
 a x==x b
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('unknown', n[2].data['tail'][2])
         self.assertEquals('unknown', n[2].data['head'][2])
         self.assertEquals('unknown', n[3].data['tail'][2])
@@ -780,7 +787,7 @@ a ==* b
 a *== b
 a *==* b
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('unknown', n[2].data['tail'][2])
         self.assertEquals('shared', n[2].data['head'][2])
         self.assertEquals('shared', n[3].data['tail'][2])
@@ -807,7 +814,7 @@ c1 == "An association" c2
     : tail-attr [1..n]
     : head-attr [0..n]
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         data = n[2].data
         self.assertEquals('tail-attr', data['tail'][1].name)
         self.assertEquals('head-attr', data['head'][1].name)
@@ -826,7 +833,7 @@ class c2 "C2"
 c1 == "An association" c2
     : tail [0..n]
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         data = n[2].data
         self.assertEquals('tail', data['tail'][1].name)
         self.assertEquals('[0..n]', str(data['tail'][1].mult))
@@ -845,7 +852,7 @@ c1 == "An association" c2
     :
     : head [0..n]
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         data = n[2].data
         self.assertTrue(data['tail'][1] is None, '{}'.format(data))
         self.assertEquals('head', data['head'][1].name)
@@ -878,7 +885,7 @@ metaclass m "M"
 
 s == m
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('extension', n[2].cls)
 
 
@@ -898,7 +905,7 @@ package p2 "P2"
 p1 => p2
 p1 <= p2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('generalization', n[2].cls)
         self.assertEquals('p2', n[2].data['supplier'].id)
         self.assertEquals('generalization', n[3].cls)
@@ -920,7 +927,7 @@ comment c2 "a comment"
 
 p1 -- c2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         self.assertEquals('commentline', n[2].cls)
 
 
@@ -959,7 +966,7 @@ class c3 "C1"
     middle: p1 c2
     bottom: p1 c2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         s = n[3]
         self.assertEquals('layout', s.name)
         self.assertEquals('left', s.data[0].type)
@@ -995,7 +1002,7 @@ class c3 "C1"
     middle l5: p1 c2
     bottom l6: p1 c2
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         s = n[3]
         self.assertEquals('layout', s.name)
         self.assertEquals('l1', s.data[0].id)
@@ -1019,13 +1026,48 @@ class c3 "C1"
     bottom l1: p1 c2
     middle: p1 l1
 """
-        n = parse(f)
+        n = parse(f, cache=False)
         s = n[3]
         self.assertEquals('layout', s.name)
         self.assertEquals('p1', s.data[1].nodes[0].id)
         self.assertEquals('l1', s.data[1].nodes[1].id)
 
 
+    def test_alignment_id_clash(self):
+        """
+        Test alignment id same as element id
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+
+:layout:
+    left c1: c1 c2
+    top: c1 c3
+"""
+        n = parse(f, cache=False)
+        s = n[3]
+        self.assertEquals('c1', s.data[0].id)
+        # element takes precedence over alignment definition
+        self.assertTrue(s.data[1].nodes[0] is n[0])
+
+
+    def test_alignment_id_duplicate(self):
+        """
+        Test duplicate alignment id error
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+
+:layout:
+    left l1: c1 c2
+    top l1: c1 c2
+"""
+        self.assertRaises(ParseError, parse, f, cache=False)
+
+
     def test_alignment_single_error(self):
         """
         Test alignment parsing error with one referenced element
@@ -1039,4 +1081,569 @@ comment c2 "a comment"
 """
         self.assertRaises(ParseError, parse, f)
 
+
+
+class PositionTestCase(unittest.TestCase):
+    """
+    Source position of parsed nodes tests.
+    """
+    def test_span(self):
+        """
+        Test source position of parsed nodes
+        """
+        f = """
+class c1 "C1"
+    : x: int
+package p1 "P1"
+    class c2 "C2"
+    c1 -> c2
+
+c1 == c2
+:layout:
+    left: c1 c2
+"""
+        n = parse(f, cache=False)
+        c1, p1, assoc, layout = n
+        c2, dep = p1
+
+        self.assertEquals((2, 1), (c1.span.line, c1.span.col))
+        self.assertEquals('class c1 "C1"\n    : x: int\n',
+                f[c1.span.start:c1.span.end])
+        self.assertEquals((4, 1), (p1.span.line, p1.span.col))
+        self.assertEquals((5, 5), (c2.span.line, c2.span.col))
+        self.assertEquals('c1 -> c2\n', f[dep.span.start:dep.span.end])
+        self.assertEquals((6, 5), (dep.span.line, dep.span.col))
+        self.assertEquals((8, 1), (assoc.span.line, assoc.span.col))
+        align = layout.data[0]
+        self.assertEquals((10, 5), (align.span.line, align.span.col))
+
+
+    def test_index(self):
+        """
+        Test finding nodes with diagram source index
+        """
+        f = """
+class c1 "C1"
+package p1 "P1"
+    class c2 "C2"
+    c1 -> c2
+:layout:
+    left: c1 c2
+"""
+        n = parse(f, cache=False)
+        index = n.index
+        self.assertEquals('c1', index.find(2, 3).id)
+        self.assertEquals('p1', index.find(3).id)
+        self.assertEquals('c2', index.find(4, 10).id)
+        self.assertEquals('dependency', index.find(5, 5).cls)
+        self.assertEquals('left', index.find(7, 5).type)
+        self.assertEquals((4, 5), index.position(n[1][0].span.start))
+
+
+    def test_span_block(self):
+        """
+        Test source position of multi-line blocks
+        """
+        f = """
+package p1 "P1"
+    class c1 "C1"
+        : a: int
+    class c2 "C2"
+    c1 -> c2
+class c3 "C3"
+"""
+        n = parse(f, cache=False)
+        p1, c3 = n
+        c1, c2, dep = p1
+        self.assertEquals((2, 1), (p1.span.line, p1.span.col))
+        self.assertEquals(f[1:f.index('class c3')],
+                f[p1.span.start:p1.span.end])
+        self.assertEquals((3, 5), (c1.span.line, c1.span.col))
+        self.assertEquals('class c1 "C1"\n        : a: int\n',
+                f[c1.span.start:c1.span.end])
+        self.assertEquals((5, 5), (c2.span.line, c2.span.col))
+        self.assertEquals('c1 -> c2\n', f[dep.span.start:dep.span.end])
+        self.assertEquals((7, 1), (c3.span.line, c3.span.col))
+        self.assertEquals('class c3 "C3"\n', f[c3.span.start:c3.span.end])
+        self.assertEquals((2, 1), n.index.position(p1.span.start))
+        self.assertEquals((6, 13), n.index.position(p1.span.end - 1))
+
+
+    def test_span_recovery(self):
+        """
+        Test source position of nodes parsed in error recovery mode
+        """
+        f = """
+class c1 "C1"
+clas c2 "C2"
+package p1 "P1"
+    class c3 "C3"
+"""
+        errors = []
+        n = parse(f, errors=errors, cache=False)
+        c1, p1 = n
+        self.assertEquals((2, 1), (c1.span.line, c1.span.col))
+        self.assertEquals((4, 1), (p1.span.line, p1.span.col))
+        self.assertEquals((5, 5), (p1[0].span.line, p1[0].span.col))
+        self.assertEquals('class c3 "C3"\n',
+                f[p1[0].span.start:p1[0].span.end])
+
+
+
+class RecoveryTestCase(unittest.TestCase):
+    """
+    Parser error recovery tests.
+    """
+    def test_no_errors(self):
+        """
+        Test parsing with error recovery of valid source
+        """
+        f = """
+class c1 "C1"
+    : x: int
+class c2 "C2"
+
+c1 == c2
+"""
+        errors = []
+        n = parse(f, errors=errors, cache=False)
+        self.assertEquals([], errors)
+        self.assertEquals(['c1', 'c2', 'association'], [k.id if k.cls != 'association' else k.cls for k in n])
+        self.assertEquals('x', n[0].data['attributes'][0].name)
+
+
+    def test_syntax_errors(self):
+        """
+        Test collecting multiple syntax errors
+        """
+        f = """
+class c1 "C1"
+clas c2 "C2"
+class c3 "C3"
+    class c4 "C4"
+  artifact a1 "A1"
+class c5 "C5"
+"""
+        errors = []
+        n = parse(f, errors=errors, cache=False)
+        self.assertEquals(2, len(errors))
+        self.assertEquals(3, errors[0].line)
+        self.assertEquals(6, errors[1].line)
+        self.assertEquals(['c1', 'c5'], [k.id for k in n])
+
+
+    def test_uml_errors(self):
+        """
+        Test collecting multiple UML semantics errors
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+comment c3 "C3"
+
+c1 -- c2
+c1 -m> c2
+c1 -- c3
+c1 -> c4
+"""
+        errors = []
+        n = parse(f, errors=errors, cache=False)
+        self.assertEquals(3, len(errors))
+        self.assertTrue(isinstance(errors[0], UMLError))
+        self.assertTrue(isinstance(errors[1], UMLError))
+        self.assertEquals((6, 7), (errors[0].line, errors[1].line))
+        self.assertEquals(9, errors[2].line)
+        self.assertEquals(['class', 'class', 'comment', 'commentline'],
+            [k.cls for k in n])
+
+
+    def test_discard_invalid_statement(self):
+        """
+        Test discarding ids of invalid statement
+        """
+        f = """
+package p1 "P1"
+    class c1 "C1"
+    c1 -> c2
+class c2 "C2"
+c2 -> c1
+"""
+        errors = []
+        n = parse(f, errors=errors, cache=False)
+        self.assertEquals(2, len(errors))
+        self.assertEquals(2, errors[0].line)
+        self.assertEquals(6, errors[1].line)
+        self.assertEquals(['c2'], [k.id for k in n])
+
+
+
+
+class IncludeTestCase(unittest.TestCase):
+    """
+    Include statement tests.
+    """
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+
+    def _write(self, name, source):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(source)
+        return path
+
+
+    def _parse(self, source, **kw):
+        return parse(source, cache=False, path=self._write('main.pml', source),
+                **kw)
+
+
+    def test_include(self):
+        """
+        Test including a file
+        """
+        self._write('a.pml', 'class c1 "C1"\nclass c2 "C2"\nc1 -> c2\n')
+        n = self._parse("""
+include "a.pml"
+class c3 "C3"
+c3 == c1
+""")
+        self.assertEquals(['c1', 'c2', 'dependency-1', 'c3', 'association-2'],
+                [k.id for k in n])
+        self.assertTrue(n[3] is n[4].tail)
+        self.assertTrue(n[0] is n[4].head)
+        self.assertTrue(n[0].parent is n)
+
+        # no position of included nodes in the source
+        self.assertTrue(n.index.find(2) is None)
+        self.assertEquals(n[3], n.index.find(3))
+
+
+    def test_include_align(self):
+        """
+        Test including a file with alignment id same as element id
+        """
+        self._write('a.pml', """
+class c1 "C1"
+class c2 "C2"
+
+:layout:
+    left c3: c1 c2
+    top l1: c1 c3
+""")
+        n = self._parse("""
+include "a.pml"
+class c3 "C3"
+c3 == c1
+""")
+        self.assertEquals(['c1', 'c2', 'layout', 'c3', 'association-1'],
+                [getattr(k, 'id', getattr(k, 'name', None)) for k in n])
+        l3, l1 = n[2].data
+        self.assertEquals(('c3', 'l1'), (l3.id, l1.id))
+        self.assertTrue(l1.nodes[1] is l3)
+        self.assertTrue(n[3] is n[4].tail)
+
+
+    def test_include_doc(self):
+        """
+        Test include example of piUML language reference
+        """
+        fn = os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                'doc', 'user', 'ref.rst')
+        if not os.path.exists(fn):
+            self.skipTest('no piUML language reference')
+        with open(fn) as f:
+            doc = f.read()
+        start = doc.index('reused with include statement::') \
+            + len('reused with include statement::')
+        end = doc.index('Relative path of included file')
+        source = textwrap.dedent(doc[start:end])
+
+        self._write('common.pml', 'class c2 "C2"\n')
+        n = self._parse(source)
+        self.assertEquals(['c2', 'c1', 'dependency-1'], [k.id for k in n])
+        self.assertTrue(n[1] is n[2].tail)
+        self.assertTrue(n[0] is n[2].head)
+
+
+    def test_include_nested(self):
+        """
+        Test including file included by other files
+        """
+        self._write('a.pml', 'class c1 "C1"\n')
+        self._write('b.pml', 'include "a.pml"\nclass c2 "C2"\nc2 -> c1\n')
+        self._write('c.pml', 'include "a.pml"\nclass c3 "C3"\nc3 -> c1\n')
+        n = self._parse("""
+include "b.pml"
+include "c.pml"
+package p1 "P1"
+    class c4 "C4"
+
+:layout:
+    left: c1 c2 c3
+""")
+        ids = [k.id for k in unwind(n) if isinstance(k, Element)][1:]
+        self.assertEquals(['c1', 'c2', 'dependency-1', 'c3', 'dependency-2',
+            'p1', 'c4'], ids)
+        self.assertTrue(n[0] is n[2].head)
+        self.assertTrue(n[0] is n[4].head)
+
+
+    def test_include_missing(self):
+        """
+        Test including non-existing file
+        """
+        f = """
+class c1 "C1"
+include "a.pml"
+"""
+        self.assertRaises(ParseError, self._parse, f)
+
+        errors = []
+        n = self._parse(f, errors=errors)
+        self.assertEquals(1, len(errors))
+        self.assertEquals(3, errors[0].line)
+        self.assertEquals(['c1'], [k.id for k in n])
+
+
+    def test_include_cycle(self):
+        """
+        Test cyclic inclusion of files
+        """
+        self._write('a.pml', 'include "b.pml"\nclass c1 "C1"\n')
+        self._write('b.pml', 'include "a.pml"\nclass c2 "C2"\n')
+        try:
+            self._parse('include "a.pml"\n')
+            self.fail('cyclic inclusion not detected')
+        except ParseError as ex:
+            self.assertTrue('Cyclic inclusion' in ex.msg)
+            self.assertEquals(1, ex.line)
+
+
+    def test_include_changed(self):
+        """
+        Test reloading changed included file
+        """
+        path = self._write('a.pml', 'class c1 "C1"\n')
+        n = self._parse('include "a.pml"\n')
+        self.assertEquals(['c1'], [k.id for k in n])
+
+        # included file is parsed once, new nodes are created each time
+        n2 = self._parse('include "a.pml"\n')
+        self.assertEquals(['c1'], [k.id for k in n2])
+        self.assertFalse(n[0] is n2[0])
+
+        self._write('a.pml', 'class c1 "C1"\nclass c2 "C2"\n')
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        n = self._parse('include "a.pml"\n')
+        self.assertEquals(['c1', 'c2'], [k.id for k in n])
+
+
+
+
+class ViewParserTestCase(unittest.TestCase):
+    """
+    View statement tests.
+    """
+    def test_view(self):
+        """
+        Test parsing views
+        """
+        f = """
+class c1 "C1"
+class c2 "C2"
+class c3 "C3"
+
+:view v1: c1 c2
+    left: c1 c2
+
+:view v2: c2 c3
+"""
+        n = parse(f, cache=False)
+        self.assertEquals(['c1', 'c2', 'c3'], [k.id for k in n])
+        self.assertEquals(['v1', 'v2'], list(n.views))
+
+        v1, v2 = n.views.values()
+        self.assertEquals(['c1', 'c2'], [k.id for k in v1.nodes])
+        self.assertEquals(1, len(v1.layout.data))
+        self.assertEquals('left', v1.layout.data[0].type)
+        self.assertEquals(['c2', 'c3'], [k.id for k in v2.nodes])
+        self.assertEquals([], v2.layout.data)
+
+        self.assertEquals((6, 1), (v1.span.line, v1.span.col))
+        self.assertTrue(n.index.find(7, 5) is v1.layout.data[0])
+
+
+    def test_view_unknown_id(self):
+        """
+        Test view with unknown id
+        """
+        f = """
+class c1 "C1"
+
+:view v1: c1 c2
+"""
+        self.assertRaises(ParseError, parse, f, cache=False)
+
+
+
+
+class LeplInternalsTestCase(unittest.TestCase):
+    """
+    Lepl internals tests.
+    """
+    NAMES = ('_RMemo', '_LMemo', '_s_delta', '__memos', '__parser')
+
+    def setUp(self):
+        self.saved = {k: getattr(piuml.parser, k) for k in self.NAMES}
+
+
+    def tearDown(self):
+        for k, v in self.saved.items():
+            setattr(piuml.parser, k, v)
+
+
+    def test_memo_tables(self):
+        """
+        Test lepl memoization tables are available
+        """
+        parser = piuml.parser.create_parser()
+        tables = piuml.parser._memo_tables(parser.get_match().matcher)
+        self.assertTrue(tables, 'lepl memoization tables not available,'
+            ' parser is recreated after each parsing')
+
+
+    def test_reset_fallback(self):
+        """
+        Test parser is recreated when lepl memoization tables are not available
+        """
+        memo_tables = piuml.parser._memo_tables
+        piuml.parser._memo_tables = lambda matcher: None
+        setattr(piuml.parser, '__memos', None)
+        try:
+            n = parse("class c1 'C1'", cache=False)
+            self.assertEquals('c1', n[0].id)
+            n = parse("class c2 'C2'", cache=False)
+            self.assertEquals('c2', n[0].id)
+        finally:
+            piuml.parser._memo_tables = memo_tables
+            setattr(piuml.parser, '__memos', None)
+
+
+    def test_internal(self):
+        """
+        Test getting missing lepl internal attribute
+        """
+        self.assertTrue(piuml.parser._lepl_internal(object(), 'x') is None)
+
+
+    def test_memo_class(self):
+        """
+        Test memoization tables when lepl memoizer class is missing
+        """
+        piuml.parser._RMemo = None
+        parser = getattr(piuml.parser, '__parser')
+        tables = piuml.parser._memo_tables(parser.get_match().matcher)
+        self.assertTrue(tables is None)
+
+
+    def test_memo_table_attr(self):
+        """
+        Test memoization tables when lepl memoizer table is missing
+        """
+        class Memo(object): pass
+        piuml.parser._RMemo = Memo
+        matcher = piuml.parser.create_parser().get_match().matcher
+        self.assertFalse(isinstance(matcher, Memo))
+
+        # memoizer of the parser without the table attribute
+        matcher.__class__ = type('M', (type(matcher), Memo), {})
+        tables = piuml.parser._memo_tables(matcher)
+        self.assertTrue(tables is None)
+
+
+    def test_reset_error(self):
+        """
+        Test parser is recreated after parsing error when lepl memoizer class
+        is missing
+        """
+        piuml.parser._RMemo = None
+        setattr(piuml.parser, '__memos', None)
+        parser = getattr(piuml.parser, '__parser')
+
+        f1 = """
+class c1 "C1"
+:layout:
+    left: c2
+"""
+        f2 = """
+package p1 "P1"
+    class c1 "C1"
+"""
+        self.assertRaises(ParseError, parse, f1, cache=False)
+        self.assertFalse(getattr(piuml.parser, '__memos'))
+        self.assertFalse(getattr(piuml.parser, '__parser') is parser)
+
+        n = parse(f2, cache=False)
+        self.assertEquals('c1', n[0][0].id)
+
+
+    def test_span(self):
+        """
+        Test parsing when lepl stream position is missing
+        """
+        piuml.parser._s_delta = None
+        n = parse('class c1 "C1"\n', cache=False)
+        self.assertEquals('c1', n[0].id)
+        self.assertTrue(n[0].span is None)
+
+
+
+class InternTestCase(unittest.TestCase):
+    """
+    String interning tests.
+    """
+    def _check(self, n):
+        c1, c2, d = n[0], n[1], n[2]
+        intern = lambda s: sys.intern(''.join(list(s)))
+        self.assertTrue(c1.id is intern('c1'))
+        self.assertTrue(c1.cls is intern('class'))
+        self.assertTrue(c1.stereotypes[0] is intern('entity'))
+        self.assertTrue(c1.stereotypes[0] is c2.stereotypes[0])
+        self.assertTrue(d.id is intern(d.id))
+        self.assertTrue(n[-1].data[0].type is intern('left'))
+
+
+    def test_intern(self):
+        """
+        Test interning ids, classes, stereotypes and alignment types
+        """
+        f = """
+class c1 <<entity>> "C1"
+class c2 <<entity>> "C2"
+c1 -> c2
+
+:layout:
+    left: c1 c2
+"""
+        self._check(parse(f, cache=False))
+
+        # interned when loaded from cache
+        path = tempfile.mkdtemp()
+        default_cache = piuml.parser.default_cache
+        piuml.parser.default_cache = lambda: ASTCache(path)
+        try:
+            parse(f, cache=True)
+            self.assertEquals(1, len(os.listdir(path)))
+            self._check(parse(f, cache=True))
+        finally:
+            piuml.parser.default_cache = default_cache
+            shutil.rmtree(path)
+
+
 # vim: sw=4:et:ai
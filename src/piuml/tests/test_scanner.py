@@ -31,17 +31,17 @@ class TokenTestCase(unittest.TestCase):
         """
         Test parsing id
         """
-        n = parse('class id1 "test"')
+        n = parse('class id1 "test"', cache=False)
         self.assertEquals('id1', n[0].id)
 
         self.assertRaises(ParseError ,parse, 'class 1id "test"')
 
-        n = parse('class class1 "test"')
+        n = parse('class class1 "test"', cache=False)
         self.assertEquals('class1', n[0].id)
 
         self.assertRaises(ParseError ,parse, 'class 1class "test"')
 
-        n = parse('class class "test"')
+        n = parse('class class "test"', cache=False)
         self.assertEquals('class', n[0].id)
 
 
@@ -49,22 +49,22 @@ class TokenTestCase(unittest.TestCase):
         """
         Test string parsing
         """
-        n = parse('class id1 "bc d"')
+        n = parse('class id1 "bc d"', cache=False)
         self.assertEquals("bc d", n[0].name)
 
-        n = parse('class id1 \'bc d\'')
+        n = parse('class id1 \'bc d\'', cache=False)
         self.assertEquals("bc d", n[0].name)
 
         # " char inside string quoted with "
-        n = parse('class id1 "b\\"cd"')
+        n = parse('class id1 "b\\"cd"', cache=False)
         self.assertEquals("b\"cd", n[0].name)
 
         # ' char inside string quoted with '
-        n = parse('class id1 \'b\\\'cd\'')
+        n = parse('class id1 \'b\\\'cd\'', cache=False)
         self.assertEquals('b\'cd', n[0].name)
 
         # \" string inside string quoted with '
-        n = parse('class id1 \'a"b\\\\"cd"ef\'')
+        n = parse('class id1 \'a"b\\\\"cd"ef\'', cache=False)
         self.assertEquals('a"b\\"cd"ef', n[0].name)
 
 
@@ -85,8 +85,8 @@ class TokenTestCase(unittest.TestCase):
         """
         Test comment token parsing
         """
-        parse('# this is comment')
-        parse('#this is comment')
+        parse('# this is comment', cache=False)
+        parse('#this is comment', cache=False)
         self.assertRaises(ParseError, parse, 'this is not comment  # this is comment')
         self.assertRaises(ParseError, parse, r'\# this is not comment')
 
@@ -95,22 +95,22 @@ class TokenTestCase(unittest.TestCase):
         """
         Test stereotype token parsing
         """
-        n = parse('class id <<test>> "aa"')
+        n = parse('class id <<test>> "aa"', cache=False)
         self.assertEquals(['test'], n[0].stereotypes)
 
-        n = parse('class id << test >> "aa"')
+        n = parse('class id << test >> "aa"', cache=False)
         self.assertEquals(['test'], n[0].stereotypes)
 
-        n = parse('class id <<t1, t2>> "aa"')
+        n = parse('class id <<t1, t2>> "aa"', cache=False)
         self.assertEquals(['t1', 't2'], n[0].stereotypes)
 
-        n = parse('class id <<t1,t2>> "aa"')
+        n = parse('class id <<t1,t2>> "aa"', cache=False)
         self.assertEquals(['t1', 't2'], n[0].stereotypes)
 
-        n = parse('class id <<  t1,t2  >> "aa"')
+        n = parse('class id <<  t1,t2  >> "aa"', cache=False)
         self.assertEquals(['t1', 't2'], n[0].stereotypes)
 
-        n = parse('class id << t1 , t2 >> "aa"')
+        n = parse('class id << t1 , t2 >> "aa"', cache=False)
         self.assertEquals(['t1', 't2'], n[0].stereotypes)
 
 
@@ -119,40 +119,40 @@ class TokenTestCase(unittest.TestCase):
         Test attribute token parsing
         """
         f = 'class a "a"\n    '
-        n = parse(f + ': attr')
+        n = parse(f + ': attr', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr-_1')
+        n = parse(f + ': attr-_1', cache=False)
         self.assertEquals('attr-_1', n[0].data['attributes'][0].name)
 
-        n = parse(f + ':attr')
+        n = parse(f + ':attr', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr: int')
+        n = parse(f + ': attr: int', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
         self.assertEquals('int', n[0].data['attributes'][0].type)
 
-        n = parse(f + ': attr: int = 1')
+        n = parse(f + ': attr: int = 1', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
         self.assertEquals('int', n[0].data['attributes'][0].type)
         self.assertEquals('1', n[0].data['attributes'][0].value)
 
-        n = parse(f + ': attr = "test"')
+        n = parse(f + ': attr = "test"', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr: str = "test"')
+        n = parse(f + ': attr: str = "test"', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr: str = test()')
+        n = parse(f + ': attr: str = test()', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr[11]')
+        n = parse(f + ': attr[11]', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr [0..1]')
+        n = parse(f + ': attr [0..1]', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
-        n = parse(f + ': attr [n..m]')
+        n = parse(f + ': attr [n..m]', cache=False)
         self.assertEquals('attr', n[0].data['attributes'][0].name)
 
 
@@ -160,13 +160,14 @@ class TokenTestCase(unittest.TestCase):
         """
         Test operation token parsing
         """
-        n = parse('class a1 "a1"\n    : oper()')
+        n = parse('class a1 "a1"\n    : oper()', cache=False)
         self.assertEquals('oper()', n[0].data['operations'][0].name)
 
-        n = parse('class a1 "a1"\n    : oper(a: int)')
+        n = parse('class a1 "a1"\n    : oper(a: int)', cache=False)
         self.assertEquals('oper(a: int)', n[0].data['operations'][0].name)
 
-        n = parse('class a1 "a1"\n    : oper(a: int, b: str): double')
+        n = parse('class a1 "a1"\n    : oper(a: int, b: str): double',
+                cache=False)
         self.assertEquals('oper(a: int, b: str): double',
                 n[0].data['operations'][0].name)
 
@@ -181,22 +182,22 @@ class c2 "C2"
 
 c1 == "An association" c2
     : """
-        n = parse(f + 'attr')
+        n = parse(f + 'attr', cache=False)
         data = n[2].data
         self.assertEquals('attr', data['tail'][1].name)
         self.assertTrue(data['tail'][1].mult is None)
 
-        n = parse(f + 'attr [0..1]')
+        n = parse(f + 'attr [0..1]', cache=False)
         data = n[2].data
         self.assertEquals('attr', data['tail'][1].name)
         self.assertEquals('[0..1]', str(data['tail'][1].mult))
 
-        n = parse(f + '[0..1]')
+        n = parse(f + '[0..1]', cache=False)
         data = n[2].data
         self.assertEquals('[0..1]', str(data['tail'][1].mult))
         self.assertEquals('', data['tail'][1].name)
 
-        n = parse(f + 'attr[n..m]')
+        n = parse(f + 'attr[n..m]', cache=False)
         data = n[2].data
         self.assertEquals('attr', data['tail'][1].name)
         self.assertEquals('[n..m]', str(data['tail'][1].mult))
@@ -206,9 +207,12 @@ c1 == "An association" c2
         """
         Test stereotype attributes token parsing
         """
-        n = parse('class c1 "c1"\n    : <<test>> :\n        : attr = 1')
-        n = parse('class c1 "c1"\n    : <<test>> :\n        : attr = "1"')
-        n = parse('class c1 "c1"\n    : <<test>> :\n        : attr = abc')
+        n = parse('class c1 "c1"\n    : <<test>> :\n        : attr = 1',
+                cache=False)
+        n = parse('class c1 "c1"\n    : <<test>> :\n        : attr = "1"',
+                cache=False)
+        n = parse('class c1 "c1"\n    : <<test>> :\n        : attr = abc',
+                cache=False)
 
         self.assertRaises(ParseError, parse,
                 'class c1 "c1"\n    : <<t1, t2>>   :')
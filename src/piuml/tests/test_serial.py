@@ -0,0 +1,166 @@
+#
+# piUML - UML diagram generator.
+#
+# Copyright (C) 2010 - 2012 by Artur Wroblewski <wrobell@pld-linux.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Diagram serialization tests.
+"""
+
+import unittest
+from io import BytesIO
+
+from piuml import serial
+from piuml.data import Diagram, NodeGroup, Section, unwind
+from piuml.parser import parse
+from piuml.style import Pos, Size
+
+SOURCE = """
+class c1 <<entity>> "C1"
+    : a1: int [0..1]
+    : a2
+    : op1(x)
+package p1 "P1"
+    class c2 "C2"
+    comment n1 "Note"
+c1 O=>= <<s1>> "A" c2
+    : t1 [1]
+    : h1 [0..*]
+c1 -> p1
+c1 => c2
+n1 -- c2
+
+:layout:
+    left: c1 p1
+
+:view v1: c1 c2
+    top: c1 c2
+"""
+
+
+class SerializationTestCase(unittest.TestCase):
+    """
+    Diagram serialization tests.
+    """
+    def _check_tree(self, n1, n2):
+        nodes1 = list(unwind(n1))
+        nodes2 = list(unwind(n2))
+        self.assertEquals(len(nodes1), len(nodes2))
+        for k1, k2 in zip(nodes1, nodes2):
+            self.assertEquals(type(k1), type(k2))
+            if isinstance(k1, Section):
+                self.assertEquals(
+                    [(a.type, [n.id for n in a.nodes]) for a in k1.data],
+                    [(a.type, [n.id for n in a.nodes]) for a in k2.data])
+                continue
+            self.assertEquals(
+                    (k1.id, k1.generated, k1.cls, k1.name, k1.stereotypes),
+                    (k2.id, k2.generated, k2.cls, k2.name, k2.stereotypes))
+            self.assertEquals(sorted(k1.data), sorted(k2.data))
+            if k1.span is not None:
+                self.assertEquals((k1.span.line, k1.span.col),
+                        (k2.span.line, k2.span.col))
+            if k1.parent is not None:
+                self.assertEquals(k1.parent.id, k2.parent.id)
+
+
+    def test_roundtrip(self):
+        """
+        Test serialization and loading of a diagram
+        """
+        n1 = parse(SOURCE, cache=False)
+        n2 = serial.loads(serial.dumps(n1))
+        self.assertTrue(isinstance(n2, Diagram))
+        self._check_tree(n1, n2)
+
+        c1, p1, a, d = n2[:4]
+        self.assertEquals(['entity'], c1.stereotypes)
+        self.assertEquals('[0..1]', str(c1.data['attributes'][0].mult))
+        self.assertTrue(c1.data['attributes'][1].mult is None)
+        self.assertEquals('op1(x)', c1.data['operations'][0].name)
+        self.assertTrue(a.tail is c1)
+        self.assertTrue(a.head is p1[0])
+        self.assertTrue(a.data['direction'] is a.head)
+        self.assertEquals('t1', a.data['tail'][1].name)
+        self.assertTrue(d.data['supplier'] is p1)
+        self.assertTrue(p1[0].parent is p1)
+        self.assertTrue(n2[-1].data[0].nodes[1] is p1)
+        self.assertFalse(c1.generated)
+        self.assertTrue(a.generated)
+        self.assertTrue(n2[-1].data[0].generated)
+
+        v = n2.views['v1']
+        self.assertEquals([c1, p1[0]], v.nodes)
+        self.assertTrue(v.layout.data[0].nodes[0] is c1)
+        self.assertEquals(n1.views['v1'].span.line, v.span.line)
+        self.assertTrue(n2.index is None)
+
+        # loaded diagram serializes to the same data
+        self.assertEquals(serial.dumps(n1), serial.dumps(n2))
+
+
+    def test_geometry(self):
+        """
+        Test serialization of geometry of a diagram
+        """
+        n1 = parse(SOURCE, cache=False)
+        ng = NodeGroup('g1', children=[n1[0]])
+        n1.children[0] = ng
+        ng.parent = n1
+        ng.style.pos = Pos(1.5, 2)
+        n1[0][0].style.size = Size(100, 50.5)
+        n1[0][0].style.compartment = [10, 11, 12]
+        n1[2].style.edges = (Pos(0, 1), Pos(2, 3), Pos(4, 5))
+
+        n2 = serial.loads(serial.dumps(n1, geometry=True))
+        self._check_tree(n1, n2)
+        self.assertTrue(isinstance(n2[0], NodeGroup))
+        self.assertEquals((1.5, 2), tuple(n2[0].style.pos))
+        self.assertEquals((100, 50.5), tuple(n2[0][0].style.size))
+        self.assertEquals([10, 11, 12], n2[0][0].style.compartment)
+        self.assertEquals([(0, 1), (2, 3), (4, 5)],
+                [tuple(p) for p in n2[2].style.edges])
+        self.assertEquals(tuple(n1[1].style.margin),
+                tuple(n2[1].style.margin))
+
+        # no geometry
+        n2 = serial.loads(serial.dumps(n1))
+        self.assertFalse('style' in n2[0].__dict__)
+
+
+    def test_file(self):
+        """
+        Test serialization into a file
+        """
+        n1 = parse(SOURCE, cache=False)
+        f = BytesIO()
+        serial.dump(n1, f)
+        f.seek(0)
+        self._check_tree(n1, serial.load(f))
+
+
+    def test_invalid(self):
+        """
+        Test loading invalid data
+        """
+        data = serial.dumps(parse(SOURCE, cache=False))
+        self.assertRaises(ValueError, serial.loads, b'XXXX' + data[4:])
+        self.assertRaises(ValueError, serial.loads,
+                data[:4] + bytes([serial.VERSION + 1]) + data[5:])
+
+
+# vim: sw=4:et:ai
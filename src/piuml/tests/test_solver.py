@@ -24,8 +24,9 @@ Tests of constraint solver and constraints.
 import unittest
 
 from piuml.layout.solver import Solver, TopEq, BottomEq, CenterEq, \
-    MiddleEq, MinSize, MinHDist, MinVDist, SolverError
-from piuml.style import BoxStyle, Size
+    MiddleEq, MinSize, MinHDist, MinVDist, Within, Between, SolverError, \
+    POLICIES
+from piuml.style import BoxStyle, Pos, Size, Area
 
 class SolverTestCase(unittest.TestCase):
     """
@@ -114,4 +115,168 @@ class SolverTestCase(unittest.TestCase):
         self.assertRaises(SolverError, s.solve)
 
 
+    def _assembly(self, left, right):
+        """
+        Create rectangles of component assembly - interface and
+        components on the left and right side of the interface.
+        """
+        iface = BoxStyle()
+        iface.size = Size(20, 20)
+        comps = []
+        for i in range(left):
+            r = BoxStyle()
+            r.pos = Pos(0, i * 50)
+            comps.append(r)
+        for i in range(right):
+            r = BoxStyle()
+            r.pos = Pos(200, i * 50 + 10)
+            comps.append(r)
+        return iface, comps
+
+
+    def test_between(self):
+        """
+        Test between constraint with assembly of many components
+        """
+        iface, comps = self._assembly(10, 10)
+        c = Between(iface, comps)
+        self.assertEquals([iface], c())
+
+        # centered between right edge of left components (80) and left
+        # edge of right components (200)
+        self.assertEquals(130, iface.pos.x)
+        # centered between bottom edge of topmost component (40) and top
+        # edge of bottommost component (460)
+        self.assertEquals(240, iface.pos.y)
+
+        # solved, no change
+        self.assertEquals([], c())
+
+        # the order of components does not matter
+        c = Between(iface, list(reversed(comps)))
+        self.assertEquals([], c())
+
+
+    def test_between_solve(self):
+        """
+        Test solving between constraint of component assembly
+        """
+        iface, comps = self._assembly(5, 5)
+        parent = BoxStyle()
+        s = Solver()
+        s.add(MinSize(iface))
+        s.add(Between(iface, comps))
+        s.add(Within(iface, parent, Area(5, 5, 5, 5)))
+        for r in comps:
+            s.add(Within(r, parent, Area(5, 5, 5, 5)))
+        s.add(MinHDist(comps[0], comps[1], 10))
+        s.solve()
+
+        # changed position of the interface is propagated to its parent
+        x1 = min(r.pos.x + r.size.width for r in comps)
+        x2 = max(r.pos.x for r in comps)
+        self.assertEquals((x1 + x2 - iface.size.width) / 2, iface.pos.x)
+        self.assertTrue(parent.pos.y + parent.size.height
+            >= iface.pos.y + iface.size.height + 5)
+
+
+    def test_policies(self):
+        """
+        Test constraint scheduling policies
+        """
+        for policy in POLICIES:
+            r1 = BoxStyle()
+            r2 = BoxStyle()
+            r3 = BoxStyle()
+            r1.min_size = Size(100, 10)
+
+            s = Solver(policy)
+            s.add(MinSize(r1), 1)
+            s.add(MinSize(r2), 1)
+            s.add(MinSize(r3))
+            s.add(Within(r1, r3, Area(5, 5, 5, 5)), 1)
+            s.add(Within(r2, r3, Area(5, 5, 5, 5)), 1)
+            s.add(MinHDist(r1, r2, 10), 1)
+            s.solve()
+
+            self.assertEquals(policy, s.stats['policy'])
+            self.assertEquals(100, r1.size.width)
+            self.assertEquals(5, r1.pos.x)
+            self.assertEquals(115, r2.pos.x)
+            self.assertEquals(200, r3.size.width)
+
+
+    def test_policy_topo(self):
+        """
+        Test topological order of constraints
+        """
+        r1 = BoxStyle()
+        r2 = BoxStyle()
+        r3 = BoxStyle()
+
+        s = Solver('topo')
+        c1 = s.add(Within(r2, r3, Area(5, 5, 5, 5)))
+        c2 = s.add(MinHDist(r1, r2, 10))
+        c3 = s.add(MinSize(r3))
+        p = s._priority()
+        self.assertTrue(p[c2] < p[c1] < p[c3])
+
+
+    def test_policy_unknown(self):
+        """
+        Test unknown constraint scheduling policy
+        """
+        self.assertRaises(ValueError, Solver, 'lifo')
+
+
+    def test_merge(self):
+        """
+        Test merging of equal constraints
+        """
+        r1 = BoxStyle()
+        r2 = BoxStyle()
+
+        s = Solver()
+        c = s.add(TopEq(r1, r2))
+        self.assertTrue(c is s.add(TopEq(r1, r2)))
+        self.assertEquals({c}, s.get(r1, r2))
+
+        # different type or order of variables
+        s.add(BottomEq(r1, r2))
+        s.add(TopEq(r2, r1))
+        self.assertEquals(2, len(s.get(r1, r2)))
+        self.assertEquals(1, len(s.get(r2, r1)))
+
+        # maximum distance is kept
+        c = s.add(MinHDist(r1, r2, 20))
+        self.assertTrue(c is s.add(MinHDist(r1, r2, 30)))
+        self.assertTrue(c is s.add(MinHDist(r1, r2, 10)))
+        self.assertEquals(30, c.dist)
+
+        # constraints with different parameters are not merged
+        s.add(Within(r1, r2, Area(1, 1, 1, 1)))
+        s.add(Within(r1, r2, Area(2, 2, 2, 2)))
+        s.add(Within(r1, r2, Area(2, 2, 2, 2)))
+        self.assertEquals(2, len({c for c in s.get(r1, r2)
+            if isinstance(c, Within)}))
+        self.assertEquals(6, len(s._constraints))
+
+
+    def test_merge_solve(self):
+        """
+        Test solving merged minimal distance constraints
+        """
+        r1 = BoxStyle()
+        r2 = BoxStyle()
+
+        s = Solver()
+        s.add(MinSize(r1))
+        s.add(MinSize(r2))
+        s.add(MinHDist(r1, r2, 10))
+        s.add(MinHDist(r1, r2, 30))
+        s.solve()
+        self.assertEquals(3, s.stats['constraints'])
+        self.assertEquals(30, r2.pos.x - r1.pos.x - r1.size.width)
+
+
 # vim: sw=4:et:ai